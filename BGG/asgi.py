@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'BGG.settings')
+# Под ASGI ленты обслуживают асинхронные view (см. posts.async_views).
+# Запуск: uvicorn BGG.asgi:application --workers 4
+os.environ.setdefault('ASYNC_FEED_VIEWS', '1')
 
 application = get_asgi_application()
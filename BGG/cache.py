@@ -0,0 +1,257 @@
+"""Общий для всех воркеров кеш в файле SQLite (WAL).
+
+LocMemCache живёт в памяти процесса: под gunicorn каждый воркер держит свою
+холодную копию, а сброс поколений лент из одного воркера не виден другим.
+Этот бэкенд хранит записи в одном файле на хосте; режим WAL позволяет
+читать параллельно с записью, так что воркеры не ждут друг друга на чтении.
+
+- TTL: у записи есть срок ``expires``, просроченные не читаются и удаляются
+  при вытеснении.
+- Размер: ``OPTIONS["MAX_SIZE"]`` (байты) и ``MAX_ENTRIES`` (записи). Итоги
+  ведут триггеры, поэтому проверка границы не считает таблицу.
+- LRU: при превышении границы удаляются сначала просроченные, потом давно не
+  читанные записи. Время чтения обновляется не чаще раза в
+  ``ACCESS_RESOLUTION`` секунд, чтобы чтение не превращалось в запись.
+- ``incr``: целые числа хранятся как INTEGER и увеличиваются одним
+  ``UPDATE ... RETURNING``, атомарно между процессами.
+
+Внешних сервисов не нужно, только файл из ``LOCATION``.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+NEVER = float("inf")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    size INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_accessed ON cache_entries (accessed);
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals (id, entries, size) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entries_ai AFTER INSERT ON cache_entries BEGIN
+    UPDATE cache_totals SET entries = entries + 1, size = size + new.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_ad AFTER DELETE ON cache_entries BEGIN
+    UPDATE cache_totals SET entries = entries - 1, size = size - old.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_au AFTER UPDATE OF size ON cache_entries
+BEGIN
+    UPDATE cache_totals SET size = size - old.size + new.size;
+END;
+"""
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._path = str(location)
+        self._max_size = options.get("MAX_SIZE", 256 * 1024 * 1024)
+        self._resolution = options.get("ACCESS_RESOLUTION", 1)
+        self._local = threading.local()
+
+    def _connection(self):
+        # Соединение на поток и на процесс: после fork старое не годится.
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _expires(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return NEVER if timeout is None else time.time() + timeout
+
+    @staticmethod
+    def _dump(value):
+        # Целые храним как есть, чтобы incr работал внутри SQLite.
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _load(value):
+        return value if isinstance(value, int) else pickle.loads(value)
+
+    @staticmethod
+    def _size(key, value):
+        return len(key) + (8 if isinstance(value, int) else len(value))
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        found = self._read([key])
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        names = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {names[key]: value for key, value in self._read(list(names)).items()}
+
+    def _read(self, keys):
+        if not keys:
+            return {}
+        conn = self._connection()
+        now = time.time()
+        rows = conn.execute(
+            "SELECT key, value, accessed FROM cache_entries "
+            f"WHERE key IN ({', '.join('?' * len(keys))}) AND expires > ?",
+            [*keys, now],
+        ).fetchall()
+        stale = [key for key, _, accessed in rows if accessed < now - self._resolution]
+        if stale:
+            conn.execute(
+                "UPDATE cache_entries SET accessed = ? "
+                f"WHERE key IN ({', '.join('?' * len(stale))})",
+                [now, *stale],
+            )
+        return {key: self._load(value) for key, value, _ in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write([(key, value)], timeout, replace=True)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write(
+            [
+                (self.make_and_validate_key(key, version=version), value)
+                for key, value in data.items()
+            ],
+            timeout,
+            replace=True,
+        )
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write([(key, value)], timeout, replace=False) > 0
+
+    def _write(self, items, timeout, replace):
+        if not items:
+            return 0
+        conn = self._connection()
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = []
+        for key, value in items:
+            dumped = self._dump(value)
+            rows.append((key, dumped, expires, now, self._size(key, dumped)))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if replace:
+                conn.executemany(
+                    "INSERT INTO cache_entries (key, value, expires, accessed, size) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "value = excluded.value, expires = excluded.expires, "
+                    "accessed = excluded.accessed, size = excluded.size",
+                    rows,
+                )
+                written = len(rows)
+            else:
+                # Просроченная запись не мешает add: заменяем её.
+                written = 0
+                for row in rows:
+                    written += conn.execute(
+                        "INSERT INTO cache_entries (key, value, expires, accessed, size) "
+                        "VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                        "value = excluded.value, expires = excluded.expires, "
+                        "accessed = excluded.accessed, size = excluded.size "
+                        "WHERE cache_entries.expires <= ?",
+                        [*row, now],
+                    ).rowcount
+            self._cull(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return written
+
+    def _cull(self, conn, now):
+        entries, size = conn.execute(
+            "SELECT entries, size FROM cache_totals"
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        conn.execute("DELETE FROM cache_entries WHERE expires <= ?", [now])
+        # Освобождаем с запасом, чтобы не вытеснять на каждой записи.
+        target_entries = self._max_entries - self._max_entries // self._cull_frequency
+        target_size = self._max_size - self._max_size // self._cull_frequency
+        while True:
+            entries, size = conn.execute(
+                "SELECT entries, size FROM cache_totals"
+            ).fetchone()
+            if entries <= target_entries and size <= target_size:
+                return
+            batch = max(1, entries - target_entries, entries // self._cull_frequency)
+            conn.execute(
+                "DELETE FROM cache_entries WHERE key IN ("
+                "SELECT key FROM cache_entries ORDER BY accessed LIMIT ?)",
+                [batch],
+            )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            "UPDATE cache_entries SET expires = ? WHERE key = ? AND expires > ?",
+            [self._expires(timeout), key, time.time()],
+        ).rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "UPDATE cache_entries SET value = value + ? "
+            "WHERE key = ? AND expires > ? AND typeof(value) = 'integer' "
+            "RETURNING value",
+            [delta, key, time.time()],
+        ).fetchone()
+        if row is None:
+            raise ValueError("Key '%s' not found" % key)
+        return row[0]
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            "SELECT 1 FROM cache_entries WHERE key = ? AND expires > ?",
+            [key, time.time()],
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            "DELETE FROM cache_entries WHERE key = ?", [key]
+        ).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self._connection().execute(
+                f"DELETE FROM cache_entries WHERE key IN ({', '.join('?' * len(keys))})",
+                keys,
+            )
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: открывать файл на каждый запрос дорого.
+        pass
@@ -0,0 +1,345 @@
+"""Метрики процесса в формате Prometheus на ``/metrics``.
+
+Счётчики и гистограммы копятся в памяти процесса: запись — это блокировка,
+поиск по словарю и сложение, единицы микросекунд. Сетевых клиентов и
+внешних библиотек нет.
+
+Под gunicorn у каждого воркера своя память. С ``METRICS_LOCATION`` воркеры
+раз в ``METRICS_FLUSH_SECONDS`` сливают накопленные приращения в общий
+файл SQLite (как ``BGG.cache``), а ``/metrics`` отдаёт сумму из файла вместе
+со своими несброшенными значениями. Без ``METRICS_LOCATION`` отдаются
+значения одного процесса.
+
+Время ответа пишет ``MetricsMiddleware`` и при выключенном
+``REQUEST_PROFILING``; число запросов к базе считает только профайлер.
+Доступ к ``/metrics`` — по ``METRICS_TOKEN`` или с ``METRICS_ALLOWED_IPS``.
+"""
+import atexit
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм по умолчанию — как у клиентов Prometheus, в секундах.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metrics (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    slot INTEGER NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels, slot)
+) WITHOUT ROWID;
+"""
+
+UPSERT = (
+    "INSERT INTO metrics VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (name, labels, slot) DO UPDATE SET value = value + excluded.value"
+)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, registry, name, help, labels):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    @property
+    def size(self):
+        return 1
+
+    def slots(self, labels):
+        """Ячейки значений для набора меток; вызывать под ``self.lock``."""
+        slots = self.values.get(labels)
+        if slots is None:
+            slots = self.values[labels] = [0] * self.size
+            # Новый набор меток — редкость: здесь, а не на каждой записи,
+            # проверяем, что фоновый сброс в общий файл запущен.
+            self.registry.start()
+        return slots
+
+    def take(self):
+        with self.lock:
+            values, self.values = self.values, {}
+        return values
+
+    def snapshot(self):
+        with self.lock:
+            return {labels: list(slots) for labels, slots in self.values.items()}
+
+    def merge(self, values):
+        with self.lock:
+            for labels, added in values.items():
+                slots = self.slots(labels)
+                for slot, value in enumerate(added):
+                    slots[slot] += value
+
+    def samples(self, values):
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.slots(labels)[0] += amount
+
+    def samples(self, values):
+        for labels, slots in sorted(values.items()):
+            yield self.name, dict(zip(self.labels, labels)), slots[0]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry, name, help, labels, buckets=BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+
+    @property
+    def size(self):
+        # Счётчик на каждую границу, на +Inf и сумма наблюдений.
+        return len(self.buckets) + 2
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            slots = self.slots(labels)
+            slots[index] += 1
+            slots[-1] += value
+
+    def samples(self, values):
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for labels, slots in sorted(values.items()):
+            named = dict(zip(self.labels, labels))
+            total = 0
+            for bound, count in zip(bounds, slots):
+                total += count
+                yield f"{self.name}_bucket", {**named, "le": bound}, total
+            yield f"{self.name}_sum", named, slots[-1]
+            yield f"{self.name}_count", named, total
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.started = False
+        self.lock = threading.Lock()
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(self, name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        return self.register(Histogram(self, name, help, labels, buckets))
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.take()
+
+    def location(self):
+        return getattr(settings, "METRICS_LOCATION", None)
+
+    def start(self):
+        if self.started:
+            return
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+            threading.Thread(target=self.flush_forever, daemon=True).start()
+
+    def after_fork(self):
+        # Потомок унаследовал несброшенные значения родителя (их сбросит
+        # родитель) и, возможно, захваченные блокировки; поток сброса
+        # в потомке не скопировался.
+        for metric in self.metrics.values():
+            metric.values = {}
+            metric.lock = threading.Lock()
+        self.started = False
+        self.lock = threading.Lock()
+
+    def flush_forever(self):
+        event = threading.Event()
+        while not event.wait(getattr(settings, "METRICS_FLUSH_SECONDS", 5)):
+            self.flush()
+
+    def connect(self, location):
+        db = sqlite3.connect(location, timeout=5, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def flush(self):
+        """Сливает приращения процесса в общий файл."""
+        location = self.location()
+        if not location:
+            return
+        taken = {name: metric.take() for name, metric in self.metrics.items()}
+        rows = [
+            (name, json.dumps(labels, ensure_ascii=False), slot, value)
+            for name, values in taken.items()
+            for labels, slots in values.items()
+            for slot, value in enumerate(slots)
+            if value
+        ]
+        if not rows:
+            return
+        try:
+            db = self.connect(location)
+            try:
+                with db:
+                    db.execute("BEGIN IMMEDIATE")
+                    db.executemany(UPSERT, rows)
+            finally:
+                db.close()
+        except sqlite3.Error:
+            logger.exception("Не удалось сбросить метрики в %s", location)
+            for name, values in taken.items():
+                self.metrics[name].merge(values)
+
+    def collect(self):
+        """Значения всех метрик: свои и, если задан файл, общие."""
+        location = self.location()
+        if not location:
+            return {name: metric.snapshot() for name, metric in self.metrics.items()}
+        self.flush()
+        collected = {name: {} for name in self.metrics}
+        db = self.connect(location)
+        try:
+            rows = db.execute("SELECT name, labels, slot, value FROM metrics").fetchall()
+        finally:
+            db.close()
+        for name, labels, slot, value in rows:
+            metric = self.metrics.get(name)
+            if metric is None:
+                continue
+            slots = collected[name].setdefault(
+                tuple(json.loads(labels)), [0] * metric.size
+            )
+            if slot < len(slots):
+                slots[slot] = value
+        return collected
+
+    def exposition(self):
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for sample, labels, value in metric.samples(values):
+                lines.append(f"{sample}{format_labels(labels)} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        f'{key}="{escape(value)}"' for key, value in labels.items()
+    ) + "}"
+
+
+def escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.after_fork)
+atexit.register(registry.flush)
+
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Время ответа по имени view", ["view"]
+)
+DB_QUERIES = registry.counter(
+    "db_queries_total", "Запросы к базе по имени view", ["view"]
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total",
+    "Чтения кешей страниц лент (feed) и карточек постов (card)",
+    ["cache", "result"],
+)
+THUMBNAIL_SECONDS = registry.histogram(
+    "thumbnail_generation_seconds", "Время нарезки миниатюр одной картинки",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, started)
+        return response
+
+    def observe(self, request, started):
+        match = request.resolver_match
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started, match.view_name if match else ""
+        )
+
+
+def allowed(request):
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        return hmac.compare_digest(
+            request.headers.get("Authorization", "").encode(),
+            f"Bearer {token}".encode(),
+        )
+    # За обратным прокси REMOTE_ADDR — адрес самого прокси, и проверка
+    # пропустит любого клиента: там нужен METRICS_TOKEN.
+    return request.META.get("REMOTE_ADDR") in getattr(
+        settings, "METRICS_ALLOWED_IPS", ()
+    )
+
+
+def view(request):
+    if not allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
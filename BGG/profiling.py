@@ -0,0 +1,176 @@
+"""Профиль запроса в production: SQL, шаблоны и общее время.
+
+``RequestProfileMiddleware`` заводит на время запроса профиль в contextvar.
+Запросы к базе считает обёртка ``execute_wrapper`` на соединениях, время
+отрисовки — бэкенд шаблонов ``DjangoTemplates`` из этого модуля (вложенные
+шаблоны входят во время внешнего). Contextvar переходит в потоки
+``sync_to_async``, так что запросы асинхронных view тоже учитываются.
+
+Итог уходит в заголовок ``Server-Timing``, строкой JSON в лог
+``BGG.profiling`` и в счётчик запросов ``BGG.metrics``. Для view из
+``QUERY_BUDGETS`` число запросов сверяется с бюджетом: превышение пишется
+в лог, а при ``QUERY_BUDGET_STRICT`` (так в тестах) бросает
+``QueryBudgetExceeded``.
+
+С ``REQUEST_PROFILING = False`` middleware отключается при старте, обёртки
+на соединения не ставятся, а шаблоны платят одним чтением contextvar.
+"""
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.backends import django as django_backend
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_profile = ContextVar("request_profile", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class Profile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.templates = 0.0
+        self.depth = 0
+        # Запросы асинхронных view идут из нескольких потоков сразу.
+        self.lock = threading.Lock()
+
+    def add_query(self, elapsed):
+        with self.lock:
+            self.queries += 1
+            self.sql += elapsed
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def query_wrapper(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add_query(time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+class Template:
+    """Шаблон, время отрисовки которого идёт в профиль запроса."""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        profile = _profile.get()
+        if profile is None:
+            return self.template.render(context, request)
+        profile.depth += 1
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            profile.depth -= 1
+            if not profile.depth:
+                profile.templates += time.perf_counter() - started
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name))
+
+
+class RequestProfileMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_PROFILING", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        connection_created.connect(install)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.prepare()
+        token = _profile.set(Profile())
+        try:
+            return self.report(request, self.get_response(request))
+        finally:
+            _profile.reset(token)
+
+    async def __acall__(self, request):
+        self.prepare()
+        token = _profile.set(Profile())
+        try:
+            return self.report(request, await self.get_response(request))
+        finally:
+            _profile.reset(token)
+
+    def prepare(self):
+        # Соединения, открытые до подключения сигнала (проверки при старте,
+        # тестовая база), обёртку ещё не получили.
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def report(self, request, response):
+        profile = _profile.get()
+        match = request.resolver_match
+        view = match.view_name if match else None
+        total = profile.total
+        response["Server-Timing"] = ", ".join(filter(None, (
+            response.get("Server-Timing"),
+            f'sql;dur={profile.sql * 1000:.1f};desc="{profile.queries} queries"',
+            f"tpl;dur={profile.templates * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        )))
+        record = {
+            "view": view,
+            "method": request.method,
+            "status": response.status_code,
+            "queries": profile.queries,
+            "sql_ms": round(profile.sql * 1000, 2),
+            "template_ms": round(profile.templates * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+        }
+        logger.info(json.dumps(record), extra={"profile": record})
+        metrics.DB_QUERIES.inc(view or "", amount=profile.queries)
+
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(view)
+        if budget is not None and profile.queries > budget:
+            message = (
+                f"{view}: {profile.queries} запросов к базе при бюджете {budget}"
+            )
+            if getattr(settings, "QUERY_BUDGET_STRICT", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message, extra={"profile": record})
+        return response
@@ -0,0 +1,87 @@
+"""Чтение лент с реплик, запись — в основную базу.
+
+``ReplicaMiddleware`` заводит на время запроса состояние в contextvar: для
+view из ``REPLICA_VIEWS`` чтения моделей из ``REPLICA_APPS`` разрешено
+отправлять на реплики. Первая же запись в запросе прилипает его к основной
+базе, чтобы следующие чтения видели только что записанное. Автор, который
+недавно писал (метка read-your-writes из ``posts.feed_cache``), читает
+основную базу весь срок метки: реплика может отставать.
+
+Без ``REPLICA_DATABASES`` роутер ничего не решает и всё идёт в ``default``.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+_state = ContextVar("replica_state", default=None)
+
+
+class _State:
+    def __init__(self):
+        self.replica_reads = False
+        self.wrote = False
+
+
+def replicas():
+    return list(getattr(settings, "REPLICA_DATABASES", []))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.wrote:
+            return None
+        if model._meta.app_label not in getattr(settings, "REPLICA_APPS", ()):
+            return None
+        aliases = replicas()
+        return random.choice(aliases) if aliases else None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты с них можно связывать.
+        return True
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _state.set(_State())
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+
+    async def __acall__(self, request):
+        token = _state.set(_State())
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from posts.feed_cache import recent_writer
+
+        match = request.resolver_match
+        if (
+            request.method in ("GET", "HEAD")
+            and match is not None
+            and match.url_name in getattr(settings, "REPLICA_VIEWS", ())
+            and not recent_writer(request)
+        ):
+            _state.get().replica_reads = True
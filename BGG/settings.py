@@ -57,21 +57,26 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'BGG.metrics.MetricsMiddleware',
+    'BGG.profiling.RequestProfileMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'BGG.routers.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.middleware.CardCacheStatsMiddleware',
 ]
 
 ROOT_URLCONF = 'BGG.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # Бэкенд Django с замером времени отрисовки для BGG.profiling.
+        'BACKEND': 'BGG.profiling.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -92,13 +97,50 @@ WSGI_APPLICATION = 'BGG.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Соединения живут между запросами и проверяются перед повторным
+# использованием; прагмы SQLite задаёт бэкенд BGG.sqlite_backend.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'BGG.sqlite_backend',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 5},
+    },
+    # Реплика для чтения лент; локально — копия основной базы из sync_replica.
+    'replica': {
+        'ENGINE': 'BGG.sqlite_backend',
+        'NAME': os.environ.get('DATABASE_REPLICA', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': 5},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
 
+SQLITE_PRAGMAS = {
+    # Читатели не ждут писателя, писатель не ждёт читателей.
+    'journal_mode': 'WAL',
+    # В WAL этого достаточно: при сбое питания теряется только хвост журнала.
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # Отрицательное значение — в килобайтах: 64 МБ кеша страниц.
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+DATABASE_ROUTERS = ['BGG.routers.ReplicaRouter']
+
+# Реплики включаются явно: без DATABASE_REPLICA все чтения идут в default.
+REPLICA_DATABASES = ['replica'] if os.environ.get('DATABASE_REPLICA') else []
+
+# Какие view читают с реплик и модели каких приложений туда уходят. Сессии
+# и пользователи читаются из основной базы: сразу после входа или
+# регистрации реплика может их ещё не знать.
+REPLICA_VIEWS = ['index', 'group_posts', 'profile', 'post', 'follow_index']
+REPLICA_APPS = ['posts']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -161,8 +203,111 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 SITE_ID = 1
 
+# Один кеш на хост для всех воркеров: файл SQLite в режиме WAL.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'BGG.cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+        },
     }
 }
+
+# Лента подписок: у авторов с числом подписчиков больше порога посты
+# не раскладываются по лентам, а подмешиваются при чтении.
+TIMELINE_FANOUT_LIMIT = 1000
+
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL = 1000
+
+# Кеш страниц лент: страницы живут долго, потому что сбрасываются
+# сигналами через счётчики поколений, а не по времени.
+FEED_CACHE_TIMEOUT = 600
+
+# Сколько секунд после своей записи пользователь читает ленты мимо кеша.
+FEED_CACHE_RYW_SECONDS = 10
+
+# Сколько живёт отрисованная карточка поста; ключ включает версию поста.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Потоки фоновой нарезки миниатюр постов.
+THUMBNAIL_WORKERS = 2
+
+# Через сколько секунд повторять нарезку картинки, которую не удалось открыть.
+THUMBNAIL_RETRY_SECONDS = 600
+
+# Сколько комментариев страница поста читает за раз; дальше — «Показать ещё».
+COMMENTS_PER_PAGE = 50
+
+# Сколько символов текста поста показывает карточка в ленте.
+FEED_EXCERPT_LENGTH = 1000
+
+# Асинхронные ленты для запуска под ASGI; BGG.asgi включает их сам.
+ASYNC_FEED_VIEWS = os.environ.get('ASYNC_FEED_VIEWS', '') == '1'
+
+# Профиль запроса (BGG.profiling): заголовок Server-Timing и строка JSON
+# в лог на каждый ответ. REQUEST_PROFILING=0 отключает middleware целиком.
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', '1') == '1'
+
+# Бюджеты запросов к базе по имени view: превышение пишется в лог, а при
+# QUERY_BUDGET_STRICT (включён в тестах) роняет запрос.
+QUERY_BUDGETS = {
+    'index': 6,
+    'group_posts': 6,
+    'profile': 8,
+    'follow_index': 8,
+    'post': 6,
+    'post_comments': 4,
+    'search': 4,
+    'add_comment': 15,
+    'post_edit': 20,
+    'new_post': 40,
+    'profile_follow': 40,
+    'profile_unfollow': 20,
+}
+
+QUERY_BUDGET_STRICT = False
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'BGG.profiling': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_PROFILING_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Метрики Prometheus на /metrics (BGG.metrics). Под gunicorn задайте
+# METRICS_LOCATION: воркеры складывают метрики в общий файл SQLite.
+METRICS_LOCATION = os.environ.get('METRICS_LOCATION') or None
+
+# Как часто воркер сбрасывает накопленное в METRICS_LOCATION, секунды.
+METRICS_FLUSH_SECONDS = 5
+
+# С каких адресов можно читать /metrics без токена. За обратным прокси
+# REMOTE_ADDR — адрес прокси: там задайте METRICS_TOKEN.
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# Если задан, /metrics отдаётся только с заголовком
+# "Authorization: Bearer <METRICS_TOKEN>", а METRICS_ALLOWED_IPS не проверяется.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Фоновая очистка удалённых пользователей и групп (reap_removals): строк в
+# одной транзакции и предел скорости, строк в секунду (0 — без предела).
+REAPER_BATCH_SIZE = 500
+REAPER_ROWS_PER_SECOND = int(os.environ.get('REAPER_ROWS_PER_SECOND', 2000))
+
+# Посты старше этого числа дней archive_posts переносит в холодный архив
+# (posts.archive), по ARCHIVE_BATCH_SIZE постов за транзакцию.
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+ARCHIVE_BATCH_SIZE = 500
@@ -0,0 +1,28 @@
+"""SQLite с настройками для продакшена.
+
+Обычный бэкенд Django открывает базу в режиме журнала DELETE: запись
+блокирует читателей, и комментарий посреди тяжёлого чтения ленты падает с
+«database is locked». Здесь каждое новое соединение получает прагмы из
+``settings.SQLITE_PRAGMAS`` (WAL, synchronous, busy_timeout, mmap, кеш
+страниц). Транзакции из ``BGG.transactions.atomic_write`` открываются
+``BEGIN IMMEDIATE``: блокировка на запись берётся сразу и ждёт busy_timeout,
+а не падает при попытке повысить блокировку чтения посреди транзакции.
+Остальные, в том числе только читающие, открываются обычным ``BEGIN`` и не
+выстраиваются в очередь за писателями.
+"""
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Следующая транзакция берёт блокировку на запись сразу.
+    immediate = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE" if self.immediate else "BEGIN")
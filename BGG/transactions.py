@@ -0,0 +1,27 @@
+"""Транзакции на запись.
+
+``transaction.atomic`` в SQLite открывает отложенную транзакцию: читатели не
+занимают блокировку на запись и не ждут друг друга. Блоку, который сначала
+читает, а потом пишет, этого мало: если другой писатель закоммитил между его
+чтением и записью, SQLite не может повысить блокировку и сразу отвечает
+«database is locked», не дожидаясь busy_timeout. ``atomic_write`` открывает
+такую транзакцию ``BEGIN IMMEDIATE``: блокировка на запись берётся в начале
+и ждёт busy_timeout. На других базах это обычный ``atomic``.
+"""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def atomic_write(using=None):
+    """``transaction.atomic`` для блока, который пишет в базу."""
+    connection = transaction.get_connection(using)
+    # Флаг читает только BEGIN внешнего atomic; вложенный — это точка сохранения.
+    connection.immediate = True
+    try:
+        with transaction.atomic(using=using):
+            connection.immediate = False
+            yield
+    finally:
+        connection.immediate = False
@@ -18,6 +18,8 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.flatpages import views
+
+from BGG import metrics
 from django.conf.urls import handler404, handler500 # noqa
 
 handler404 = "posts.views.page_not_found" # noqa
@@ -29,6 +31,7 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
     path('__debug__/', include('debug_toolbar.urls')),
+    path('metrics', metrics.view, name='metrics'),
     path('about-us/', views.flatpage, {'url': '/about-us/'}, name='about'),
     path('terms/', views.flatpage, {'url': '/terms/'}, name='terms'),
     path('about-author/', views.flatpage, {'url': '/about-author/'}, name='author'),
@@ -1,17 +1,164 @@
-from django.contrib import admin
-from .models import Post, Group, Comment
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+# posts стоит в INSTALLED_APPS раньше auth: регистрируем штатную админку
+# пользователей сами, чтобы заменить её ниже.
+from django.contrib.auth import admin as auth_admin
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
 
+from . import counters, moderation, removal
+from .models import Post, Group, Comment, Removal
+from .search import COMMENT_INDEX, POST_INDEX, match_query, matching_ids
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'pub_date', 'author')
+# Больше строк в отфильтрованном списке не считаем: хватает на навигацию,
+# а точный COUNT(*) по миллионам строк стоит секунды на каждой странице.
+COUNT_LIMIT = 10_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """Число строк без полного ``COUNT(*)``.
+
+    Без фильтров — из денормализованного счётчика модели, если он есть;
+    иначе считается не больше ``COUNT_LIMIT + 1`` строк.
+    """
+
+    estimates = {Post: lambda: counters.get_counter(counters.POSTS)}
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        estimate = self.estimates.get(queryset.model)
+        if estimate is not None and not queryset.query.where:
+            value = estimate()
+            if value is not None:
+                return value
+        return queryset.order_by()[:COUNT_LIMIT + 1].count()
+
+
+class FullTextSearchMixin:
+    """Поиск в админке по индексу FTS5 вместо ``LIKE '%q%'`` по таблице.
+
+    ``@username`` ищет по автору точным совпадением по уникальному индексу.
+    """
+
+    search_index = None
+    search_help_text = "Слова из текста или @username автора"
+
+    def get_search_results(self, request, queryset, search_term):
+        if search_term.startswith("@"):
+            return queryset.filter(author__username=search_term[1:].strip()), False
+        if connection.vendor != "sqlite" or not match_query(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        sql, params = matching_ids(self.search_index, search_term)
+        return queryset.filter(pk__in=RawSQL(sql, params)), False
+
+
+class FormFieldsAdmin(admin.ModelAdmin):
+    """Правка сохраняет только поля формы.
+
+    Денормализованные счётчики (``editable=False``) в загруженном объекте
+    могли устареть, пока его правили: полный ``save()`` затёр бы их.
+    """
+
+    extra_update_fields = ()
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        columns = {field.name for field in obj._meta.concrete_fields}
+        obj.save(update_fields=[
+            *(name for name in form.fields if name in columns),
+            *self.extra_update_fields,
+        ])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список, который открывается на таблице в миллионы строк.
+
+    Связи читаются ``select_related``, полный счётчик не показывается,
+    число строк оценивается, а массовые действия — по запросу на шаг
+    (``posts.moderation``) вместо удаления объекта за объектом.
+    """
+
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Штатное действие грузит все объекты и шлёт сигналы по каждому.
+        actions.pop("delete_selected", None)
+        return actions
+
+
+class ScheduledRemovalAdmin(admin.ModelAdmin):
+    """Удаление через очередь ``posts.removal`` вместо каскада в запросе.
+
+    Страница подтверждения не собирает связанные объекты: их могут быть
+    миллионы. Объект сразу скрывается, данные удаляет ``reap_removals``.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        objs = list(objs)
+        return (
+            [str(obj) for obj in objs],
+            {self.model._meta.verbose_name_plural: len(objs)},
+            set(),
+            [],
+        )
+
+    def delete_model(self, request, obj):
+        removal.schedule(obj)
+        self.message_user(
+            request, f"«{obj}» скрыт, данные удалятся в фоне", messages.INFO
+        )
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            removal.schedule(obj)
+
+
+class MoveToGroupForm(ActionForm):
+    group = forms.ModelChoiceField(
+        removal.visible_groups().order_by("title"), required=False, label="Группа"
+    )
+
+
+class PostAdmin(FullTextSearchMixin, FormFieldsAdmin, LargeTableAdmin):
+    list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    # Версию карточки меняет сигнал pre_save.
+    extra_update_fields = ('version',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
+    search_index = POST_INDEX
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    action_form = MoveToGroupForm
+    actions = ('delete_posts', 'move_to_group')
+
+    @admin.action(description="Удалить выбранные записи", permissions=["delete"])
+    def delete_posts(self, request, queryset):
+        deleted = moderation.delete_posts(queryset)
+        self.message_user(request, f"Удалено записей: {deleted}")
+
+    @admin.action(description="Перенести выбранные записи в группу",
+                  permissions=["change"])
+    def move_to_group(self, request, queryset):
+        group = Group.objects.filter(pk=request.POST.get("group") or None).first()
+        if group is None:
+            self.message_user(request, "Выберите группу", messages.WARNING)
+            return
+        moved = moderation.move_posts(queryset, group)
+        self.message_user(request, f"Перенесено в «{group}»: {moved}")
 
 admin.site.register(Post, PostAdmin)
 
 
-class GroupsAdmin(admin.ModelAdmin):
+class GroupsAdmin(FormFieldsAdmin, ScheduledRemovalAdmin):
     list_display =('title', 'slug', 'description')
     search_fields = ('title', 'description')
     empty_value_display = '-пусто-'
@@ -19,9 +166,44 @@ class GroupsAdmin(admin.ModelAdmin):
 admin.site.register(Group, GroupsAdmin)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, LargeTableAdmin):
     list_display = ('post', 'author', 'text', 'created')
-    search_fields = ('text', 'author')
+    list_select_related = ('post', 'author')
+    search_fields = ('text',)
+    search_index = COMMENT_INDEX
     list_filter = ('created',)
+    date_hierarchy = 'created'
+    actions = ('delete_comments',)
+
+    @admin.action(description="Удалить выбранные комментарии", permissions=["delete"])
+    def delete_comments(self, request, queryset):
+        deleted = moderation.delete_comments(queryset)
+        self.message_user(request, f"Удалено комментариев: {deleted}")
+
+admin.site.register(Comment, CommentAdmin)
+
+
+class UserAdmin(ScheduledRemovalAdmin, auth_admin.UserAdmin):
+    pass
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
+
+
+class RemovalAdmin(admin.ModelAdmin):
+    """Ход фоновой очистки; строки пропадают, когда всё удалено."""
+
+    list_display = ('kind', 'label', 'object_id', 'stage', 'deleted', 'requested')
+    list_filter = ('kind',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Без строки очереди объект снова станет виден наполовину удалённым.
+        return False
 
-admin.site.register(Comment, CommentAdmin)
\ No newline at end of file
+admin.site.register(Removal, RemovalAdmin)
@@ -0,0 +1,109 @@
+"""Холодный архив старых постов.
+
+Почти все чтения приходятся на свежие посты, а ``posts_post`` с индексами
+растёт без предела и вытесняет горячие страницы из кеша SQLite. Команда
+``archive_posts`` переносит посты старше ``ARCHIVE_AFTER_DAYS`` вместе с
+комментариями в ``ArchivedPost`` и ``ArchivedComment``: текст сжат zlib, id
+прежние, индексы — только для профиля, страницы поста и удаления. Из
+горячих таблиц строки удаляются вместе с записями лент подписок, индекс
+поиска чистят триггеры SQLite.
+
+Архив читается прозрачно: ``get_post`` находит пост по старой ссылке, лента
+профиля после горячих постов продолжается архивными (``feeds.author``).
+Главная, группы, подписки и поиск показывают только горячие посты. Счётчики
+автора и группы архивные посты продолжают учитывать.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
+
+from BGG.transactions import atomic_write
+
+from . import counters, feed_cache, moderation
+from .models import ArchivedComment, ArchivedPost, Comment, Post, TimelineEntry
+from .removal import visible
+
+
+def archive_after():
+    return timedelta(days=getattr(settings, "ARCHIVE_AFTER_DAYS", 365))
+
+
+def batch_size():
+    return getattr(settings, "ARCHIVE_BATCH_SIZE", 500)
+
+
+def get_post(related=(), **lookup):
+    """Пост по ``lookup`` из горячей таблицы, а если его там нет — из архива."""
+    for model in (Post, ArchivedPost):
+        queryset = visible(model.objects.select_related(*related)).filter(**lookup)
+        for post in queryset[:1]:
+            return post
+    raise Http404("No Post matches the given query.")
+
+
+def _archived_post(post):
+    return ArchivedPost(
+        id=post.pk,
+        text=post.text,
+        pub_date=post.pub_date,
+        author_id=post.author_id,
+        group_id=post.group_id,
+        image=post.image.name or None,
+        comment_count=post.comment_count,
+        version=post.version,
+    )
+
+
+def _archived_comment(comment):
+    return ArchivedComment(
+        id=comment.pk,
+        post_id=comment.post_id,
+        author_id=comment.author_id,
+        text=comment.text,
+        created=comment.created,
+    )
+
+
+def archive_batch(before, size):
+    """Переносит в архив до ``size`` самых старых постов; сколько перенесено."""
+    with atomic_write():
+        posts = list(
+            Post.objects.filter(pub_date__lt=before).order_by("pub_date", "pk")[:size]
+        )
+        if not posts:
+            return 0
+        ids = [post.pk for post in posts]
+        selected = Post.objects.filter(pk__in=ids)
+        comments = Comment.objects.filter(post_id__in=ids)
+        scopes = moderation.feed_scopes(selected)
+        ArchivedPost.objects.bulk_create(map(_archived_post, posts), batch_size=size)
+        ArchivedComment.objects.bulk_create(
+            map(_archived_comment, comments.iterator(chunk_size=size)),
+            batch_size=size,
+        )
+        moderation.delete_rows(comments)
+        moderation.delete_rows(TimelineEntry.objects.filter(post_id__in=ids))
+        moderation.delete_rows(selected)
+        counters.bump_counter(counters.POSTS, -len(ids))
+        for author_id, count in Counter(post.author_id for post in posts).items():
+            counters.bump_author(author_id, archived_count=count)
+        transaction.on_commit(lambda: feed_cache.bump(*scopes))
+    return len(ids)
+
+
+def archive(before=None, size=None, report=None):
+    """Переносит в архив все посты старше ``before``; всего перенесено."""
+    before = before or timezone.now() - archive_after()
+    size = size or batch_size()
+    total = 0
+    while True:
+        moved = archive_batch(before, size)
+        if not moved:
+            return total
+        total += moved
+        if report is not None:
+            report(moved, total)
@@ -0,0 +1,116 @@
+"""Асинхронные варианты лент для запуска под ASGI.
+
+Под ASGI синхронная view занимает поток на весь запрос, а эти ждут базу, не
+блокируя цикл событий. Независимые запросы страницы (лента, счётчики автора,
+проверка подписки) выполняются параллельно, каждый в своём потоке со своим
+соединением: в WAL читатели SQLite друг другу не мешают. Отрисовка шаблона
+остаётся синхронной и идёт в общем потоке, как и обращения к сессии.
+
+Какие view обслуживают ленты, решает ``settings.ASYNC_FEED_VIEWS`` в
+``posts.urls``; ``BGG.asgi`` включает его по умолчанию.
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.auth.views import redirect_to_login
+from django.db import close_old_connections
+from django.http import Http404
+from django.shortcuts import render
+
+from . import feeds
+from .counters import author_stats
+from .feed_cache import POSTS, author_scope, cache_feed, group_scope
+from .models import Follow
+from .removal import visible_groups, visible_users
+
+
+def concurrently(*calls):
+    """Выполняет синхронные функции без аргументов параллельно в потоках."""
+
+    def isolated(call):
+        def run():
+            # Потоки пула живут дольше запроса: соединение проверяется
+            # так же, как в начале и в конце обычного запроса.
+            close_old_connections()
+            try:
+                return call()
+            finally:
+                close_old_connections()
+
+        return sync_to_async(run, thread_sensitive=False)()
+
+    return asyncio.gather(*(isolated(call) for call in calls))
+
+
+async def is_authenticated(request):
+    # request.user ленивый и при первом обращении читает сессию и базу.
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+async def get_or_404(queryset, **lookup):
+    try:
+        return await queryset.aget(**lookup)
+    except queryset.model.DoesNotExist:
+        raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+
+
+def login_required(view):
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        if not await is_authenticated(request):
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+
+    return wrapped
+
+
+async def arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+@cache_feed(POSTS)
+async def index(request):
+    page = await sync_to_async(lambda: feeds.latest().page(request))()
+    return await arender(request, "index.html", page)
+
+
+@cache_feed(group_scope("{slug}"))
+async def group_posts(request, slug):
+    group = await get_or_404(visible_groups(), slug=slug)
+    page = await sync_to_async(lambda: feeds.group(group).page(request))()
+    return await arender(request, "group.html", {"group": group, **page})
+
+
+@cache_feed(author_scope("{username}"))
+async def profile(request, username):
+    user = await get_or_404(
+        visible_users(User.objects.select_related("stats")), username=username
+    )
+    viewer = request.user if await is_authenticated(request) else None
+    page, stats, flag_subscribe = await concurrently(
+        lambda: feeds.author(user).page(request),
+        lambda: author_stats(user),
+        lambda: viewer is not None
+        and Follow.objects.filter(user=viewer, author=user).exists(),
+    )
+    return await arender(
+        request,
+        "profile.html",
+        {
+            **page,
+            "count_posts": stats.posts_count,
+            "user": user,
+            "flag_subscribe": flag_subscribe,
+            "count_subscribers": stats.followers_count,
+            "count_subscriptions": stats.following_count,
+        },
+    )
+
+
+@login_required
+async def follow_index(request):
+    # Лента подписок читает базу уже при сборке запроса.
+    page = await sync_to_async(lambda: feeds.following(request.user).page(request))()
+    return await arender(request, "follow.html", page)
@@ -0,0 +1,136 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются одним ``UPDATE ... SET x = x + 1`` через ``F()`` из
+сигналов создания и удаления ``Post``, ``Comment`` и ``Follow``. Строка
+``AuthorStats`` заводится при первом увеличении пересчётом с нуля, поэтому
+пользователи, созданные до появления счётчиков, тоже получают точные
+значения. Расхождения ищет и исправляет команда ``rebuild_stats``.
+
+Посты и комментарии в холодном архиве (``posts.archive``) по-прежнему
+считаются в счётчиках автора и группы; ``POSTS`` — число строк горячей
+таблицы, по нему админка оценивает её размер.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import (
+    ArchivedComment, ArchivedPost, AuthorStats, Comment, Counter, Follow, Group,
+    Post, User,
+)
+
+POSTS = "posts"
+
+COUNTERS = {
+    POSTS: lambda: Post.objects.count(),
+}
+
+
+# Счётчик и что он считает: модели и поле связи с пользователем.
+AUTHOR_COUNTS = {
+    "posts_count": ((Post, "author"), (ArchivedPost, "author")),
+    "comments_count": ((Comment, "author"), (ArchivedComment, "author")),
+    "followers_count": ((Follow, "author"),),
+    "following_count": ((Follow, "user"),),
+    "archived_count": ((ArchivedPost, "author"),),
+}
+
+
+def _count_of(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef("pk")})
+        .values(field)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def _total_of(*sources):
+    first, *rest = (_count_of(*source) for source in sources)
+    return sum(rest, first)
+
+
+def actual_author_counts():
+    """Точные счётчики всех пользователей одним запросом."""
+    return User.objects.annotate(
+        **{name: _total_of(*sources) for name, sources in AUTHOR_COUNTS.items()}
+    ).values_list("pk", *AUTHOR_COUNTS)
+
+
+def actual_group_counts():
+    return Group.objects.annotate(
+        actual=_total_of((Post, "group"), (ArchivedPost, "group"))
+    ).values_list("pk", "actual")
+
+
+def count_author(user_id):
+    return {
+        name: sum(
+            model.objects.filter(**{f"{field}_id": user_id}).count()
+            for model, field in sources
+        )
+        for name, sources in AUTHOR_COUNTS.items()
+    }
+
+
+def rebuild_author(user_id):
+    stats, _ = AuthorStats.objects.update_or_create(
+        user_id=user_id, defaults=count_author(user_id)
+    )
+    return stats
+
+
+def author_stats(user):
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        return rebuild_author(user.pk)
+
+
+def bump_author(user_id, **deltas):
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    # Пересчёт уже учитывает только что сохранённый объект. При удалении
+    # строку не заводим: пользователь может удаляться каскадом.
+    if not updated and min(deltas.values()) > 0:
+        rebuild_author(user_id)
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(posts_count=F("posts_count") + delta)
+
+
+def bump_comments(post_id, delta):
+    # Версия меняется вместе со счётчиком: карточка поста в кеше устарела.
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F("comment_count") + delta, version=F("version") + 1
+    )
+
+
+def drifted_comment_counts():
+    """Посты, у которых ``comment_count`` разошёлся с числом комментариев."""
+    return (
+        Post.objects.annotate(actual=_count_of(Comment, "post"))
+        .exclude(comment_count=F("actual"))
+        .values_list("pk", "comment_count", "actual")
+    )
+
+
+def rebuild_counter(name):
+    counter, _ = Counter.objects.update_or_create(
+        name=name, defaults={"value": COUNTERS[name]()}
+    )
+    return counter
+
+
+def bump_counter(name, delta):
+    updated = Counter.objects.filter(name=name).update(value=F("value") + delta)
+    if not updated:
+        rebuild_counter(name)
+
+
+def get_counter(name):
+    counter = Counter.objects.filter(name=name).first()
+    return counter.value if counter else None
@@ -0,0 +1,157 @@
+"""Архив данных пользователя в ZIP, собираемый потоком.
+
+Строки читаются ``iterator(chunk_size=...)``, картинки — кусками из
+хранилища, а ZIP пишется в буфер, который отдаётся и очищается после каждой
+порции. Ни архив целиком, ни список постов в памяти не держатся, поэтому
+память не зависит от размера аккаунта. Записи в NDJSON — в формате
+``import_content``: распакованный архив можно импортировать обратно.
+Посты и комментарии из холодного архива (``posts.archive``) идут следом
+за горячими.
+"""
+import itertools
+import json
+import time
+import zipfile
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, Post, User,
+)
+
+CHUNK_SIZE = 2000
+
+# Сколько байт архива копится перед отдачей; столько же читается из картинки.
+BLOCK_SIZE = 64 * 1024
+
+
+class _Buffer:
+    """Поток без seek: zipfile пишет сюда, генератор забирает байты."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        return data
+
+
+def _rows(querysets, fields, chunk_size):
+    """Строки горячей таблицы и архива подряд, каждая по ``pk``."""
+    return itertools.chain.from_iterable(
+        queryset.values_list(*fields).order_by("pk").iterator(chunk_size)
+        for queryset in querysets
+    )
+
+
+def _records(user, chunk_size):
+    """Файлы архива: имя и поток записей в порядке зависимостей."""
+    follows = Follow.objects.filter(Q(user=user) | Q(author=user))
+    # Чужие профили в архиве не нужны: подписки ссылаются только на имя.
+    people = User.objects.filter(
+        Q(follower__author=user) | Q(following__user=user)
+    ).exclude(pk=user.pk).distinct()
+    owner = {
+        "type": "user", "id": user.pk, "username": user.username,
+        "email": user.email, "first_name": user.first_name,
+        "last_name": user.last_name, "date_joined": user.date_joined,
+    }
+    yield "users.ndjson", itertools.chain([owner], (
+        {"type": "user", "id": pk, "username": username}
+        for pk, username in people.values_list(
+            "pk", "username"
+        ).order_by("pk").iterator(chunk_size)
+    ))
+    yield "groups.ndjson", (
+        {"type": "group", "id": pk, "slug": slug, "title": title,
+         "description": description}
+        for pk, slug, title, description in Group.objects.filter(
+            Q(pk__in=Post.objects.filter(author=user).values("group"))
+            | Q(pk__in=ArchivedPost.objects.filter(author=user).values("group"))
+        ).values_list(
+            "pk", "slug", "title", "description"
+        ).order_by("pk").iterator(chunk_size)
+    )
+    yield "posts.ndjson", (
+        {"type": "post", "id": pk, "author": user.pk, "group": group_id,
+         "text": text, "pub_date": pub_date, "image": image or None}
+        for pk, group_id, text, pub_date, image in _rows(
+            [Post.objects.filter(author=user),
+             ArchivedPost.objects.filter(author=user)],
+            ("pk", "group_id", "text", "pub_date", "image"),
+            chunk_size,
+        )
+    )
+    yield "comments.ndjson", (
+        {"type": "comment", "id": pk, "post": post_id, "author": user.pk,
+         "text": text, "created": created}
+        for pk, post_id, text, created in _rows(
+            [Comment.objects.filter(author=user),
+             ArchivedComment.objects.filter(author=user)],
+            ("pk", "post_id", "text", "created"),
+            chunk_size,
+        )
+    )
+    yield "follows.ndjson", (
+        {"type": "follow", "user": user_id, "author": author_id}
+        for user_id, author_id in follows.values_list(
+            "user_id", "author_id"
+        ).order_by("pk").iterator(chunk_size)
+    )
+
+
+def _images(user, chunk_size):
+    return (
+        name
+        for name, in _rows(
+            [model.objects.filter(author=user).exclude(image="").exclude(image=None)
+             for model in (Post, ArchivedPost)],
+            ("image",),
+            chunk_size,
+        )
+    )
+
+
+def archive(user, chunk_size=CHUNK_SIZE):
+    """Генератор байтов ZIP-архива с данными ``user``."""
+    buffer = _Buffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+        for name, records in _records(user, chunk_size):
+            # Размер заранее не известен: zip64 на случай большого аккаунта.
+            with bundle.open(name, "w", force_zip64=True) as entry:
+                for record in records:
+                    entry.write(
+                        json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False)
+                        .encode() + b"\n"
+                    )
+                    if buffer.size >= BLOCK_SIZE:
+                        yield buffer.drain()
+
+        for name in _images(user, chunk_size):
+            try:
+                source = default_storage.open(name)
+            except (OSError, SuspiciousFileOperation):
+                continue
+            # Картинки уже сжаты: кладём как есть.
+            info = zipfile.ZipInfo(f"media/{name}", time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with source, bundle.open(info, "w", force_zip64=True) as entry:
+                while block := source.read(BLOCK_SIZE):
+                    entry.write(block)
+                    yield buffer.drain()
+    # Остаток и центральный каталог, который zipfile пишет при закрытии.
+    yield buffer.drain()
@@ -0,0 +1,128 @@
+"""Версионированный кеш страниц лент.
+
+Каждая область (вся лента, группа, автор) имеет счётчик поколения в кеше.
+Ключ страницы включает поколения всех её областей, поэтому сигналы
+изменения постов, комментариев, групп и подписок не удаляют страницы, а
+просто увеличивают счётчик — старые версии перестают читаться и вытесняются
+по таймауту. Анонимы и авторизованные пользователи получают разные варианты,
+а автор сразу после своей записи обходит кеш (read-your-writes). Если
+поколение сменилось, пока страница собиралась, она могла прочитать данные
+до изменения и не сохраняется.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from BGG import metrics
+
+POSTS = "posts"
+RYW_SESSION_KEY = "feed_cache_ryw_until"
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def author_scope(username):
+    return f"author:{username}"
+
+
+def _generation_key(scope):
+    return f"feed-gen:{scope}"
+
+
+def generations(scopes):
+    keys = [_generation_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Начальное значение от времени: после вытеснения счётчика
+            # поколение не совпадёт ни с одной из старых страниц.
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def mark_write(request):
+    """Автор только что писал: ближайшие запросы идут мимо кеша."""
+    request.session[RYW_SESSION_KEY] = time.time() + getattr(
+        settings, "FEED_CACHE_RYW_SECONDS", 10
+    )
+
+
+def recent_writer(request):
+    if not request.user.is_authenticated:
+        return False
+    return request.session.get(RYW_SESSION_KEY, 0) > time.time()
+
+
+def _lookup(request, scopes, kwargs):
+    """Страница для ``_store`` и ответ из кеша; без страницы не кешируем.
+
+    Страница — ключ, области и их поколения на момент чтения.
+    """
+    if request.method != "GET" or recent_writer(request):
+        return None, None
+    names = [scope.format(**kwargs) for scope in scopes]
+    seen = generations(names)
+    variant = request.user.pk if request.user.is_authenticated else "anon"
+    raw = f"{request.get_full_path()}|{variant}|{seen}"
+    key = "feed-page:" + hashlib.md5(raw.encode()).hexdigest()
+    response = cache.get(key)
+    metrics.CACHE_REQUESTS.inc("feed", "miss" if response is None else "hit")
+    return (key, names, seen), response
+
+
+def _store(page, response):
+    if page is None or response.status_code != 200 or response.cookies:
+        return
+    key, names, seen = page
+    # Запись закоммитилась, пока view читала базу (или отстающую реплику):
+    # ответ мог её не увидеть, а ключ уже устарел.
+    if generations(names) != seen:
+        return
+    cache.set(key, response, getattr(settings, "FEED_CACHE_TIMEOUT", 600))
+
+
+def cache_feed(*scopes):
+    """Кеширует страницу ленты; ``scopes`` — шаблоны областей по kwargs view.
+
+    Подходит и для асинхронных view: сессия и кеш читаются в потоке.
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def wrapped(request, *args, **kwargs):
+                page, response = await sync_to_async(_lookup)(request, scopes, kwargs)
+                if response is None:
+                    response = await view(request, *args, **kwargs)
+                    await sync_to_async(_store)(page, response)
+                return response
+
+            return wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            page, response = _lookup(request, scopes, kwargs)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                _store(page, response)
+            return response
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,85 @@
+"""Единый слой запросов для лент постов.
+
+Все четыре ленты (главная, группа, профиль, подписки) строятся здесь и
+читают одинаковый набор колонок: карточке нужны автор и группа одним JOIN,
+счётчик комментариев из ``Post.comment_count`` и начало текста. Полный текст
+поста в ленту не грузится — вместо него аннотация ``excerpt`` и признак
+``truncated``, чтобы длинные посты не раздували каждую страницу.
+
+Лента профиля после последнего горячего поста продолжается в холодном
+архиве (``posts.archive``). Текст там сжат, поэтому начало текста для
+архивных карточек вырезается уже после чтения страницы.
+"""
+from django.conf import settings
+from django.db.models.functions import Length, Substr
+from django.db.models.lookups import GreaterThan
+
+from . import timeline
+from .counters import author_stats
+from .models import ArchivedPost, Post
+from .pagination import KEYS, PER_PAGE, paginate
+from .removal import visible
+
+# Колонки карточки поста; всё остальное остаётся отложенным.
+CARD_FIELDS = (
+    "pub_date",
+    "image",
+    "comment_count",
+    "version",
+    "author__username",
+    "group__slug",
+    "group__title",
+)
+
+
+def excerpt_length():
+    return getattr(settings, "FEED_EXCERPT_LENGTH", 1000)
+
+
+class Feed:
+    def __init__(self, queryset, keys=KEYS, archived=None):
+        length = excerpt_length()
+        # Авторы и группы, ожидающие удаления (``posts.removal``), скрыты.
+        self.queryset = (
+            visible(queryset)
+            .select_related("author", "group")
+            .only(*CARD_FIELDS)
+            .annotate(
+                excerpt=Substr("text", 1, length),
+                truncated=GreaterThan(Length("text"), length),
+            )
+        )
+        self.keys = keys
+        self.rest = []
+        if archived is not None:
+            self.rest.append(visible(archived).select_related("author", "group"))
+
+    def page(self, request, per_page=PER_PAGE):
+        """Контекст страницы ленты, как у ``pagination.paginate``."""
+        context = paginate(request, self.queryset, per_page, self.keys, self.rest)
+        length = excerpt_length()
+        for post in context["cursor"]:
+            if isinstance(post, ArchivedPost):
+                post.excerpt = post.text[:length]
+                post.truncated = len(post.text) > length
+        return context
+
+
+def latest():
+    return Feed(Post.objects.all())
+
+
+def group(group):
+    return Feed(Post.objects.filter(group=group))
+
+
+def author(user):
+    # Счётчик читается вместе с пользователем: архив без постов не запрашиваем.
+    archived = None
+    if author_stats(user).archived_count:
+        archived = ArchivedPost.objects.filter(author=user)
+    return Feed(Post.objects.filter(author=user), archived=archived)
+
+
+def following(user):
+    return Feed(timeline.follow_feed(user), keys=timeline.FEED_KEYS)
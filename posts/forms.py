@@ -1,6 +1,7 @@
 from django import forms
 from django.forms import ModelForm
 from posts.models import Post, Comment
+from posts.removal import visible_groups
 
 
 
@@ -13,6 +14,11 @@ class PostForm(ModelForm):
             'image': 'Изображение',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Группа, ожидающая удаления, уже скрыта: писать в неё нельзя.
+        self.fields['group'].queryset = visible_groups()
+
 
 class CommentForm(ModelForm):
     text = forms.CharField(widget=forms.Textarea)
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = "Переносит старые посты с комментариями в холодный архив"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, help="Старше скольких дней (ARCHIVE_AFTER_DAYS)"
+        )
+        parser.add_argument(
+            "--batch-size", type=int, help="Постов в одной транзакции"
+        )
+
+    def handle(self, *args, days=None, batch_size=None, **options):
+        age = archive.archive_after() if days is None else timedelta(days=days)
+        before = timezone.now() - age
+        moved = archive.archive(before, batch_size, report=self.report)
+        self.stdout.write(self.style.SUCCESS(
+            f"В архиве постов старше {before:%Y-%m-%d}: перенесено {moved}"
+        ))
+
+    def report(self, moved, total):
+        self.stdout.write(f"перенесено {moved}, всего {total}")
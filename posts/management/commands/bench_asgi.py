@@ -0,0 +1,195 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+
+from posts.models import Follow, Group, Post
+
+MODES = ("wsgi", "asgi")
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузка на ленты (index, group, profile, follow) через WSGIHandler "
+        "из потоков и через ASGIHandler с асинхронными view: запросов в секунду "
+        "и задержка p50/p99"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument(
+            "--mode", choices=MODES, action="append",
+            help="По умолчанию — оба режима по очереди",
+        )
+        parser.add_argument(
+            "--cached", action="store_true",
+            help="Не отключать кеш страниц лент: мерить отдачу из кеша",
+        )
+        # Внутренний флаг: режим выполняется в отдельном процессе, потому что
+        # ASYNC_FEED_VIEWS читается при загрузке urls.
+        parser.add_argument("--serve", choices=MODES, help="==SUPPRESS==")
+        parser.add_argument("--database", help="==SUPPRESS==")
+
+    def handle(self, *args, concurrency, seconds, mode, cached, serve, database,
+               **options):
+        if serve:
+            return self.serve(serve, database, concurrency, seconds, cached)
+        source = str(connections["default"].settings_dict["NAME"])
+        directory = tempfile.mkdtemp()
+        copy = os.path.join(directory, "bench.sqlite3")
+        # Вход читателя пишет сессию: гоняем нагрузку на копии базы.
+        with sqlite3.connect(source) as primary, sqlite3.connect(copy) as target:
+            primary.backup(target)
+        try:
+            for name in mode or MODES:
+                command = [
+                    sys.executable, "-m", "django", "bench_asgi",
+                    "--serve", name, "--database", copy,
+                    "--concurrency", str(concurrency), "--seconds", str(seconds),
+                ]
+                if cached:
+                    command.append("--cached")
+                env = {**os.environ, "ASYNC_FEED_VIEWS": "1" if name == "asgi" else "0"}
+                env.setdefault("DJANGO_SETTINGS_MODULE", "BGG.settings")
+                if subprocess.run(command, env=env, cwd=settings.BASE_DIR).returncode:
+                    raise CommandError(f"Режим {name} завершился с ошибкой")
+        finally:
+            shutil.rmtree(directory)
+
+    def serve(self, mode, database, concurrency, seconds, cached):
+        for alias in ("default", "replica"):
+            connections.settings[alias]["NAME"] = database
+        if cached:
+            return self.run(mode, concurrency, seconds)
+        dummy = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        with override_settings(CACHES=dummy):
+            return self.run(mode, concurrency, seconds)
+
+    def seed(self, posts=200):
+        """Автор с постами в группе и подписанный на него читатель."""
+        users = get_user_model().objects
+        author, created = users.get_or_create(username="bench-author")
+        reader = users.get_or_create(username="bench-reader")[0]
+        group = Group.objects.get_or_create(
+            slug="bench", defaults={"title": "Нагрузка", "description": "Нагрузка"}
+        )[0]
+        if created:
+            Follow.objects.create(user=reader, author=author)
+            for i in range(posts):
+                Post.objects.create(
+                    text=f"Пост для нагрузки {i} " * 20, author=author, group=group
+                )
+        return author, reader, group
+
+    def run(self, mode, concurrency, seconds):
+        author, reader, group = self.seed()
+        client = Client()
+        client.force_login(reader)
+        cookie = f"{settings.SESSION_COOKIE_NAME}=" + (
+            client.cookies[settings.SESSION_COOKIE_NAME].value
+        )
+        urls = ["/", f"/group/{group.slug}/", f"/{author.username}/", "/follow/"]
+        connections.close_all()
+
+        run = self.run_wsgi if mode == "wsgi" else self.run_asgi
+        started = time.monotonic()
+        latencies, errors = run(urls, cookie, concurrency, started + seconds)
+        elapsed = time.monotonic() - started
+
+        if len(latencies) < 2:
+            raise CommandError("Слишком мало запросов: увеличьте --seconds")
+        cuts = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{mode}: {len(latencies) / elapsed:.0f} запросов/с, "
+            f"p50 {cuts[49] * 1000:.1f} мс, p99 {cuts[98] * 1000:.1f} мс, "
+            f"ошибок {errors} (параллельно {concurrency})"
+        )
+
+    def run_wsgi(self, urls, cookie, concurrency, deadline):
+        handler = WSGIHandler()
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+
+        def worker(offset):
+            done, failed = [], 0
+            while time.monotonic() < deadline:
+                url = urls[(offset + len(done) + failed) % len(urls)]
+                environ = {"PATH_INFO": url, "HTTP_COOKIE": cookie,
+                           "wsgi.input": BytesIO()}
+                setup_testing_defaults(environ)
+                status = []
+                started = time.perf_counter()
+                body = b"".join(handler(environ, lambda s, h: status.append(s)))
+                if status[0].startswith("200") and body:
+                    done.append(time.perf_counter() - started)
+                else:
+                    failed += 1
+            connections.close_all()
+            with lock:
+                latencies.extend(done)
+                errors[0] += failed
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        return latencies, errors[0]
+
+    def run_asgi(self, urls, cookie, concurrency, deadline):
+        handler = ASGIHandler()
+        latencies, errors = [], [0]
+
+        async def request(url):
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+                "method": "GET", "scheme": "http", "path": url,
+                "raw_path": url.encode(), "query_string": b"", "root_path": "",
+                "headers": [(b"host", b"127.0.0.1"), (b"cookie", cookie.encode())],
+                "client": ("127.0.0.1", 0), "server": ("127.0.0.1", 80),
+            }
+            messages = []
+
+            async def receive():
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            async def send(message):
+                messages.append(message)
+
+            await handler(scope, receive, send)
+            return messages[0]["status"], b"".join(m.get("body", b"") for m in messages)
+
+        async def worker(offset):
+            sent = 0
+            while time.monotonic() < deadline:
+                url = urls[(offset + sent) % len(urls)]
+                sent += 1
+                started = time.perf_counter()
+                status, body = await request(url)
+                if status == 200 and body:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[0] += 1
+
+        async def main():
+            await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+        asyncio.run(main())
+        return latencies, errors[0]
@@ -0,0 +1,69 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from django.core.management.commands.createcachetable import (
+    Command as CreateCacheTable,
+)
+from django.db import DEFAULT_DB_ALIAS, connection
+
+from BGG.cache import SQLiteCache
+
+TABLE = "bench_cache_entries"
+
+
+class Command(BaseCommand):
+    help = "Сравнивает задержку кеша SQLite с LocMemCache и кешем в базе"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--operations", type=int, default=2000)
+        parser.add_argument("--value-size", type=int, default=4096,
+                            help="Размер значения в байтах, как у карточки поста")
+
+    def handle(self, *args, operations, value_size, **options):
+        directory = tempfile.mkdtemp()
+        backends = {
+            "locmem": LocMemCache("bench", {"OPTIONS": {"MAX_ENTRIES": operations * 2}}),
+            "database": DatabaseCache(TABLE, {"OPTIONS": {"MAX_ENTRIES": operations * 2}}),
+            "sqlite": SQLiteCache(
+                os.path.join(directory, "cache.sqlite3"),
+                {"OPTIONS": {"MAX_ENTRIES": operations * 2}},
+            ),
+        }
+        creator = CreateCacheTable()
+        creator.verbosity = 0
+        creator.create_table(DEFAULT_DB_ALIAS, TABLE, dry_run=False)
+        try:
+            value = "x" * value_size
+            for name, cache in backends.items():
+                cache.set("counter", 0)
+                timings = {
+                    "set": [self.timed(cache.set, f"key{i}", value)
+                            for i in range(operations)],
+                    "get": [self.timed(cache.get, f"key{i}")
+                            for i in range(operations)],
+                    "get_many": [
+                        self.timed(cache.get_many, [f"key{j}" for j in range(i, i + 10)])
+                        for i in range(0, operations, 10)
+                    ],
+                    "incr": [self.timed(cache.incr, "counter")
+                             for _ in range(operations)],
+                }
+                self.stdout.write(name + ": " + ", ".join(
+                    f"{op} p50 {statistics.median(values):.1f} мкс"
+                    for op, values in timings.items()
+                ))
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {connection.ops.quote_name(TABLE)}")
+            shutil.rmtree(directory)
+
+    def timed(self, method, *args):
+        started = time.perf_counter()
+        method(*args)
+        return (time.perf_counter() - started) * 1_000_000
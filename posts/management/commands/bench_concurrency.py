@@ -0,0 +1,115 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.test import Client
+
+from posts.models import Post
+
+PROFILES = {
+    # Как до настройки: стандартный бэкенд, журнал DELETE, соединение на запрос.
+    "baseline": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "CONN_MAX_AGE": 0,
+        "OPTIONS": {},
+    },
+    "tuned": {},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Смешанная нагрузка из потоков на index и add_comment: пропускная "
+        "способность и ошибки блокировки для стандартного и настроенного SQLite"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--write-ratio", type=float, default=0.2)
+        parser.add_argument(
+            "--profile", choices=PROFILES, action="append",
+            help="По умолчанию — оба профиля по очереди",
+        )
+
+    def handle(self, *args, threads, seconds, write_ratio, profile, **options):
+        source = str(connections["default"].settings_dict["NAME"])
+        for name in profile or list(PROFILES):
+            directory = tempfile.mkdtemp()
+            copy = os.path.join(directory, "bench.sqlite3")
+            # Нагрузка идёт на копию, чтобы не засорять рабочую базу.
+            with sqlite3.connect(source) as primary, sqlite3.connect(copy) as target:
+                primary.backup(target)
+                # Режим журнала хранится в файле: копия не должна унаследовать WAL.
+                target.execute(
+                    f"PRAGMA journal_mode = {'DELETE' if name == 'baseline' else 'WAL'}"
+                )
+            try:
+                self.run_profile(name, copy, threads, seconds, write_ratio)
+            finally:
+                shutil.rmtree(directory)
+
+    def run_profile(self, name, path, threads, seconds, write_ratio):
+        # Потоки открывают свои соединения по connections.settings: подменяем
+        # их на время прогона и возвращаем как было.
+        original = {
+            alias: dict(connections.settings[alias]) for alias in ("default", "replica")
+        }
+        connections.close_all()
+        for alias in original:
+            connections.settings[alias].update(NAME=path, **PROFILES[name])
+        try:
+            author = get_user_model().objects.get_or_create(username="bench")[0]
+            post = Post.objects.create(text="Пост для нагрузки", author=author)
+            url = f"/{author.username}/{post.id}/comment/"
+
+            totals = {"reads": 0, "writes": 0, "locked": 0, "errors": 0}
+            lock = threading.Lock()
+            deadline = time.monotonic() + seconds
+
+            def worker():
+                client = Client()
+                client.force_login(author)
+                counts = dict.fromkeys(totals, 0)
+                while time.monotonic() < deadline:
+                    write = random.random() < write_ratio
+                    try:
+                        if write:
+                            client.post(url, data={"text": "Нагрузочный комментарий"})
+                        else:
+                            client.get("/")
+                        counts["writes" if write else "reads"] += 1
+                    except OperationalError as error:
+                        key = "locked" if "locked" in str(error) else "errors"
+                        counts[key] += 1
+                connections.close_all()
+                with lock:
+                    for key, value in counts.items():
+                        totals[key] += value
+
+            pool = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.monotonic()
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            elapsed = time.monotonic() - started
+        finally:
+            connections.close_all()
+            for alias, values in original.items():
+                connections.settings[alias].clear()
+                connections.settings[alias].update(values)
+
+        done = totals["reads"] + totals["writes"]
+        self.stdout.write(
+            f"{name}: {done / elapsed:.0f} запросов/с "
+            f"(чтений {totals['reads']}, записей {totals['writes']}), "
+            f"database is locked: {totals['locked']}, других ошибок: {totals['errors']}"
+        )
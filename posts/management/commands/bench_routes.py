@@ -0,0 +1,266 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+ROUTES = (
+    "index", "group_posts", "post", "profile", "follow_index",
+    "add_comment", "new_post",
+)
+
+# Сколько целей (постов, читателей) выбирается из базы на прогон.
+TARGETS = 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузка на все именованные маршруты posts: пропускная способность, "
+        "p50/p95/p99 и запросов к базе на ответ; отчёт в JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200,
+                            help="Запросов на каждый маршрут")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--route", choices=ROUTES, action="append",
+                            help="По умолчанию — все маршруты")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="Файл отчёта; по умолчанию stdout")
+        parser.add_argument("--compare", help="Прошлый отчёт для сравнения")
+        parser.add_argument("--cached", action="store_true",
+                            help="Не отключать кеш: мерить отдачу из кеша")
+        parser.add_argument(
+            "--in-place", action="store_true",
+            help="Писать в рабочую базу, а не в копию (прогоны станут несравнимы)",
+        )
+
+    def handle(self, *args, requests, concurrency, route, seed, output, compare,
+               cached, in_place, **options):
+        routes = route or list(ROUTES)
+        with ExitStack() as stack:
+            if not in_place:
+                stack.enter_context(self.database_copy())
+            if not cached:
+                stack.enter_context(override_settings(CACHES={
+                    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+                }))
+            report = self.run(routes, requests, concurrency, seed)
+            report["options"] = {
+                "requests": requests, "concurrency": concurrency, "seed": seed,
+                "cached": cached, "in_place": in_place,
+            }
+
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if output:
+            with open(output, "w", encoding="utf-8") as target:
+                target.write(text + "\n")
+        else:
+            self.stdout.write(text)
+        if compare:
+            with open(compare, encoding="utf-8") as source:
+                self.compare(json.load(source), report)
+
+    @contextmanager
+    def database_copy(self):
+        """Прогон на копии базы: записи не копятся от прогона к прогону."""
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "bench.sqlite3")
+        source = str(connections["default"].settings_dict["NAME"])
+        with sqlite3.connect(source) as primary, sqlite3.connect(path) as target:
+            primary.backup(target)
+        original = {
+            alias: connections.settings[alias]["NAME"] for alias in ("default", "replica")
+        }
+        connections.close_all()
+        for alias in original:
+            connections.settings[alias]["NAME"] = path
+        try:
+            yield
+        finally:
+            connections.close_all()
+            for alias, name in original.items():
+                connections.settings[alias]["NAME"] = name
+            shutil.rmtree(directory)
+
+    def dataset(self):
+        return {
+            "users": get_user_model().objects.count(),
+            "groups": Group.objects.count(),
+            "posts": Post.objects.count(),
+            "comments": Comment.objects.count(),
+            "follows": Follow.objects.count(),
+        }
+
+    def sample(self, queryset, rng):
+        """До TARGETS строк со случайными pk, одинаковых при одном seed."""
+        last = queryset.aggregate(last=Max("pk"))["last"] or 0
+        candidates = rng.sample(range(1, last + 1), min(last, TARGETS * 3))
+        return list(queryset.filter(pk__in=candidates).order_by("pk")[:TARGETS])
+
+    def plan(self, routes, requests, rng):
+        posts = self.sample(Post.objects.select_related("author", "group"), rng)
+        follows = self.sample(Follow.objects.select_related("user"), rng)
+        if not posts or not follows:
+            raise CommandError("Нужны посты и подписки: запустите seed_synthetic")
+        groups = [post.group.slug for post in posts if post.group_id]
+        if "group_posts" in routes and not groups:
+            groups = list(Group.objects.values_list("slug", flat=True)[:TARGETS])
+            if not groups:
+                raise CommandError("Нет групп для group_posts")
+
+        def target(name):
+            post = rng.choice(posts)
+            post_kwargs = {"username": post.author.username, "post_id": post.pk}
+            return {
+                "index": ("get", reverse("index"), None),
+                "group_posts": (
+                    "get", reverse("group_posts", args=[rng.choice(groups or [""])]),
+                    None,
+                ),
+                "post": ("get", reverse("post", kwargs=post_kwargs), None),
+                "profile": ("get", reverse("profile", args=[post.author.username]), None),
+                "follow_index": ("get", reverse("follow_index"), None),
+                "add_comment": (
+                    "post", reverse("add_comment", kwargs=post_kwargs),
+                    {"text": "Комментарий нагрузочного прогона"},
+                ),
+                "new_post": (
+                    "post", reverse("new_post"), {"text": "Пост нагрузочного прогона"}
+                ),
+            }[name]
+
+        steps = [(name, *target(name)) for name in routes for _ in range(requests)]
+        rng.shuffle(steps)
+        readers = list(dict.fromkeys(follow.user for follow in follows))
+        return steps, readers
+
+    def run(self, routes, requests, concurrency, seed):
+        rng = random.Random(seed)
+        dataset = self.dataset()
+        steps, readers = self.plan(routes, requests, rng)
+        results = {name: {"latencies": [], "queries": [], "errors": 0} for name in routes}
+        lock = threading.Lock()
+        cursor = iter(steps)
+        aliases = list(connections.settings)
+
+        def worker(number):
+            client = Client()
+            client.force_login(readers[number % len(readers)])
+            while True:
+                with lock:
+                    step = next(cursor, None)
+                if step is None:
+                    break
+                name, method, url, data = step
+                with ExitStack() as stack:
+                    contexts = [
+                        stack.enter_context(CaptureQueriesContext(connections[alias]))
+                        for alias in aliases
+                    ]
+                    started = time.perf_counter()
+                    response = getattr(client, method)(url, data=data)
+                    elapsed = time.perf_counter() - started
+                queries = sum(len(context) for context in contexts)
+                with lock:
+                    result = results[name]
+                    if response.status_code in (200, 302):
+                        result["latencies"].append(elapsed)
+                        result["queries"].append(queries)
+                    else:
+                        result["errors"] += 1
+            connections.close_all()
+
+        pool = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        started = time.monotonic()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "environment": {
+                "commit": self.commit(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": connections["default"].vendor,
+            },
+            "dataset": dataset,
+            "total": {
+                "requests": len(steps),
+                "seconds": round(elapsed, 3),
+                "throughput": round(len(steps) / elapsed, 1),
+            },
+            "routes": {
+                name: self.summary(result) for name, result in results.items()
+            },
+        }
+
+    def summary(self, result):
+        latencies, queries = result["latencies"], result["queries"]
+        summary = {"requests": len(latencies), "errors": result["errors"]}
+        if len(latencies) < 2:
+            return summary
+        cuts = statistics.quantiles(latencies, n=100)
+        summary.update({
+            "p50_ms": round(cuts[49] * 1000, 2),
+            "p95_ms": round(cuts[94] * 1000, 2),
+            "p99_ms": round(cuts[98] * 1000, 2),
+            "queries_mean": round(statistics.fmean(queries), 2),
+            "queries_max": max(queries),
+        })
+        return summary
+
+    def commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def compare(self, before, after):
+        if before.get("dataset") != after.get("dataset"):
+            self.stderr.write(self.style.WARNING(
+                f"Наборы данных различаются: {before.get('dataset')} и {after['dataset']}"
+            ))
+        if before.get("options") != after.get("options"):
+            self.stderr.write(self.style.WARNING("Параметры прогонов различаются"))
+        lines = [
+            f"{'маршрут':<14}{'p50, мс':>26}{'p99, мс':>26}{'запросов':>22}"
+        ]
+        for name, now in after["routes"].items():
+            was = before.get("routes", {}).get(name, {})
+            cells = []
+            for key, width in (("p50_ms", 26), ("p99_ms", 26), ("queries_mean", 22)):
+                old, new = was.get(key), now.get(key)
+                if old is None or new is None:
+                    cells.append(f"{'—':>{width}}")
+                    continue
+                change = (new - old) / old * 100 if old else 0
+                cells.append(f"{f'{old} → {new} ({change:+.0f}%)':>{width}}")
+            lines.append(f"{name:<14}" + "".join(cells))
+        self.stderr.write("\n".join(lines))
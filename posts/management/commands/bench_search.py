@@ -0,0 +1,107 @@
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import search
+from posts.synthetic import VOCABULARY, WEIGHTS
+
+
+class Command(BaseCommand):
+    help = "Меряет задержку полнотекстового поиска на синтетическом корпусе"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--comments-per-post", type=float, default=0.5)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--like", action="store_true",
+                            help="Сравнить с LIKE '%%q%%' по таблице")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, posts, comments_per_post, queries, like, seed,
+               **options):
+        rng = random.Random(seed)
+        directory = tempfile.mkdtemp()
+        db = sqlite3.connect(os.path.join(directory, "search.sqlite3"))
+        db.executescript(
+            """
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+            CREATE TABLE posts_comment (
+                id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, text TEXT NOT NULL
+            );
+            CREATE INDEX posts_comment_post ON posts_comment (post_id);
+            """
+        )
+        for statement in search.SCHEMA:
+            db.execute(statement)
+
+        def text():
+            words = rng.choices(
+                VOCABULARY, cum_weights=WEIGHTS, k=rng.randint(8, 40)
+            )
+            return " ".join(words)
+
+        started = time.perf_counter()
+        with db:
+            db.executemany(
+                "INSERT INTO posts_post (id, text) VALUES (?, ?)",
+                ((pk, text()) for pk in range(1, posts + 1)),
+            )
+            db.executemany(
+                "INSERT INTO posts_comment (post_id, text) VALUES (?, ?)",
+                (
+                    (rng.randint(1, posts), text())
+                    for _ in range(int(posts * comments_per_post))
+                ),
+            )
+        self.stdout.write(
+            f"Корпус: {posts} постов, "
+            f"загрузка {time.perf_counter() - started:.1f} с"
+        )
+
+        # Запросы из слов средней частоты: самые частые слова — как стоп-слова.
+        terms = [
+            " ".join(rng.sample(VOCABULARY[100:5000], rng.randint(1, 2)))
+            for _ in range(queries)
+        ]
+        self.report("fts5", [
+            self.timed(db, *search.hits_query(search.match_query(term), limit=10))
+            for term in terms
+        ])
+        if like:
+            self.report("like", [
+                self.timed(
+                    db,
+                    "SELECT id FROM posts_post WHERE text LIKE ? "
+                    "ORDER BY id DESC LIMIT 10",
+                    [f"%{term.split()[0]}%"],
+                )
+                for term in terms[:max(1, queries // 20)]
+            ])
+        db.close()
+        shutil.rmtree(directory)
+
+    def timed(self, db, sql, params):
+        if isinstance(params, dict):
+            # Именованные параметры Django (``%(name)s``) в стиле sqlite3.
+            sql = re.sub(r"%\((\w+)\)s", r":\1", sql)
+        started = time.perf_counter()
+        db.execute(sql, params).fetchall()
+        return (time.perf_counter() - started) * 1000
+
+    def report(self, name, timings):
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"{name}: запросов {len(timings)}, "
+            f"p50 {statistics.median(timings):.2f} мс, "
+            f"p95 {p95:.2f} мс, max {timings[-1]:.2f} мс"
+        )
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = "Пишет ZIP-архив данных пользователя: посты, комментарии, подписки, картинки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("username")
+        parser.add_argument("-o", "--output", help="По умолчанию <username>.zip")
+        parser.add_argument("--chunk-size", type=int, default=export.CHUNK_SIZE)
+
+    def handle(self, *args, username, output, chunk_size, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"Нет пользователя {username}")
+        output = output or f"{username}.zip"
+        size = 0
+        with open(output, "wb") as target:
+            for chunk in export.archive(user, chunk_size):
+                target.write(chunk)
+                size += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"{output}: {size} байт"))
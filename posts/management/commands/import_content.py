@@ -0,0 +1,81 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует пользователей, группы, посты, комментарии и подписки из "
+        "NDJSON или CSV пачками bulk_create; прерванный импорт продолжается "
+        "с контрольной точки"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sources", nargs="+",
+            help="Файлы .ndjson/.jsonl или .csv (users.csv, posts.csv...) по порядку",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Записей в одной транзакции")
+        parser.add_argument(
+            "--type", choices=importer.KINDS,
+            help="Тип записей, если его нет в файле или имени CSV",
+        )
+        parser.add_argument(
+            "--restart", action="store_true",
+            help="Забыть контрольные точки и импортировать заново",
+        )
+        parser.add_argument(
+            "--keep-indexes", action="store_true",
+            help="Не снимать индексы лент на время импорта",
+        )
+
+    def handle(self, *args, sources, batch_size, type, restart, keep_indexes,
+               **options):
+        for source in sources:
+            if not os.path.exists(source):
+                raise CommandError(f"Нет файла {source}")
+            if restart and os.path.exists(self.checkpoint_path(source)):
+                os.remove(self.checkpoint_path(source))
+
+        def streams():
+            for source in sources:
+                checkpoint = importer.Checkpoint(self.checkpoint_path(source))
+                if checkpoint.position:
+                    self.stdout.write(
+                        f"{source}: продолжаем с записи {checkpoint.position + 1}"
+                    )
+                yield importer.read_records(source, type), checkpoint
+
+        try:
+            loader = importer.run(
+                streams(), batch_size, report=self.report,
+                drop_indexes=not keep_indexes,
+            )
+        except (importer.InvalidRecord, KeyError, ValueError) as error:
+            raise CommandError(
+                f"Импорт остановлен: {error}. Уже записанное сохранено, "
+                f"повторный запуск продолжит с контрольной точки"
+            )
+        skipped = ", ".join(
+            f"{kind} {count}" for kind, count in loader.skipped.items() if count
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Импортировано: " + ", ".join(
+                f"{kind} {count}" for kind, count in loader.created.items()
+            ) + f"; пропущено без родителя: {skipped or 0}"
+        ))
+        self.stdout.write(
+            "Миниатюры импортированных картинок: manage.py pregenerate_thumbnails"
+        )
+
+    def checkpoint_path(self, source):
+        return f"{source}.checkpoint"
+
+    def report(self, loader):
+        self.stdout.write(
+            ", ".join(f"{kind} {count}" for kind, count in loader.created.items())
+            + f" — {loader.rate:.0f} строк/с"
+        )
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import feed_cache, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = "Нарезает миниатюры для картинок существующих постов"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=getattr(settings, "THUMBNAIL_WORKERS", 2),
+        )
+
+    def handle(self, *args, workers=2, **options):
+        posts = {}
+        for post in (
+            Post.objects.exclude(image="").exclude(image=None)
+            .select_related("author", "group")
+            .order_by("pk")
+            .iterator()
+        ):
+            posts.setdefault(post.image.name, []).append(post)
+
+        def generate(image):
+            try:
+                return thumbnails.generate(image)
+            except Exception as error:
+                self.stderr.write(f"{image.name}: {error}")
+                return False
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                generate, [group[0].image for group in posts.values()]
+            )
+            created = [
+                group for group, done in zip(posts.values(), results) if done
+            ]
+
+        scopes = set()
+        for group in created:
+            for post in group:
+                scopes.update(thumbnails.post_scopes(post))
+        feed_cache.bump(*scopes)
+        self.stdout.write(self.style.SUCCESS(
+            f"Картинок: {len(posts)}, нарезано: {len(created)}"
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import removal
+
+
+class Command(BaseCommand):
+    help = "Удаляет данные удалённых пользователей и групп пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, help="Строк в одной транзакции"
+        )
+        parser.add_argument(
+            "--rate", type=int, help="Не больше строк в секунду, 0 — без предела"
+        )
+        parser.add_argument(
+            "--watch",
+            type=float,
+            metavar="SECONDS",
+            help="Не выходить, а проверять очередь с этим интервалом",
+        )
+
+    def handle(self, *args, batch_size=None, rate=None, watch=None, **options):
+        while True:
+            removal.reap(size=batch_size, rate=rate, report=self.report)
+            if not watch:
+                return
+            time.sleep(watch)
+
+    def report(self, item, stage, rows):
+        if stage == "done":
+            self.stdout.write(self.style.SUCCESS(
+                f"{item}: удалено, всего строк {item.deleted}"
+            ))
+        else:
+            self.stdout.write(f"{item}: {stage} -{rows}, всего {item.deleted}")
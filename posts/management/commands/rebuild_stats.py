@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from BGG.transactions import atomic_write
+
+from posts import counters
+from posts.models import AuthorStats, Counter, Group, Post
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики и показывает расхождения"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только найти расхождения, ничего не исправляя",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, check=False, batch_size=1000, **options):
+        drift = 0
+        fields = list(counters.AUTHOR_COUNTS)
+
+        stored = {
+            row[0]: row[1:]
+            for row in AuthorStats.objects.values_list("user_id", *fields)
+        }
+        changed, missing = [], []
+        for user_id, *actual in counters.actual_author_counts().iterator():
+            current = stored.get(user_id)
+            stats = AuthorStats(user_id=user_id, **dict(zip(fields, actual)))
+            # Отсутствующая строка — не расхождение: она заводится лениво.
+            if current is None:
+                missing.append(stats)
+                continue
+            if tuple(actual) == tuple(current):
+                continue
+            drift += 1
+            self.stdout.write(
+                f"user {user_id}: {dict(zip(fields, current))} -> "
+                f"{dict(zip(fields, actual))}"
+            )
+            changed.append(stats)
+
+        groups = []
+        stored_groups = dict(Group.objects.values_list("pk", "posts_count"))
+        for group_id, actual in counters.actual_group_counts().iterator():
+            if stored_groups.get(group_id) != actual:
+                drift += 1
+                self.stdout.write(
+                    f"group {group_id}: {stored_groups.get(group_id)} -> {actual}"
+                )
+                groups.append(Group(pk=group_id, posts_count=actual))
+
+        posts = []
+        for post_id, current, actual in counters.drifted_comment_counts().iterator():
+            drift += 1
+            self.stdout.write(f"post {post_id}: {current} -> {actual}")
+            # С новой версией: карточки в кеше показывают старое число.
+            posts.append(
+                Post(pk=post_id, comment_count=actual, version=F("version") + 1)
+            )
+
+        totals = []
+        for name, count in counters.COUNTERS.items():
+            actual = count()
+            current = counters.get_counter(name)
+            if current == actual:
+                continue
+            if current is not None:
+                drift += 1
+                self.stdout.write(f"counter {name}: {current} -> {actual}")
+            totals.append(Counter(name=name, value=actual))
+
+        if check:
+            if drift:
+                raise CommandError(f"Найдено расхождений: {drift}")
+            self.stdout.write(self.style.SUCCESS("Счётчики сходятся"))
+            return
+
+        with atomic_write():
+            AuthorStats.objects.bulk_create(missing, batch_size=batch_size)
+            AuthorStats.objects.bulk_update(changed, fields, batch_size=batch_size)
+            Group.objects.bulk_update(groups, ["posts_count"], batch_size=batch_size)
+            Post.objects.bulk_update(
+                posts, ["comment_count", "version"], batch_size=batch_size
+            )
+            for counter in totals:
+                counter.save()
+        self.stdout.write(self.style.SUCCESS(
+            f"Исправлено расхождений: {drift}, создано строк: {len(missing)}"
+        ))
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer, synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическим сообществом: степенной закон подписок, "
+        "перекос групп, всплески комментариев. Пишет через posts.importer"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000)
+        parser.add_argument("--posts", type=int, default=1_000_000)
+        parser.add_argument("--groups", type=int, default=200)
+        parser.add_argument("--follows", type=float, default=20,
+                            help="Среднее число подписок пользователя")
+        parser.add_argument("--comments", type=float, default=2.0,
+                            help="Среднее число комментариев обычного поста")
+        parser.add_argument("--bursts", type=float, default=0.01,
+                            help="Доля постов со всплеском комментариев")
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, users, posts, groups, follows, comments, bursts, days,
+               seed, batch_size, **options):
+        if get_user_model().objects.filter(
+            username=synthetic.USERNAME.format(0)
+        ).exists():
+            raise CommandError(
+                "Синтетические данные уже есть: повторный прогон задвоит посты"
+            )
+        community = synthetic.Community(
+            users=users, posts=posts, groups=groups, follows=follows,
+            comments=comments, bursts=bursts, days=days, seed=seed,
+        )
+        directory = tempfile.mkdtemp()
+        checkpoint = importer.Checkpoint(os.path.join(directory, "seed.checkpoint"))
+        try:
+            loader = importer.run(
+                [(community.records(), checkpoint)], batch_size, report=self.report
+            )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(self.style.SUCCESS(
+            "Создано: " + ", ".join(
+                f"{kind} {count}" for kind, count in loader.created.items()
+            ) + f" (seed {seed})"
+        ))
+
+    def report(self, loader):
+        self.stdout.write(
+            ", ".join(f"{kind} {count}" for kind, count in loader.created.items())
+            + f" — {loader.rate:.0f} строк/с"
+        )
@@ -0,0 +1,22 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Копирует основную базу SQLite в файлы реплик (backup API)"
+
+    def handle(self, *args, **options):
+        source = str(connections["default"].settings_dict["NAME"])
+        aliases = settings.REPLICA_DATABASES
+        if not aliases:
+            raise CommandError("Реплики не настроены: задайте DATABASE_REPLICA")
+        for alias in aliases:
+            target = str(connections[alias].settings_dict["NAME"])
+            if target == source:
+                raise CommandError(f"Реплика {alias} совпадает с основной базой")
+            with sqlite3.connect(source) as primary, sqlite3.connect(target) as replica:
+                primary.backup(replica)
+            self.stdout.write(self.style.SUCCESS(f"{alias}: {source} -> {target}"))
@@ -0,0 +1,39 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+logger = logging.getLogger(__name__)
+
+
+class CardCacheStatsMiddleware:
+    """Отчёт о попаданиях в кеш карточек постов для каждой страницы."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.report(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.report(request, await self.get_response(request))
+
+    def report(self, request, response):
+        stats = getattr(request, "card_cache", None)
+        if stats:
+            total = stats["hits"] + stats["misses"]
+            ratio = stats["hits"] / total if total else 0
+            response["X-Post-Card-Cache"] = (
+                f"hits={stats['hits']}; misses={stats['misses']}; "
+                f"ratio={ratio:.2f}; saved={stats['saved'] * 1000:.1f}ms"
+            )
+            logger.debug(
+                "post cards %s: %s", request.path, response["X-Post-Card-Cache"]
+            )
+        return response
@@ -0,0 +1,85 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    Follow = apps.get_model("posts", "Follow")
+    Group = apps.get_model("posts", "Group")
+    AuthorStats = apps.get_model("posts", "AuthorStats")
+    Counter = apps.get_model("posts", "Counter")
+
+    for user_id in User.objects.values_list("pk", flat=True).iterator():
+        AuthorStats.objects.create(
+            user_id=user_id,
+            posts_count=Post.objects.filter(author_id=user_id).count(),
+            comments_count=Comment.objects.filter(author_id=user_id).count(),
+            followers_count=Follow.objects.filter(author_id=user_id).count(),
+            following_count=Follow.objects.filter(user_id=user_id).count(),
+        )
+    for group in Group.objects.all():
+        group.posts_count = Post.objects.filter(group=group).count()
+        group.save(update_fields=["posts_count"])
+    Counter.objects.create(name="posts", value=Post.objects.count())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("posts", "0010_timelineentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("posts_count", models.IntegerField(default=0, verbose_name="Записей")),
+                (
+                    "comments_count",
+                    models.IntegerField(default=0, verbose_name="Комментариев"),
+                ),
+                (
+                    "followers_count",
+                    models.IntegerField(default=0, verbose_name="Подписчиков"),
+                ),
+                (
+                    "following_count",
+                    models.IntegerField(default=0, verbose_name="Подписок"),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Counter",
+            fields=[
+                (
+                    "name",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="group",
+            name="posts_count",
+            field=models.IntegerField(
+                default=0, editable=False, verbose_name="Записей"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
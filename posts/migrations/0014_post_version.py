@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0013_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Версия"
+            ),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:05
+
+from django.db import migrations
+
+from posts.search import INDEXES, SCHEMA
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 есть только в SQLite.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in SCHEMA:
+        schema_editor.execute(statement)
+    for index, _ in INDEXES:
+        schema_editor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for index, _ in INDEXES:
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {index}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {index}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0014_post_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0016_comment_created_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Removal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("user", "пользователь"), ("group", "группа")],
+                        max_length=10,
+                        verbose_name="Что удаляется",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="Идентификатор")),
+                ("label", models.CharField(max_length=200, verbose_name="Имя")),
+                (
+                    "stage",
+                    models.CharField(blank=True, max_length=20, verbose_name="Этап"),
+                ),
+                (
+                    "deleted",
+                    models.BigIntegerField(default=0, verbose_name="Удалено строк"),
+                ),
+                (
+                    "requested",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Запрошено"),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="removal",
+            constraint=models.UniqueConstraint(
+                fields=("kind", "object_id"), name="unique_removal"
+            ),
+        ),
+    ]
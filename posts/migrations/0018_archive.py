@@ -0,0 +1,109 @@
+# Generated by Django 4.2.30 on 2026-10-17 01:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0017_removal"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="authorstats",
+            name="archived_count",
+            field=models.IntegerField(default=0, verbose_name="Записей в архиве"),
+        ),
+        migrations.CreateModel(
+            name="ArchivedPost",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("text", posts.models.CompressedTextField(verbose_name="Текст поста")),
+                ("pub_date", models.DateTimeField(verbose_name="Дата публикации")),
+                ("image", models.ImageField(blank=True, null=True, upload_to="posts/")),
+                (
+                    "comment_count",
+                    models.IntegerField(
+                        default=0, editable=False, verbose_name="Комментариев"
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveIntegerField(
+                        default=0, editable=False, verbose_name="Версия"
+                    ),
+                ),
+                (
+                    "archived",
+                    models.DateTimeField(auto_now_add=True, verbose_name="В архиве с"),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_posts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "group",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_posts",
+                        to="posts.group",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-pub_date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedComment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                (
+                    "text",
+                    posts.models.CompressedTextField(verbose_name="Текст комментария"),
+                ),
+                ("created", models.DateTimeField(verbose_name="Дата публикации")),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_comments",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="comments",
+                        to="posts.archivedpost",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="archivedpost",
+            index=models.Index(
+                fields=["author", "-pub_date", "-id"], name="archived_post_author"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedcomment",
+            index=models.Index(
+                fields=["post", "created"], name="archived_comment_post"
+            ),
+        ),
+    ]
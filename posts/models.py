@@ -1,3 +1,5 @@
+import zlib
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.db.models import Q, F
@@ -9,6 +11,7 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(max_length=50, unique=True, verbose_name="URL")
     description = models.TextField()
+    posts_count = models.IntegerField("Записей", default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -22,9 +25,22 @@ class Post(models.Model):
         Group, on_delete=models.CASCADE, blank=True, null=True, related_name="posts",
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comment_count = models.IntegerField("Комментариев", default=0, editable=False)
+    version = models.PositiveIntegerField("Версия", default=0, editable=False)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date'),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date'),
+        ]
 
     def __str__(self):
         return self.text
@@ -39,6 +55,16 @@ class Comment(models.Model):
     text = models.TextField(verbose_name='Текст комментария')
     created = models.DateTimeField("Дата публикации", auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created'),
+            models.Index(
+                fields=['created'],
+                name='comment_created'),
+        ]
+
     def __str__(self):
         return f"{self.author}: {self.text}"
 
@@ -52,7 +78,147 @@ class Follow(models.Model):
             models.CheckConstraint(
                 check=~Q(user=F('author')),
                 name='user!=author'),
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись материализованной ленты подписок (fan-out-on-write)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline")
+    pub_date = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'),
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date'),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    posts_count = models.IntegerField("Записей", default=0)
+    comments_count = models.IntegerField("Комментариев", default=0)
+    followers_count = models.IntegerField("Подписчиков", default=0)
+    following_count = models.IntegerField("Подписок", default=0)
+    archived_count = models.IntegerField("Записей в архиве", default=0)
 
+    def __str__(self):
+        return f"{self.user}: {self.posts_count}"
+
+
+class Counter(models.Model):
+    """Глобальный счётчик сайта, например общее число постов."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
+class Removal(models.Model):
+    """Пользователь или группа, скрытые сразу и удаляемые фоновой очисткой."""
+    USER = "user"
+    GROUP = "group"
+
+    kind = models.CharField(
+        "Что удаляется", max_length=10, choices=[(USER, "пользователь"), (GROUP, "группа")]
+    )
+    object_id = models.BigIntegerField("Идентификатор")
+    label = models.CharField("Имя", max_length=200)
+    stage = models.CharField("Этап", max_length=20, blank=True)
+    deleted = models.BigIntegerField("Удалено строк", default=0)
+    requested = models.DateTimeField("Запрошено", auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_removal'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.label}"
 
 
+class CompressedTextField(models.BinaryField):
+    """Текст, который хранится в базе сжатым zlib, а читается строкой."""
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else zlib.decompress(value).decode()
+
+    def to_python(self, value):
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = zlib.compress(value.encode(), 9)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        # dumpdata пишет текст как есть, а не base64 от байтов.
+        return self.value_from_object(obj)
+
+
+class ArchivedPost(models.Model):
+    """Пост из холодного архива (``posts.archive``) с прежним id."""
+    id = models.BigIntegerField(primary_key=True)
+    text = CompressedTextField(verbose_name='Текст поста')
+    pub_date = models.DateTimeField("Дата публикации")
+    # Отдельные индексы внешних ключей покрыты составными из Meta.
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="archived_posts", db_index=False
+    )
+    group = models.ForeignKey(
+        Group, on_delete=models.CASCADE, blank=True, null=True,
+        related_name="archived_posts",
+    )
+    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comment_count = models.IntegerField("Комментариев", default=0, editable=False)
+    version = models.PositiveIntegerField("Версия", default=0, editable=False)
+    archived = models.DateTimeField("В архиве с", auto_now_add=True)
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='archived_post_author'),
+        ]
+
+    def __str__(self):
+        return self.text
+
+
+class ArchivedComment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost, on_delete=models.CASCADE, related_name='comments', db_index=False
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_comments'
+    )
+    text = CompressedTextField(verbose_name='Текст комментария')
+    created = models.DateTimeField("Дата публикации")
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='archived_comment_post'),
+        ]
+
+    def __str__(self):
+        return f"{self.author}: {self.text}"
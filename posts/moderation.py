@@ -0,0 +1,130 @@
+"""Массовая модерация постов, комментариев и подписок набором запросов.
+
+Обычное удаление в Django собирает объекты и шлёт сигналы по каждому, и на
+миллионе строк оно не завершается. Здесь каждый шаг — один UPDATE или
+DELETE с подзапросом выборки: счётчики уменьшаются на число строк выборки
+по каждому автору, группе и посту, затем строки удаляются или переносятся.
+Сигналы не срабатывают, поэтому поколения лент сбрасываются явно после
+коммита. Индекс поиска обновляют триггеры SQLite.
+
+``delete_posts`` и ``delete_comments`` принимают и выборки из холодного
+архива (``ArchivedPost``, ``ArchivedComment``).
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from BGG.transactions import atomic_write
+
+from . import counters, feed_cache
+from .models import AuthorStats, Group, Post, TimelineEntry, User
+
+
+def delete_rows(queryset):
+    """Один ``DELETE ... WHERE id IN (выборка)`` без сигналов; число строк."""
+    meta = queryset.model._meta
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(meta.db_table)} "
+            f"WHERE {connection.ops.quote_name(meta.pk.column)} IN ({sql})",
+            params,
+        )
+        return cursor.rowcount
+
+
+def _subtract(selection, model, field, key, **updates):
+    """Уменьшает ``field`` строк ``model`` на число их строк в ``selection``."""
+    counts = (
+        selection.filter(**{key: OuterRef("pk")})
+        .order_by()
+        .values(key)
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    model.objects.filter(pk__in=selection.order_by().values(key)).update(
+        **{field: F(field) - Subquery(counts)}, **updates
+    )
+
+
+def feed_scopes(posts):
+    """Области лент, где видны ``posts``: общая, авторов и групп."""
+    posts = posts.order_by()
+    scopes = [feed_cache.POSTS]
+    scopes.extend(
+        feed_cache.author_scope(username)
+        for username in User.objects.filter(pk__in=posts.values("author"))
+        .values_list("username", flat=True)
+        .iterator()
+    )
+    scopes.extend(
+        feed_cache.group_scope(slug)
+        for slug in Group.objects.filter(pk__in=posts.values("group"))
+        .values_list("slug", flat=True)
+        .iterator()
+    )
+    return scopes
+
+
+def delete_posts(posts):
+    """Удаляет посты вместе с комментариями и записями лент подписок."""
+    with atomic_write():
+        selected = posts.order_by().values("pk")
+        comment_model = posts.model._meta.get_field("comments").related_model
+        comments = comment_model.objects.filter(post__in=selected)
+        scopes = feed_scopes(posts)
+        _subtract(comments, AuthorStats, "comments_count", "author")
+        _subtract(posts, AuthorStats, "posts_count", "author")
+        if posts.model is not Post:
+            _subtract(posts, AuthorStats, "archived_count", "author")
+        _subtract(posts, Group, "posts_count", "group")
+        delete_rows(comments)
+        if posts.model is Post:
+            delete_rows(TimelineEntry.objects.filter(post__in=selected))
+        deleted = delete_rows(posts)
+        if posts.model is Post:
+            counters.bump_counter(counters.POSTS, -deleted)
+        transaction.on_commit(lambda: feed_cache.bump(*scopes))
+    return deleted
+
+
+def move_posts(posts, group):
+    """Переносит посты в ``group``; карточки перерисуются по новой версии."""
+    with atomic_write():
+        scopes = feed_scopes(posts) + [feed_cache.group_scope(group.slug)]
+        _subtract(posts, Group, "posts_count", "group")
+        moved = posts.update(group=group, version=F("version") + 1)
+        counters.bump_group(group.pk, moved)
+        transaction.on_commit(lambda: feed_cache.bump(*scopes))
+    return moved
+
+
+def delete_comments(comments):
+    post_model = comments.model._meta.get_field("post").related_model
+    with atomic_write():
+        scopes = feed_scopes(
+            post_model.objects.filter(pk__in=comments.order_by().values("post"))
+        )
+        _subtract(comments, AuthorStats, "comments_count", "author")
+        _subtract(
+            comments, post_model, "comment_count", "post", version=F("version") + 1
+        )
+        deleted = delete_rows(comments)
+        transaction.on_commit(lambda: feed_cache.bump(*scopes))
+    return deleted
+
+
+def delete_follows(follows):
+    """Удаляет подписки со счётчиками сторон; ленты подписок не трогает."""
+    with atomic_write():
+        follows = follows.order_by()
+        scopes = [
+            feed_cache.author_scope(username)
+            for username in User.objects.filter(
+                Q(pk__in=follows.values("user")) | Q(pk__in=follows.values("author"))
+            ).values_list("username", flat=True).iterator()
+        ]
+        _subtract(follows, AuthorStats, "followers_count", "author")
+        _subtract(follows, AuthorStats, "following_count", "user")
+        deleted = delete_rows(follows)
+        transaction.on_commit(lambda: feed_cache.bump(*scopes))
+    return deleted
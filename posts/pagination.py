@@ -0,0 +1,294 @@
+"""Курсорная (keyset) пагинация лент по ключу ``(pub_date, id)``.
+
+Вместо ``OFFSET N`` и ``COUNT(*)`` каждая страница читается условием
+``(pub_date, id) < курсор`` с ``LIMIT per_page + 1``, поэтому стоимость
+страницы не зависит от её глубины. Старые ссылки вида ``?page=N`` продолжают
+работать: номер страницы переводится в курсор по узкому индексу.
+
+Номера страниц в навигации — окно вокруг текущей (``page_window``): первая,
+последняя и по ``WINDOW`` с каждой стороны, остальное — многоточие. Размер
+ответа не зависит от числа страниц в ленте. Соседние номера ведут по курсору,
+остальные — на ``?page=N`` со смещением и помечены ``rel="nofollow"``, чтобы
+роботы не обходили ленту через OFFSET.
+
+Лента может собираться из нескольких таблиц (``rest``), например профиль —
+из горячей таблицы и холодного архива. Даты в них могут перекрываться
+(импорт пишет в горячую таблицу посты задним числом), поэтому страница
+читается из каждой таблицы и строки сливаются по ключу.
+"""
+import base64
+import binascii
+import heapq
+from collections import namedtuple
+from datetime import datetime
+from itertools import islice
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import QueryDict
+
+PER_PAGE = 10
+
+# Сколько номеров страниц показывать по обе стороны от текущей.
+WINDOW = 2
+
+
+KEYS = ("pub_date", "pk")
+
+
+def encode_cursor(obj, keys=KEYS):
+    date_key, id_key = keys
+    raw = f"{getattr(obj, date_key).isoformat()}|{getattr(obj, id_key)}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        pub_date, pk = raw.split("|")
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def older_than(key, keys=KEYS):
+    (date_key, id_key), (pub_date, pk) = keys, key
+    return Q(**{f"{date_key}__lt": pub_date}) | Q(
+        **{date_key: pub_date, f"{id_key}__lt": pk}
+    )
+
+
+def newer_than(key, keys=KEYS):
+    (date_key, id_key), (pub_date, pk) = keys, key
+    return Q(**{f"{date_key}__gt": pub_date}) | Q(
+        **{date_key: pub_date, f"{id_key}__gt": pk}
+    )
+
+
+PageLink = namedtuple("PageLink", "number query current nofollow", defaults=(False,))
+
+
+def page_window(number, last, on_each_side=WINDOW, on_ends=1):
+    """Номера страниц вокруг ``number`` с ``Paginator.ELLIPSIS`` на пропусках."""
+    paginator = Paginator(range(last), 1)
+    return paginator.get_elided_page_range(
+        number, on_each_side=on_each_side, on_ends=on_ends
+    )
+
+
+def page_links(number, last, params=None):
+    """Ссылки ``?page=N`` окна страниц с сохранением прочих параметров."""
+    links = []
+    for page in page_window(number, last):
+        if page == Paginator.ELLIPSIS:
+            links.append(PageLink(page, None, False))
+            continue
+        query = (params or QueryDict()).copy()
+        for name in ("page", "after", "before"):
+            query.pop(name, None)
+        query["page"] = page
+        links.append(PageLink(page, query.urlencode(), page == number))
+    return links
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None,
+                 has_previous=False, params=None, number=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self._has_previous = has_previous
+        self.params = params
+        # Номер страницы, если он известен: курсорные ссылки несут его
+        # в ``page`` только для навигации, страницу выбирает курсор.
+        self.number = number
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def _query(self, **cursor):
+        params = (self.params or QueryDict()).copy()
+        for name in ("page", "after", "before"):
+            params.pop(name, None)
+        params.update({k: v for k, v in cursor.items() if v})
+        return params.urlencode()
+
+    @property
+    def next_query(self):
+        return self._query(
+            after=self.next_cursor, page=self.number and self.number + 1
+        )
+
+    @property
+    def previous_query(self):
+        return self._query(
+            before=self.previous_cursor, page=self.number and self.number - 1
+        )
+
+    @property
+    def page_links(self):
+        """Окно номеров; последняя известная страница — следующая."""
+        if not self.number:
+            return []
+        last = self.number + 1 if self.has_next() else self.number
+        known = {}
+        if self.has_next():
+            known[self.number + 1] = self.next_query
+        if self.has_previous() and self.previous_cursor:
+            known[self.number - 1] = self.previous_query
+        links = []
+        for link in page_links(self.number, last, self.params):
+            if link.number in known:
+                link = link._replace(query=known[link.number])
+            elif link.query and not link.current and link.number != 1:
+                # Первая страница читается без смещения, остальные — OFFSET.
+                link = link._replace(nofollow=True)
+            links.append(link)
+        return links
+
+
+class CursorPaginator:
+    """Постраничный вывод queryset по убыванию ``(pub_date, id)``.
+
+    ``keys`` задаёт поля ключа, если лента сортируется не по самому посту,
+    а, например, по аннотации из таблицы ленты подписок. С ``descending=False``
+    страницы идут по возрастанию ключа — так листаются комментарии.
+    """
+
+    def __init__(self, queryset, per_page=PER_PAGE, keys=KEYS, descending=True,
+                 rest=()):
+        self.queryset = queryset
+        self.rest = list(rest)
+        self.per_page = per_page
+        self.keys = keys
+        self.descending = descending
+        if descending:
+            self.ordering = [f"-{key}" for key in keys]
+            self._further, self._closer = older_than, newer_than
+        else:
+            self.ordering = list(keys)
+            self._further, self._closer = newer_than, older_than
+
+    def _cursor(self, obj):
+        return encode_cursor(obj, self.keys)
+
+    def _key(self, obj):
+        return tuple(getattr(obj, key) for key in self.keys)
+
+    def ordered(self):
+        return self.queryset.order_by(*self.ordering)
+
+    def page(self, rows, has_next, has_previous=False, params=None):
+        """Страница из уже прочитанных строк в порядке выдачи."""
+        return CursorPage(
+            rows,
+            next_cursor=self._cursor(rows[-1]) if has_next and rows else None,
+            previous_cursor=self._cursor(rows[0]) if has_previous and rows else None,
+            has_previous=has_previous,
+            params=params,
+        )
+
+    def first(self, params=None):
+        return self._further_page(None, has_previous=False, params=params)
+
+    def after(self, key, params=None):
+        return self._further_page(
+            self._further(key, self.keys), has_previous=True, params=params
+        )
+
+    def before(self, key, params=None):
+        reverse = [
+            name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering
+        ]
+        rows = self._read(self._closer(key, self.keys), reverse, self.per_page + 1)
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self.page(rows, bool(rows), has_previous, params)
+
+    def number(self, number, params=None):
+        """Совместимость со ссылками ``?page=N``.
+
+        Номер переводится в ключ по одной таблице за раз: сначала горячая,
+        затем архив со смещением, уменьшенным на строки горячей таблицы до
+        начала архива. Строки задним числом среди архивных номер не
+        учитывает: страница может сдвинуться на их число.
+        """
+        if number <= 1:
+            return self.first(params)
+        offset = (number - 1) * self.per_page - 1
+        querysets = [
+            queryset.order_by(*self.ordering) for queryset in [self.queryset, *self.rest]
+        ]
+        for ordered, following in zip(querysets, [*querysets[1:], None]):
+            start = None
+            if following is not None:
+                start = following.values_list(*self.keys).first()
+            if start is not None:
+                ordered = ordered.filter(self._closer(start, self.keys))
+            keys = ordered.values_list(*self.keys)[offset:offset + 1]
+            if keys:
+                return self.after(keys[0], params)
+            if start is None:
+                break
+            offset -= ordered.count()
+        return CursorPage([], has_previous=True, params=params)
+
+    def _read(self, condition, ordering, limit):
+        """До ``limit`` строк по ``condition`` в порядке ``ordering``."""
+        parts = []
+        for queryset in [self.queryset, *self.rest]:
+            if condition is not None:
+                queryset = queryset.filter(condition)
+            parts.append(queryset.order_by(*ordering)[:limit])
+        if not self.rest:
+            return list(parts[0])
+        rows = heapq.merge(
+            *parts, key=self._key, reverse=ordering[0].startswith("-")
+        )
+        return list(islice(rows, limit))
+
+    def _further_page(self, condition, has_previous, params):
+        rows = self._read(condition, self.ordering, self.per_page + 1)
+        has_next = len(rows) > self.per_page
+        return self.page(rows[:self.per_page], has_next, has_previous, params)
+
+
+def get_cursor_page(request, queryset, per_page=PER_PAGE, keys=KEYS, rest=()):
+    paginator = CursorPaginator(queryset, per_page, keys, rest=rest)
+    params = request.GET
+    try:
+        number = max(int(params.get("page", 1)), 1)
+    except ValueError:
+        number = 1
+    for name, method in (("after", paginator.after), ("before", paginator.before)):
+        key = decode_cursor(params.get(name, ""))
+        if key is not None:
+            page = method(key, params)
+            page.number = number if "page" in params else None
+            return page
+    page = paginator.number(number, params)
+    page.number = number
+    return page
+
+
+def paginate(request, queryset, per_page=PER_PAGE, keys=KEYS, rest=()):
+    """Контекст ленты: ``cursor`` для навигации и совместимые ``page``/``paginator``.
+
+    ``page`` и ``paginator`` — обычные объекты Django над уже прочитанной
+    страницей, чтобы шаблоны и код, ожидающие их, продолжали работать.
+    """
+    cursor = get_cursor_page(request, queryset, per_page, keys, rest)
+    paginator = Paginator(cursor.object_list, per_page)
+    return {"page": paginator.page(1), "paginator": paginator, "cursor": cursor}
@@ -0,0 +1,156 @@
+"""Удаление пользователей и групп: скрыть сразу, удалить в фоне.
+
+Каскадное удаление Django грузит в память все связанные объекты и удаляет
+их одной транзакцией: на пользователе с сотнями тысяч постов SQLite
+заперта для всех на минуты. Здесь ``schedule`` только заводит ``Removal``:
+пользователь деактивируется, он и группа сразу пропадают из лент, поиска и
+страниц (``visible``, ``visible_users``, ``visible_groups``). Команда
+``reap_removals`` затем удаляет комментарии, записи лент, посты с
+картинками и подписки пачками по ``REAPER_BATCH_SIZE`` строк, каждая в
+своей короткой транзакции, не быстрее ``REAPER_ROWS_PER_SECOND``. Пустой
+родитель удаляется последним, обычным ``delete()``.
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+
+from BGG.transactions import atomic_write
+
+from . import feed_cache, moderation, thumbnails
+from .models import (
+    ArchivedComment, ArchivedPost, Comment, Follow, Group, Post, Removal,
+    TimelineEntry, User,
+)
+
+
+def hidden(kind):
+    return Removal.objects.filter(kind=kind).values("object_id")
+
+
+def visible(posts):
+    """Посты без авторов и групп, ожидающих удаления."""
+    return posts.exclude(author_id__in=hidden(Removal.USER)).exclude(
+        group_id__in=hidden(Removal.GROUP)
+    )
+
+
+def visible_users(users=None):
+    users = User.objects.all() if users is None else users
+    return users.exclude(pk__in=hidden(Removal.USER))
+
+
+def visible_groups(groups=None):
+    groups = Group.objects.all() if groups is None else groups
+    return groups.exclude(pk__in=hidden(Removal.GROUP))
+
+
+def schedule(obj):
+    """Скрывает пользователя или группу и ставит их данные в очередь очистки."""
+    if isinstance(obj, Group):
+        kind, label = Removal.GROUP, obj.slug
+        scopes = [feed_cache.POSTS, feed_cache.group_scope(obj.slug)]
+    else:
+        kind, label = Removal.USER, obj.get_username()
+        scopes = [feed_cache.POSTS, feed_cache.author_scope(label)]
+    with atomic_write():
+        removal, _ = Removal.objects.get_or_create(
+            kind=kind, object_id=obj.pk, defaults={"label": label}
+        )
+        if kind == Removal.USER:
+            User.objects.filter(pk=obj.pk).update(is_active=False)
+        transaction.on_commit(lambda: feed_cache.bump(*scopes))
+    return removal
+
+
+def _delete_posts(posts):
+    images = list(
+        posts.exclude(image="").exclude(image=None).values_list("image", flat=True)
+    )
+    deleted = moderation.delete_posts(posts)
+    for name in images:
+        thumbnails.remove(name)
+    return deleted
+
+
+def stages(removal):
+    """Этапы очистки по порядку: имя, выборка и функция удаления пачки."""
+    pk = removal.object_id
+    if removal.kind == Removal.GROUP:
+        return [
+            ("comments", Comment.objects.filter(post__group_id=pk),
+             moderation.delete_comments),
+            ("timeline", TimelineEntry.objects.filter(post__group_id=pk),
+             moderation.delete_rows),
+            ("posts", Post.objects.filter(group_id=pk), _delete_posts),
+            ("archived comments", ArchivedComment.objects.filter(post__group_id=pk),
+             moderation.delete_comments),
+            ("archived posts", ArchivedPost.objects.filter(group_id=pk), _delete_posts),
+        ]
+    return [
+        ("comments", Comment.objects.filter(author_id=pk), moderation.delete_comments),
+        ("replies", Comment.objects.filter(post__author_id=pk),
+         moderation.delete_comments),
+        ("timeline", TimelineEntry.objects.filter(post__author_id=pk),
+         moderation.delete_rows),
+        ("posts", Post.objects.filter(author_id=pk), _delete_posts),
+        ("archived comments", ArchivedComment.objects.filter(author_id=pk),
+         moderation.delete_comments),
+        ("archived replies", ArchivedComment.objects.filter(post__author_id=pk),
+         moderation.delete_comments),
+        ("archived posts", ArchivedPost.objects.filter(author_id=pk), _delete_posts),
+        ("feed", TimelineEntry.objects.filter(user_id=pk), moderation.delete_rows),
+        ("follows", Follow.objects.filter(Q(user_id=pk) | Q(author_id=pk)),
+         moderation.delete_follows),
+    ]
+
+
+def step(removal, batch_size):
+    """Удаляет одну пачку; ``(этап, строк)`` или ``None``, если всё удалено."""
+    for stage, queryset, delete in stages(removal):
+        batch = list(queryset.order_by().values_list("pk", flat=True)[:batch_size])
+        if batch:
+            deleted = delete(queryset.model.objects.filter(pk__in=batch))
+            Removal.objects.filter(pk=removal.pk).update(
+                stage=stage, deleted=F("deleted") + deleted
+            )
+            removal.stage = stage
+            removal.deleted += deleted
+            return stage, deleted
+    finish(removal)
+    return None
+
+
+def finish(removal):
+    model = Group if removal.kind == Removal.GROUP else User
+    with atomic_write():
+        # Связей почти не осталось: обычное удаление, чтобы сработали сигналы.
+        for parent in model.objects.filter(pk=removal.object_id):
+            parent.delete()
+        removal.delete()
+
+
+def batch_size():
+    return getattr(settings, "REAPER_BATCH_SIZE", 500)
+
+
+def rows_per_second():
+    return getattr(settings, "REAPER_ROWS_PER_SECOND", 2000)
+
+
+def reap(size=None, rate=None, report=None, sleep=time.sleep):
+    """Очищает очередь до конца; ``report(removal, stage, rows)`` после пачки."""
+    size = size or batch_size()
+    rate = rows_per_second() if rate is None else rate
+    while True:
+        removal = Removal.objects.order_by("pk").first()
+        if removal is None:
+            return
+        started = time.monotonic()
+        done = step(removal, size)
+        stage, rows = done or ("done", 0)
+        if report is not None:
+            report(removal, stage, rows)
+        if rate and rows:
+            sleep(max(0.0, rows / rate - (time.monotonic() - started)))
@@ -0,0 +1,285 @@
+"""Полнотекстовый поиск по постам и комментариям на SQLite FTS5.
+
+Индексы ``posts_post_fts`` и ``posts_comment_fts`` — external content: текст
+в них не дублируется, а читается из самих таблиц по ``rowid``. В синхроне
+их держат триггеры из ``SCHEMA``, поэтому любая запись — из view, админки,
+``bulk_create`` или ``update()`` — попадает в индекс. Пост находится по
+своему тексту или по тексту комментария; ранг — лучший ``bm25`` из двух.
+Страницы выдачи листаются курсором по ``(rank, id)``; вперёд каждый индекс
+отдаёт только лучшие совпадения, а сниппеты строятся для строк страницы.
+"""
+import base64
+import binascii
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from BGG.transactions import atomic_write
+
+from .models import Post
+from .pagination import PER_PAGE, CursorPage
+from .removal import visible
+
+POST_INDEX = "posts_post_fts"
+COMMENT_INDEX = "posts_comment_fts"
+
+INDEXES = ((POST_INDEX, "posts_post"), (COMMENT_INDEX, "posts_comment"))
+
+INSERT_TRIGGER = """
+CREATE TRIGGER {index}_ai AFTER INSERT ON {table} BEGIN
+    INSERT INTO {index}(rowid, text) VALUES (new.id, new.text);
+END
+"""
+
+# Индексы и триггеры; по этой схеме их создают миграция 0015_search_index
+# и бенчмарк.
+SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE {index} USING fts5(
+        text, content='{table}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """
+    for index, table in INDEXES
+] + [
+    statement
+    for index, table in INDEXES
+    for statement in (
+        INSERT_TRIGGER.format(index=index, table=table),
+        f"""
+        CREATE TRIGGER {index}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {index}({index}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {index}_au AFTER UPDATE OF text ON {table} BEGIN
+            INSERT INTO {index}({index}, rowid, text)
+            VALUES ('delete', old.id, old.text);
+            INSERT INTO {index}(rowid, text) VALUES (new.id, new.text);
+        END
+        """,
+    )
+]
+
+
+def suspend_indexing():
+    """Отключает индексацию новых строк на время массовой вставки."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for index, _ in INDEXES:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {index}_ai")
+
+
+def resume_indexing():
+    """Возвращает триггеры и перестраивает индексы, если их отключали."""
+    if connection.vendor != "sqlite":
+        return
+    with atomic_write(), connection.cursor() as cursor:
+        for index, table in INDEXES:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = %s",
+                [f"{index}_ai"],
+            )
+            if cursor.fetchone() is None:
+                cursor.execute(INSERT_TRIGGER.format(index=index, table=table))
+                cursor.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+# Метки подсветки из управляющих символов: текст экранируется уже после
+# snippet(), и метки не должны совпасть с пользовательским вводом.
+MARK_START, MARK_END = "\x02", "\x03"
+
+# Сниппет строится только для строк страницы: у каждой строки ``best`` есть
+# ``hit_id`` — rowid лучшего совпадения в индексе поста или комментария.
+SNIPPET = f"""
+    CASE in_comment
+    WHEN 0 THEN (
+        SELECT snippet({POST_INDEX}, 0, '{MARK_START}', '{MARK_END}', '…', 16)
+        FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %(match)s AND rowid = page.hit_id
+    )
+    ELSE (
+        SELECT snippet({COMMENT_INDEX}, 0, '{MARK_START}', '{MARK_END}', '…', 16)
+        FROM {COMMENT_INDEX} WHERE {COMMENT_INDEX} MATCH %(match)s AND rowid = page.hit_id
+    )
+    END
+"""
+
+COMMENT_MATCHES = f"""
+    FROM {COMMENT_INDEX} JOIN posts_comment c ON c.id = {COMMENT_INDEX}.rowid
+    WHERE {COMMENT_INDEX} MATCH %(match)s
+"""
+
+# Вперёд (первая страница и ``after``) каждый индекс отдаёт не больше
+# ``limit`` лучших совпадений: FTS5 сам сортирует по ``rank``. Пост, уже
+# показанный на прошлых страницах через совпадение в другом индексе,
+# в кандидаты не попадает.
+TOP_HITS = f"""
+    post_hits AS (
+        SELECT rowid AS post_id, rank, rowid AS hit_id, 0 AS in_comment
+        FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %(match)s {{post_after}}
+        ORDER BY rank, rowid LIMIT %(limit)s
+    ), comment_hits AS (
+        -- В SQLite остальные колонки берутся из строки с минимумом.
+        SELECT c.post_id, MIN({COMMENT_INDEX}.rank) AS rank,
+               {COMMENT_INDEX}.rowid AS hit_id, 1 AS in_comment
+        {COMMENT_MATCHES}
+        GROUP BY c.post_id {{comment_after}}
+        ORDER BY rank, c.post_id LIMIT %(limit)s
+    ), hits AS (
+        SELECT * FROM post_hits UNION ALL SELECT * FROM comment_hits
+    )
+"""
+
+POST_AFTER = f"""
+    AND (rank, rowid) > (%(rank)s, %(pk)s)
+    AND rowid NOT IN (
+        SELECT c.post_id {COMMENT_MATCHES}
+        AND ({COMMENT_INDEX}.rank, c.post_id) <= (%(rank)s, %(pk)s)
+    )
+"""
+
+COMMENT_AFTER = f"""
+    HAVING (MIN({COMMENT_INDEX}.rank), c.post_id) > (%(rank)s, %(pk)s)
+    AND c.post_id NOT IN (
+        SELECT rowid FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %(match)s
+        AND (rank, rowid) <= (%(rank)s, %(pk)s)
+    )
+"""
+
+# Назад (``before``) страницу не собрать из лучших совпадений индексов:
+# ранг поста — минимум по всем его совпадениям, и он нужен для каждого.
+ALL_HITS = f"""
+    hits AS (
+        SELECT rowid AS post_id, rank, rowid AS hit_id, 0 AS in_comment
+        FROM {POST_INDEX} WHERE {POST_INDEX} MATCH %(match)s
+        UNION ALL
+        SELECT c.post_id, {COMMENT_INDEX}.rank, {COMMENT_INDEX}.rowid, 1
+        {COMMENT_MATCHES}
+    )
+"""
+
+PAGE = f"""
+    WITH {{hits}}, best AS (
+        SELECT post_id, MIN(rank) AS rank, hit_id, in_comment
+        FROM hits GROUP BY post_id
+    )
+    SELECT post_id, rank, {SNIPPET} FROM (
+        SELECT * FROM best {{where}} ORDER BY {{order}} LIMIT %(limit)s
+    ) AS page
+    ORDER BY {{order}}
+"""
+
+
+def hits_query(match, after=None, before=None, limit=PER_PAGE):
+    """SQL и параметры страницы совпадений: ``(post_id, rank, snippet)``."""
+    params = {"match": match, "limit": limit}
+    if before is not None:
+        params["rank"], params["pk"] = before
+        sql = PAGE.format(
+            hits=ALL_HITS,
+            where="WHERE (rank, post_id) < (%(rank)s, %(pk)s)",
+            order="rank DESC, post_id DESC",
+        )
+    else:
+        if after is not None:
+            params["rank"], params["pk"] = after
+        sql = PAGE.format(
+            hits=TOP_HITS.format(
+                post_after=POST_AFTER if after is not None else "",
+                comment_after=COMMENT_AFTER if after is not None else "",
+            ),
+            where="",
+            order="rank, post_id",
+        )
+    return sql, params
+
+
+def match_query(text):
+    """Запрос FTS5 из пользовательского ввода: все слова, по префиксу."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def encode_cursor(rank, pk):
+    raw = f"{rank!r}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        rank, pk = raw.split("|")
+        return float(rank), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def _cursor(row):
+    post_id, rank, _ = row
+    return encode_cursor(rank, post_id)
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
+
+
+def _hits(match, after=None, before=None, limit=PER_PAGE):
+    with connection.cursor() as cursor:
+        cursor.execute(*hits_query(match, after, before, limit))
+        return cursor.fetchall()
+
+
+def matching_ids(index, text):
+    """Подзапрос id строк, чей текст найден в индексе ``index``."""
+    return (
+        f"SELECT rowid FROM {index} WHERE {index} MATCH %s",
+        [match_query(text)],
+    )
+
+
+class SearchResult:
+    def __init__(self, post, rank, snippet):
+        self.post = post
+        self.rank = rank
+        self.snippet = highlight(snippet)
+
+
+def search(text, after=None, before=None, per_page=PER_PAGE, params=None):
+    """Страница выдачи (``CursorPage`` из ``SearchResult``) по возрастанию bm25."""
+    match = match_query(text)
+    if not match:
+        return CursorPage([], params=params)
+    if before is not None:
+        rows = _hits(match, before=before, limit=per_page + 1)
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = bool(rows)
+    else:
+        rows = _hits(match, after=after, limit=per_page + 1)
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = after is not None
+
+    posts = visible(Post.objects.select_related("author", "group")).in_bulk(
+        [post_id for post_id, _, _ in rows]
+    )
+    results = [
+        SearchResult(posts[post_id], rank, snippet)
+        for post_id, rank, snippet in rows
+        if post_id in posts
+    ]
+    return CursorPage(
+        results,
+        next_cursor=_cursor(rows[-1]) if has_next and rows else None,
+        previous_cursor=_cursor(rows[0]) if has_previous and rows else None,
+        has_previous=has_previous,
+        params=params,
+    )
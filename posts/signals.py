@@ -0,0 +1,141 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, feed_cache, moderation, thumbnails, timeline
+from .models import ArchivedPost, Comment, Follow, Group, Post
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Запоминаем группу, чтобы при смене перенести счётчик. Через __dict__,
+    # чтобы не грузить отложенное поле.
+    instance._loaded_group_id = instance.__dict__.get("group_id")
+
+
+@receiver(pre_save, sender=Post)
+def post_versioned(sender, instance, **kwargs):
+    # В базу — через F(): версию в памяти могли обогнать комментарии. В
+    # памяти — следующая за загруженной, без повторного чтения строки.
+    if not instance._state.adding:
+        loaded = instance.__dict__.get("version")
+        instance._next_version = None if loaded is None else loaded + 1
+        instance.version = F("version") + 1
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+        counters.bump_author(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+        counters.bump_counter(counters.POSTS, 1)
+    else:
+        if instance._next_version is None:
+            # Версия не загружалась: прочитается при обращении.
+            del instance.version
+        else:
+            instance.version = instance._next_version
+        timeline.update_post(instance)
+        if instance.group_id != instance._loaded_group_id:
+            counters.bump_group(instance._loaded_group_id, -1)
+            counters.bump_group(instance.group_id, 1)
+    feed_cache.bump(*_post_scopes(instance, instance._loaded_group_id))
+    instance._loaded_group_id = instance.group_id
+    if instance.image:
+        # Миниатюры режем после коммита, чтобы воркер видел картинку и пост.
+        transaction.on_commit(lambda: thumbnails.enqueue(instance))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, posts_count=-1)
+    counters.bump_group(instance.group_id, -1)
+    counters.bump_counter(counters.POSTS, -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_author(instance.author_id, comments_count=1)
+        counters.bump_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_author(instance.author_id, comments_count=-1)
+    counters.bump_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        timeline.follow(instance.user_id, instance.author_id)
+        counters.bump_author(instance.author_id, followers_count=1)
+        counters.bump_author(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, origin=None, **kwargs):
+    # При каскадном удалении пользователя перераскладывать ленты незачем.
+    model = getattr(origin, "model", type(origin))
+    timeline.unfollow(
+        instance.user_id, instance.author_id, rebalance=model is Follow
+    )
+    counters.bump_author(instance.author_id, followers_count=-1)
+    counters.bump_author(instance.user_id, following_count=-1)
+
+
+def _post_scopes(post, group_id=None):
+    scopes = [feed_cache.POSTS]
+    try:
+        scopes.append(feed_cache.author_scope(post.author.username))
+    except ObjectDoesNotExist:
+        pass
+    for slug in Group.objects.filter(
+        pk__in=[post.group_id, group_id]
+    ).values_list("slug", flat=True):
+        scopes.append(feed_cache.group_scope(slug))
+    return scopes
+
+
+@receiver(post_delete, sender=Post)
+def post_removed(sender, instance, **kwargs):
+    feed_cache.bump(*_post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    try:
+        post = instance.post
+    except ObjectDoesNotExist:
+        return
+    feed_cache.bump(*_post_scopes(post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    feed_cache.bump(feed_cache.POSTS, feed_cache.group_scope(instance.slug))
+    if kwargs["signal"] is post_save and not created:
+        # Название и адрес группы отрисованы в карточках её постов, в том
+        # числе в профилях авторов и в архиве.
+        for posts in (
+            Post.objects.filter(group=instance),
+            ArchivedPost.objects.filter(group=instance),
+        ):
+            feed_cache.bump(*moderation.feed_scopes(posts))
+            posts.update(version=F("version") + 1)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    try:
+        usernames = [instance.author.username, instance.user.username]
+    except ObjectDoesNotExist:
+        return
+    feed_cache.bump(*map(feed_cache.author_scope, usernames))
@@ -0,0 +1,136 @@
+"""Синтетическое сообщество для нагрузочных прогонов.
+
+Распределения похожи на живую соцсеть:
+
+- подписчики — степенной закон: у немногих авторов тысячи подписчиков, у
+  большинства единицы; популярные авторы и пишут чаще;
+- группы — перекос по Ципфу, часть постов без группы;
+- комментарии — у большинства постов пара штук за несколько часов, у
+  небольшой доли «взлетевших» — всплеск из сотен за первые минуты;
+- тексты — слова из словаря с частотами по Ципфу.
+
+``records`` выдаёт записи в формате ``posts.importer`` в порядке
+зависимостей; при одном ``seed`` набор данных воспроизводится точно.
+"""
+import itertools
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+SYLLABLES = "ка ро ми ту зе ла но ве ри ста бо гу ды пе ша".split()
+
+# Словарь с распределением Ципфа: частые слова есть почти в каждом посте,
+# редкие — в единицах, как в живом тексте.
+VOCABULARY = [
+    "".join(parts)
+    for size in (2, 3, 4)
+    for parts in itertools.product(SYLLABLES, repeat=size)
+][:20000]
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса для ``random.choices``: ранг 1 — самый частый."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+WEIGHTS = zipf_weights(len(VOCABULARY), 1.1)
+
+USERNAME = "synth_{}"
+GROUP_SLUG = "synth-{}"
+
+
+class Community:
+    def __init__(self, users=100_000, posts=1_000_000, groups=200, follows=20,
+                 comments=2.0, bursts=0.01, days=365, seed=1, now=None):
+        self.users = users
+        self.posts = posts
+        self.groups = groups
+        self.follows = follows
+        self.comments = comments
+        self.bursts = bursts
+        self.days = days
+        self.rng = random.Random(seed)
+        # Конец периода фиксирован в данных, а не берётся из часов.
+        self.now = now or datetime(2026, 1, 1, tzinfo=timezone.utc)
+        # Ранги популярности раскиданы по пользователям случайно.
+        self.ranked = list(range(self.users))
+        self.rng.shuffle(self.ranked)
+        self.popularity = zipf_weights(self.users, 1.0)
+        self.activity = zipf_weights(self.users, 0.8)
+        self.group_weights = zipf_weights(self.groups, 1.2) if self.groups else None
+
+    def text(self, low=8, high=60):
+        return " ".join(self.rng.choices(
+            VOCABULARY, cum_weights=WEIGHTS, k=self.rng.randint(low, high)
+        ))
+
+    def records(self):
+        yield from self.user_records()
+        yield from self.group_records()
+        yield from self.follow_records()
+        yield from self.post_records()
+
+    def user_records(self):
+        for i in range(self.users):
+            yield {"type": "user", "id": i, "username": USERNAME.format(i)}
+
+    def group_records(self):
+        for i in range(self.groups):
+            yield {
+                "type": "group", "id": i, "slug": GROUP_SLUG.format(i),
+                "title": f"Группа {i}", "description": self.text(5, 20),
+            }
+
+    def follow_records(self):
+        if self.users < 2:
+            return
+        # Число подписок — логнормальное со средним ``follows``.
+        mu = math.log(max(self.follows, 1)) - 0.5
+        for user in range(self.users):
+            count = min(self.users - 1, int(self.rng.lognormvariate(mu, 1.0)))
+            authors = {
+                self.ranked[rank] for rank in self.rng.choices(
+                    range(self.users), cum_weights=self.popularity, k=count
+                )
+            }
+            authors.discard(user)
+            for author in sorted(authors):
+                yield {"type": "follow", "user": user, "author": author}
+
+    def post_records(self):
+        start = self.now - timedelta(days=self.days)
+        step = timedelta(days=self.days) / max(self.posts, 1)
+        mean = self.comments
+        for i in range(self.posts):
+            pub_date = start + step * i
+            author = self.ranked[self.rng.choices(
+                range(self.users), cum_weights=self.activity
+            )[0]]
+            group = None
+            if self.group_weights and self.rng.random() < 0.7:
+                group = self.rng.choices(
+                    range(self.groups), cum_weights=self.group_weights
+                )[0]
+            yield {
+                "type": "post", "id": i, "author": author, "group": group,
+                "text": self.text(), "pub_date": pub_date.isoformat(),
+            }
+            if self.rng.random() < self.bursts:
+                count = min(2000, int(30 * self.rng.paretovariate(1.2)))
+                delay = 20 * 60
+            else:
+                count = int(self.rng.expovariate(1 / mean)) if mean else 0
+                delay = 6 * 60 * 60
+            for created in sorted(
+                pub_date + timedelta(seconds=self.rng.expovariate(1 / delay))
+                for _ in range(count)
+            ):
+                yield {
+                    "type": "comment", "post": i,
+                    "author": self.ranked[self.rng.choices(
+                        range(self.users), cum_weights=self.activity
+                    )[0]],
+                    "text": self.text(3, 25), "created": created.isoformat(),
+                }
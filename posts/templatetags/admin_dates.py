@@ -0,0 +1,98 @@
+"""Навигация по датам в админке без полного просмотра таблицы.
+
+Стандартный ``date_hierarchy`` строит список лет, месяцев и дней через
+``DISTINCT`` по усечённой дате и ищет границы через ``MIN`` и ``MAX`` в
+одном запросе: оба читают весь индекс. Здесь границы берутся двумя
+поисками по индексу, а каждый период проверяется ``exists()`` по диапазону,
+так что число запросов зависит от числа периодов, а не строк.
+"""
+from datetime import datetime, time, timedelta
+
+from django import template
+from django.conf import settings
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
+from django.utils import timezone
+
+register = template.Library()
+
+
+def _local_date(value):
+    return (timezone.localtime(value) if timezone.is_aware(value) else value).date()
+
+
+def _moment(day):
+    """Начало дня в текущем часовом поясе."""
+    value = datetime.combine(day, time())
+    return timezone.make_aware(value) if settings.USE_TZ else value
+
+
+def _truncate(value, kind):
+    if kind == "year":
+        return value.replace(month=1, day=1)
+    if kind == "month":
+        return value.replace(day=1)
+    return value
+
+
+def _next(value, kind):
+    if kind == "year":
+        return value.replace(year=value.year + 1)
+    if kind == "month":
+        return value.replace(
+            year=value.year + value.month // 12, month=value.month % 12 + 1
+        )
+    return value + timedelta(days=1)
+
+
+class _IndexedDates:
+    """``queryset`` для ``date_hierarchy``: границы и периоды по индексу."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def edge(self, field, last=False):
+        return (
+            self.queryset.order_by(f"-{field}" if last else field)
+            .values_list(field, flat=True)
+            .first()
+        )
+
+    def aggregate(self, first, last):
+        field = first.source_expressions[0].name
+        return {"first": self.edge(field), "last": self.edge(field, last=True)}
+
+    def datetimes(self, field, kind, **kwargs):
+        first, last = self.edge(field), self.edge(field, last=True)
+        if first is None:
+            return []
+        moments = isinstance(first, datetime)
+        if moments:
+            first, last = _local_date(first), _local_date(last)
+        periods = []
+        day = _truncate(first, kind)
+        while day <= last:
+            following = _next(day, kind)
+            start, stop = day, following
+            if moments:
+                start, stop = _moment(start), _moment(stop)
+            lookup = {f"{field}__gte": start, f"{field}__lt": stop}
+            if self.queryset.filter(**lookup).exists():
+                periods.append(start)
+            day = following
+        return periods
+
+    dates = datetimes
+
+
+class _ChangeList:
+    def __init__(self, cl):
+        self.cl = cl
+        self.queryset = _IndexedDates(cl.queryset)
+
+    def __getattr__(self, name):
+        return getattr(self.cl, name)
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def indexed_date_hierarchy(cl):
+    return date_hierarchy(_ChangeList(cl))
@@ -0,0 +1,11 @@
+from django import template
+
+from ..pagination import page_links as _page_links
+
+register = template.Library()
+
+
+@register.filter
+def page_links(page):
+    """Окно номеров для ``Page`` обычного ``Paginator`` вместо ``page_range``."""
+    return _page_links(page.number, page.paginator.num_pages)
@@ -0,0 +1,77 @@
+"""Карточки постов из кеша фрагментов.
+
+Карточка кешируется целиком по ключу ``id`` + ``version`` поста: версия
+меняется при правке, новом комментарии и смене группы, поэтому старые
+фрагменты просто перестают читаться. Карточки с заглушкой миниатюры не
+кешируются. Кнопка «Редактировать» зависит от пользователя и подставляется
+в готовый фрагмент вместо метки; у архивных постов её нет.
+"""
+import time
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from BGG import metrics
+
+from ..models import ArchivedPost
+from .post_thumbnails import PENDING_MARKER
+
+register = template.Library()
+
+EDIT_MARKER = "<!-- post-edit -->"
+
+
+def card_key(post):
+    return f"post-card:{post.pk}:{post.version}"
+
+
+def card_stats(request):
+    if not hasattr(request, "card_cache"):
+        request.card_cache = {"hits": 0, "misses": 0, "saved": 0.0}
+    return request.card_cache
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    request = context.get("request")
+    user = context.get("user")
+    posts = list(posts)
+    cached = cache.get_many([card_key(post) for post in posts])
+    stats = card_stats(request) if request is not None else None
+    fresh = {}
+    cards = []
+    if posts:
+        metrics.CACHE_REQUESTS.inc("card", "hit", amount=len(cached))
+        metrics.CACHE_REQUESTS.inc("card", "miss", amount=len(posts) - len(cached))
+    for post in posts:
+        key = card_key(post)
+        if key in cached:
+            html, render_time = cached[key]
+            if stats is not None:
+                stats["hits"] += 1
+                stats["saved"] += render_time
+        else:
+            started = time.perf_counter()
+            html = render_to_string("post_item.html", {"post": post})
+            render_time = time.perf_counter() - started
+            # Карточку с заглушкой вместо миниатюры не кешируем.
+            if PENDING_MARKER not in html:
+                fresh[key] = (html, render_time)
+            if stats is not None:
+                stats["misses"] += 1
+        if (
+            user is not None
+            and user.is_authenticated
+            and user.pk == post.author_id
+            and not isinstance(post, ArchivedPost)
+        ):
+            html = html.replace(
+                EDIT_MARKER, render_to_string("post_edit_link.html", {"post": post})
+            )
+        cards.append(html)
+    if fresh:
+        cache.set_many(fresh, getattr(settings, "POST_CARD_CACHE_TIMEOUT", 86400))
+    return mark_safe("".join(cards))
@@ -0,0 +1,35 @@
+"""Миниатюры постов без нарезки в запросе.
+
+Тег отдаёт данные для ``<picture>`` из готовых миниатюр sorl, а если нарезано
+ещё не всё — ставит нарезку в фоновую очередь и возвращает ``None``: шаблон
+показывает заглушку. Заглушка ждущей миниатюры помечается, чтобы карточку не
+закешировали; битый исходник миниатюры не дождётся, и его заглушку
+кешировать можно.
+"""
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+PENDING_MARKER = "<!-- thumbnail-pending -->"
+
+
+@register.simple_tag
+def post_picture(post, preset):
+    if not post.image:
+        return None
+    picture = thumbnails.picture(post.image, preset)
+    if picture is None:
+        thumbnails.enqueue(post)
+    return picture
+
+
+@register.simple_tag
+def post_placeholder(post, preset):
+    return thumbnails.placeholder(post.image, preset)
+
+
+@register.filter
+def thumbnail_failed(image):
+    return thumbnails.failed(image)
@@ -0,0 +1,243 @@
+"""Фоновая нарезка миниатюр постов.
+
+sorl-thumbnail режет картинку при первой отрисовке шаблона, и первый
+посетитель платит за декодирование и сжатие прямо в запросе. Здесь все
+ширины из шаблонов в WebP и JPEG нарезаются в пуле потоков после коммита
+поста, а шаблон до готовности миниатюр показывает заглушку. Когда миниатюры готовы,
+сбрасываются поколения лент поста, чтобы закешированные страницы с
+заглушкой перестали читаться.
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import connections
+from sorl.thumbnail import default, delete, get_thumbnail
+
+from BGG import metrics
+
+from . import feed_cache
+
+logger = logging.getLogger(__name__)
+
+# Ширины, которые попадают в srcset; пропорции карточки 960x339.
+PRESETS = {
+    "card": {
+        "widths": (320, 640, 960),
+        "ratio": 339 / 960,
+        "sizes": "(max-width: 960px) 100vw, 960px",
+    },
+    "full": {
+        "widths": (320, 640, 960),
+        "ratio": None,
+        "sizes": "(max-width: 960px) 100vw, 960px",
+    },
+}
+
+# WebP для браузеров, которые его понимают, и JPEG как запасной вариант.
+FORMATS = {
+    "image/webp": {"format": "WEBP", "quality": 80},
+    "image/jpeg": {"format": "JPEG", "quality": 85},
+}
+
+OPTIONS = {"crop": "center", "upscale": True}
+
+
+def preset_geometry(preset, width):
+    ratio = PRESETS[preset]["ratio"]
+    return f"{width}x{round(width * ratio)}" if ratio else str(width)
+
+
+def variants(presets=PRESETS):
+    """Все нарезки пресетов: ``(пресет, ширина, тип, геометрия, опции)``."""
+    return [
+        (preset, width, mime, preset_geometry(preset, width), {**OPTIONS, **options})
+        for preset in presets
+        for width in PRESETS[preset]["widths"]
+        for mime, options in FORMATS.items()
+    ]
+
+
+_executor = None
+_pending = {}
+_lock = threading.Lock()
+
+
+def executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2),
+                thread_name_prefix="thumbnails",
+            )
+    return _executor
+
+
+def _ready_key(name, geometry, options):
+    options = ",".join(f"{key}={value}" for key, value in sorted(options.items()))
+    raw = f"{name}|{geometry}|{options}"
+    return "thumbnail:" + hashlib.md5(raw.encode()).hexdigest()
+
+
+class Thumbnail:
+    """Готовая миниатюра: то, что нужно шаблону, без обращения к хранилищу."""
+
+    def __init__(self, url, width, height):
+        self.url, self.width, self.height = url, width, height
+
+
+def ready(image, geometry, options):
+    """Готовая миниатюра или ``None``.
+
+    Имя файла миниатюры знает только sorl, поэтому ``generate`` записывает
+    в кеш то, что вернул ``get_thumbnail``. Если запись вытеснена, повторная
+    нарезка найдёт файлы в хранилище sorl и просто вернёт её обратно.
+    """
+    found = cache.get(_ready_key(image.name, geometry, options))
+    return Thumbnail(*found) if found else None
+
+
+def _ready_all(image, chosen):
+    """Готовые миниатюры нарезок ``chosen`` одним запросом к кешу."""
+    keys = [_ready_key(image.name, size, options) for *_, size, options in chosen]
+    found = cache.get_many(keys)
+    return [Thumbnail(*found[key]) if key in found else None for key in keys]
+
+
+def picture(image, preset):
+    """Данные для ``<picture>`` или ``None``, пока нарезано не всё."""
+    chosen = variants([preset])
+    ready_thumbnails = _ready_all(image, chosen)
+    if None in ready_thumbnails:
+        return None
+    found = {}
+    for (_, width, mime, _, _), thumbnail in zip(chosen, ready_thumbnails):
+        found.setdefault(mime, []).append((width, thumbnail))
+    fallback = found.pop("image/jpeg")
+    largest = fallback[-1][1]
+    return {
+        "sources": [
+            {"type": mime, "srcset": _srcset(thumbnails)}
+            for mime, thumbnails in found.items()
+        ],
+        "srcset": _srcset(fallback),
+        "sizes": PRESETS[preset]["sizes"],
+        "src": largest.url,
+        "width": largest.width,
+        "height": largest.height,
+    }
+
+
+def placeholder(image, preset):
+    """Размер заглушки: как у самой крупной миниатюры пресета."""
+    width = PRESETS[preset]["widths"][-1]
+    ratio = PRESETS[preset]["ratio"]
+    if ratio is None:
+        # Пресет сохраняет пропорции исходника.
+        try:
+            ratio = image.height / image.width
+        except (OSError, TypeError, ZeroDivisionError, SuspiciousFileOperation):
+            ratio = PRESETS["card"]["ratio"]
+    return {"width": width, "height": round(width * ratio)}
+
+
+def _srcset(thumbnails):
+    return ", ".join(f"{thumbnail.url} {width}w" for width, thumbnail in thumbnails)
+
+
+def _failed_key(image):
+    return "thumbnail-failed:" + hashlib.md5(image.name.encode()).hexdigest()
+
+
+def failed(image):
+    """Исходник недавно не удалось открыть: ждать миниатюру бессмысленно."""
+    return bool(cache.get(_failed_key(image)))
+
+
+def generate(image):
+    """Нарезает все размеры; ``True``, если что-то пришлось строить."""
+    chosen = variants()
+    missing = [
+        (size, options)
+        for (*_, size, options), thumbnail in zip(chosen, _ready_all(image, chosen))
+        if thumbnail is None
+    ]
+    if not missing:
+        return False
+    started = time.perf_counter()
+    built = {}
+    for size, options in missing:
+        thumbnail = get_thumbnail(image, size, **options)
+        # sorl не бросает исключение на битый исходник, а только пишет в лог
+        # и не сохраняет миниатюру в своё хранилище.
+        if default.kvstore.get(thumbnail) is not None:
+            built[_ready_key(image.name, size, options)] = (
+                thumbnail.url, thumbnail.width, thumbnail.height,
+            )
+    metrics.THUMBNAIL_SECONDS.observe(time.perf_counter() - started)
+    cache.set_many(built, None)
+    if len(built) < len(missing):
+        # Не повторяем попытку на каждой отрисовке.
+        cache.set(
+            _failed_key(image),
+            True,
+            getattr(settings, "THUMBNAIL_RETRY_SECONDS", 600),
+        )
+        return False
+    return True
+
+
+def post_scopes(post):
+    scopes = [feed_cache.POSTS, feed_cache.author_scope(post.author.username)]
+    if post.group_id:
+        scopes.append(feed_cache.group_scope(post.group.slug))
+    return scopes
+
+
+def _run(image, scopes):
+    try:
+        if generate(image):
+            feed_cache.bump(*scopes)
+    except Exception:
+        logger.exception("Не удалось нарезать миниатюры %s", image.name)
+    finally:
+        with _lock:
+            _pending.pop(image.name, None)
+        connections.close_all()
+
+
+def enqueue(post):
+    """Ставит нарезку миниатюр поста в очередь, если её там ещё нет."""
+    image = post.image
+    if not image or failed(image):
+        return None
+    scopes = post_scopes(post)
+    pool = executor()
+    with _lock:
+        if image.name not in _pending:
+            _pending[image.name] = pool.submit(_run, image, scopes)
+        return _pending[image.name]
+
+
+def wait(timeout=None):
+    """Дожидается очереди нарезки; нужно тестам."""
+    with _lock:
+        futures = list(_pending.values())
+    wait_futures(futures, timeout=timeout)
+
+
+def remove(name):
+    """Удаляет картинку поста вместе с миниатюрами и их ключами."""
+    try:
+        delete(name)
+    except Exception:
+        logger.exception("Не удалось удалить картинку %s", name)
+    cache.delete_many([
+        _ready_key(name, size, options) for _, _, _, size, options in variants()
+    ])
@@ -1,20 +1,31 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Под ASGI ленты обслуживают асинхронные варианты из posts.async_views.
+feed_views = async_views if getattr(settings, "ASYNC_FEED_VIEWS", False) else views
 
 urlpatterns = [
     path("<username>/<int:post_id>/comment/", views.add_comment, name="add_comment"),
+    path(
+        "<str:username>/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     path(
         '<str:username>/<int:post_id>/edit/',
         views.post_edit,
         name='post_edit',
     ),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
-    path('group/<slug:slug>/', views.group_posts, name='group_posts'),
-    path("follow/", views.follow_index, name="follow_index"),
+    path('group/<slug:slug>/', feed_views.group_posts, name='group_posts'),
+    path("follow/", feed_views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
+    path("export/", views.export_account, name="export_account"),
     path("<str:username>/follow/", views.profile_follow, name="profile_follow"),
     path("<str:username>/unfollow/", views.profile_unfollow, name="profile_unfollow"),
     path('new/', views.new_post, name='new_post'),
-    path('<str:username>/', views.profile, name='profile'),
-    path('', views.index, name='index'),
+    path('<str:username>/', feed_views.profile, name='profile'),
+    path('', feed_views.index, name='index'),
 ]
 
@@ -1,38 +1,41 @@
 from datetime import datetime as dt
 
-from django.views.decorators.cache import cache_page
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.contrib.auth.models import User
 
-from .models import Post, Group, Comment, Follow
+from BGG.transactions import atomic_write
+
+from . import archive, export, feeds
+from .counters import author_stats
+from .feed_cache import (
+    POSTS, author_scope, cache_feed, group_scope, mark_write,
+)
+from .models import ArchivedPost, Post, Follow
 from .forms import PostForm, CommentForm
+from .pagination import CursorPaginator, decode_cursor
+from .removal import visible, visible_groups, visible_users
+from .search import decode_cursor as decode_search_cursor, search as search_posts
 
 
-@cache_page(20)
+@cache_feed(POSTS)
 def index(request):
-    post_list = Post.objects.order_by("-pub_date").all().select_related()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
     return render(
         request,
         "index.html",
-        {"page": page, "paginator": paginator},
+        feeds.latest().page(request),
     )
 
 
+@cache_feed(group_scope("{slug}"))
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group).order_by("-pub_date").all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
+    group = get_object_or_404(visible_groups(), slug=slug)
     return render(
         request,
         "group.html",
-        {"group": group, "page": page, "paginator": paginator},
+        {"group": group, **feeds.group(group).page(request)},
     )
 
 
@@ -47,46 +50,94 @@ def new_post(request):
         )
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    with atomic_write():
+        post.save()
+    mark_write(request)
     return redirect("/")
 
 
 def post_view(request, username, post_id):
-    user = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
-    post_list = user.posts.all().select_related("pk")
-    count_all_posts = post_list.count()
+    post = archive.get_post(
+        ("author__stats", "group"), author__username=username, pk=post_id
+    )
+    stats = author_stats(post.author)
     form = CommentForm(instance=None)
-    items = Comment.objects.filter(post=post)
+    order = _comment_order(request)
+    paginator = _comment_paginator(post, order)
+    # Страница поста читает не больше одной страницы комментариев.
+    items = paginator.ordered()[:paginator.per_page]
+    comments = paginator.page(
+        list(items),
+        has_next=post.comment_count > paginator.per_page,
+        params=request.GET,
+    )
     return render(
         request,
         "post.html",
         {
             "post": post,
             "author": post.author,
-            "count_all_posts": count_all_posts,
+            "stats": stats,
+            "count_all_posts": stats.posts_count,
             "items": items,
+            "comments": comments,
+            "order": order,
             "form": form,
             "post_id": post_id,
+            "archived": isinstance(post, ArchivedPost),
         },
     )
 
 
+def post_comments(request, username, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+    post = archive.get_post(("author",), author__username=username, pk=post_id)
+    order = _comment_order(request)
+    paginator = _comment_paginator(post, order)
+    key = decode_cursor(request.GET.get("after", ""))
+    if key is None:
+        comments = paginator.first(request.GET)
+    else:
+        comments = paginator.after(key, request.GET)
+    return render(
+        request,
+        "comment_list.html",
+        {"post": post, "items": comments, "comments": comments, "order": order},
+    )
+
+
+def _comment_order(request):
+    return "new" if request.GET.get("order") == "new" else "old"
+
+
+def _comment_paginator(post, order):
+    return CursorPaginator(
+        post.comments.select_related("author"),
+        getattr(settings, "COMMENTS_PER_PAGE", 50),
+        keys=("created", "pk"),
+        descending=order == "new",
+    )
+
+
 @login_required()
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
+    post = get_object_or_404(
+        visible(Post.objects), author__username=username, pk=post_id
+    )
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.post = post
         comment.author = request.user
-        comment.save()
+        with atomic_write():
+            comment.save()
+        mark_write(request)
     return redirect("post", username=username, post_id=post_id)
 
 
 @login_required()
 def post_edit(request, username, post_id):
-    user = get_object_or_404(User, username=username)
+    user = get_object_or_404(visible_users(), username=username)
     post = get_object_or_404(Post, author=user, pk=post_id)
     if post.author == request.user:
         form = PostForm(
@@ -101,10 +152,42 @@ def post_edit(request, username, post_id):
         post = form.save(commit=False)
         post.author = request.user
         post.pub_date = dt.now()
-        post.save()
+        with atomic_write():
+            # Без comment_count: его могли увеличить, пока пост правили.
+            post.save(
+                update_fields=[*PostForm.Meta.fields, "author", "pub_date", "version"]
+            )
+        mark_write(request)
     return redirect(f"/{username}/{post_id}/")
 
 
+def search(request):
+    query = request.GET.get("q", "").strip()
+    cursor = search_posts(
+        query,
+        after=decode_search_cursor(request.GET.get("after", "")),
+        before=decode_search_cursor(request.GET.get("before", "")),
+        params=request.GET,
+    )
+    return render(
+        request,
+        "search.html",
+        {"query": query, "cursor": cursor},
+    )
+
+
+@login_required
+def export_account(request):
+    """Архив своих постов, комментариев, подписок и картинок."""
+    response = StreamingHttpResponse(
+        export.archive(request.user), content_type="application/zip"
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{request.user.username}.zip"'
+    )
+    return response
+
+
 def page_not_found(request, exception):
     return render(
         request,
@@ -118,68 +201,54 @@ def server_error(request):
     return render(request, "misc/500.html", status=500)
 
 
+@cache_feed(author_scope("{username}"))
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=user).all().select_related()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    if (
-        Follow.objects.filter(user__username=request.user)
-        .filter(author__username=username)
-        .exists()
-    ):
-        flag_subscribe = True
-    else:
-        flag_subscribe = False
-    count_subscribers = Follow.objects.filter(author__username=username).count()
-    count_subscriptions = Follow.objects.filter(user__username=username).count()
+    user = get_object_or_404(
+        visible_users(User.objects.select_related("stats")), username=username
+    )
+    stats = author_stats(user)
+    flag_subscribe = (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=user).exists()
+    )
     return render(
         request,
         "profile.html",
         {
-            "page": page,
-            "paginator": paginator,
+            **feeds.author(user).page(request),
+            "count_posts": stats.posts_count,
             "user": user,
             "flag_subscribe": flag_subscribe,
-            "count_subscribers": count_subscribers,
-            "count_subscriptions": count_subscriptions,
+            "count_subscribers": stats.followers_count,
+            "count_subscriptions": stats.following_count,
         },
     )
 
 
 @login_required
 def follow_index(request):
-    # post_list = Post.objects.filter(author__follower__author=request.user)
-    post_list = Post.objects.filter(author__following__user=request.user)
-    if not post_list:
-        return render(
-            request,
-            "follow.html",
-            {},
-        )
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
     return render(
         request,
         "follow.html",
-        {"page": page, "paginator": paginator},
+        feeds.following(request.user).page(request),
     )
 
 
 @login_required
 def profile_follow(request, username):
-    Follow.objects.create(
-        user=User.objects.get(username=request.user),
-        author=User.objects.get(username=username),
-    )
+    author = get_object_or_404(visible_users(), username=username)
+    if author != request.user:
+        with atomic_write():
+            Follow.objects.get_or_create(user=request.user, author=author)
+        mark_write(request)
     return redirect(f"/{username}/")
 
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(user__username=request.user).filter(
-        author__username=username
-    ).delete()
+    with atomic_write():
+        Follow.objects.filter(user__username=request.user).filter(
+            author__username=username
+        ).delete()
+    mark_write(request)
     return redirect(f"/{username}/")
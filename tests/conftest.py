@@ -1,4 +1,44 @@
+import pytest
+
 pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True, scope='session')
+def shared_cache_location(tmp_path_factory):
+    # Кеш лежит в файле: тесты пишут в свой, а не в cache.sqlite3 проекта.
+    from django.conf import settings
+    from django.test import override_settings
+    location = tmp_path_factory.mktemp('cache') / 'cache.sqlite3'
+    default = {**settings.CACHES['default'], 'LOCATION': str(location)}
+    with override_settings(CACHES={**settings.CACHES, 'default': default}):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_cache(shared_cache_location):
+    # Страницы прошлых тестов не должны читаться в новых.
+    from django.core.cache import cache
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    # Картинки и миниатюры тестов не должны попадать в media/ репозитория.
+    settings.MEDIA_ROOT = str(tmp_path)
+
+
+@pytest.fixture(autouse=True)
+def finish_thumbnails():
+    # Фоновая нарезка не должна доживать до следующего теста и его базы.
+    yield
+    from posts import thumbnails
+    thumbnails.wait()
+
+
+@pytest.fixture(autouse=True)
+def strict_query_budgets(settings):
+    # В тестах превышение бюджета запросов (BGG.profiling) роняет тест.
+    settings.QUERY_BUDGET_STRICT = True
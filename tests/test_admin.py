@@ -0,0 +1,106 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts import counters
+from posts.models import AuthorStats, Comment, Group, Post, TimelineEntry
+
+
+class TestLargeTableAdmin:
+
+    @pytest.fixture
+    def posts(self, user, group):
+        posts = [
+            Post.objects.create(text=f'Пост админки {i}', author=user, group=group)
+            for i in range(6)
+        ]
+        for post in posts[:3]:
+            Comment.objects.create(post=post, author=user, text='Комментарий')
+        return posts
+
+    def assert_counters(self, user):
+        stats = AuthorStats.objects.get(user=user)
+        assert stats.posts_count == Post.objects.filter(author=user).count()
+        assert stats.comments_count == Comment.objects.filter(author=user).count()
+        assert not counters.drifted_comment_counts().exists()
+        for group_id, actual in counters.actual_group_counts():
+            assert Group.objects.get(pk=group_id).posts_count == actual, \
+                'Проверьте, что массовые действия поддерживают счётчики групп'
+        assert counters.get_counter(counters.POSTS) == Post.objects.count()
+
+    def changelist_queries(self, client, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        return [query['sql'].upper() for query in queries]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changelist_without_scans(self, admin_client, user, group, posts):
+        few = self.changelist_queries(admin_client, '/admin/posts/post/')
+        for i in range(10):
+            Post.objects.create(text=f'Ещё пост {i}', author=user)
+        many = self.changelist_queries(admin_client, '/admin/posts/post/')
+        assert len(many) == len(few), \
+            'Проверьте, что список постов в админке читает авторов через list_select_related'
+        sql = ' '.join(many)
+        assert 'COUNT(' not in sql, 'Проверьте, что без фильтров число постов берётся из счётчика'
+        assert 'DISTINCT' not in sql, 'Проверьте, что date_hierarchy не просматривает всю таблицу'
+
+        Post.objects.filter(pk=posts[0].pk).update(pub_date='2019-03-01T10:00:00+05:00')
+        response = admin_client.get('/admin/posts/post/')
+        assert '?pub_date__year=2019' in response.content.decode(), \
+            'Проверьте, что date_hierarchy выводит годы постов'
+        response = admin_client.get('/admin/posts/post/', {'pub_date__year': 2019})
+        assert 'pub_date__month=3' in response.content.decode()
+
+        response = admin_client.get('/admin/posts/comment/')
+        assert response.status_code == 200
+        response = admin_client.get('/admin/posts/post/', {'q': f'@{user.username}'})
+        assert len(response.context['cl'].result_list) == 16
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_posts(self, admin_client, user, posts):
+        selected = [post.pk for post in posts[:4]]
+        response = admin_client.post('/admin/posts/post/', {
+            'action': 'delete_posts', '_selected_action': selected,
+        })
+        assert response.status_code == 302
+        assert not Post.objects.filter(pk__in=selected).exists()
+        assert Comment.objects.count() == 0
+        assert not TimelineEntry.objects.filter(post_id__in=selected).exists()
+        self.assert_counters(user)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_move_to_group(self, admin_client, user, group, posts):
+        target = Group.objects.create(title='Новая', slug='new-group', description='-')
+        versions = dict(Post.objects.values_list('pk', 'version'))
+        admin_client.post('/admin/posts/post/', {
+            'action': 'move_to_group', 'group': target.pk, 'select_across': 1,
+            '_selected_action': [posts[0].pk],
+        })
+        assert Post.objects.filter(group=target).count() == 6
+        assert all(post.version > versions[post.pk] for post in Post.objects.all()), \
+            'Проверьте, что перенос меняет версию карточек'
+        self.assert_counters(user)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_delete_comments(self, admin_client, user, posts):
+        comment = Comment.objects.first()
+        admin_client.post('/admin/posts/comment/', {
+            'action': 'delete_comments', '_selected_action': [comment.pk],
+        })
+        assert not Comment.objects.filter(pk=comment.pk).exists()
+        self.assert_counters(user)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_change_keeps_counters(self, admin_client, user, group, posts):
+        with CaptureQueriesContext(connection) as queries:
+            admin_client.post(f'/admin/posts/group/{group.pk}/change/', {
+                'title': 'Новое название', 'slug': group.slug, 'description': '-',
+            })
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "posts_group"')]
+        assert updates and not any('"posts_count"' in sql for sql in updates), \
+            'Проверьте, что правка группы в админке не перезаписывает счётчик'
+        group.refresh_from_db()
+        assert (group.title, group.posts_count) == ('Новое название', 6)
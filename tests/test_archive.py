@@ -0,0 +1,146 @@
+import zlib
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from posts import counters, removal
+from posts.models import (
+    ArchivedComment, ArchivedPost, AuthorStats, Comment, Follow, Post, TimelineEntry,
+)
+
+
+class TestArchive:
+
+    @pytest.fixture
+    def reader(self, user):
+        reader = get_user_model().objects.create_user(username='ArchiveReader')
+        Follow.objects.create(user=reader, author=user)
+        return reader
+
+    @pytest.fixture
+    def posts(self, user, group, reader):
+        posts = [
+            Post.objects.create(text=f'Пост {i} ' + 'длинный текст ' * 50,
+                                author=user, group=group)
+            for i in range(12)
+        ]
+        old = timezone.now() - timedelta(days=800)
+        for i, post in enumerate(posts[:8]):
+            Post.objects.filter(pk=post.pk).update(pub_date=old + timedelta(hours=i))
+        Comment.objects.create(post=posts[0], author=reader, text='Старый комментарий')
+        Comment.objects.create(post=posts[11], author=reader, text='Свежий комментарий')
+        return posts
+
+    def assert_counters(self, user):
+        call_command('rebuild_stats', '--check')
+        assert counters.get_counter(counters.POSTS) == Post.objects.count(), \
+            'Проверьте, что общий счётчик считает только горячие посты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_moves_old_posts(self, user, reader, posts):
+        stats = AuthorStats.objects.get(user=user)
+        call_command('archive_posts', '--batch-size', 3)
+
+        assert Post.objects.count() == 4, 'Проверьте, что старые посты уходят из горячей таблицы'
+        assert set(ArchivedPost.objects.values_list('pk', flat=True)) == {
+            post.pk for post in posts[:8]
+        }, 'Проверьте, что архивные посты сохраняют id'
+        archived = ArchivedPost.objects.get(pk=posts[0].pk)
+        assert archived.text == posts[0].text and archived.comment_count == 1
+        assert ArchivedComment.objects.get().text == 'Старый комментарий'
+        assert list(Comment.objects.values_list('text', flat=True)) == ['Свежий комментарий']
+        assert not TimelineEntry.objects.filter(post_id=posts[0].pk).exists(), \
+            'Проверьте, что записи лент подписок архивных постов удаляются'
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT text FROM posts_archivedpost WHERE id = %s', [posts[0].pk])
+            stored, = cursor.fetchone()
+        assert len(stored) < len(posts[0].text.encode()), 'Проверьте, что текст сжат'
+        assert zlib.decompress(stored).decode() == posts[0].text
+
+        assert AuthorStats.objects.get(user=user).posts_count == stats.posts_count, \
+            'Проверьте, что архивные посты остаются в счётчиках автора'
+        self.assert_counters(user)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_view_reads_archive(self, client, user_client, user, posts):
+        call_command('archive_posts')
+        url = f'/{user.username}/{posts[0].pk}/'
+        response = client.get(url)
+        assert response.status_code == 200, \
+            'Проверьте, что страница архивного поста открывается по старой ссылке'
+        assert response.context['post'].text == posts[0].text
+        assert [comment.text for comment in response.context['comments']] == \
+            ['Старый комментарий']
+        assert client.get(f'{url}comments/').status_code == 200
+
+        user_client.post(f'{url}comment/', {'text': 'Новый комментарий'})
+        assert not Comment.objects.filter(text='Новый комментарий').exists(), \
+            'Проверьте, что архивный пост нельзя комментировать'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_continues_into_archive(self, client, user, posts):
+        call_command('archive_posts')
+        response = client.get(f'/{user.username}/')
+        page = response.context['cursor']
+        assert [post.pk for post in page] == [post.pk for post in posts[::-1][:10]], \
+            'Проверьте, что лента профиля продолжается архивными постами'
+        assert page.object_list[-1].excerpt, 'Проверьте, что у архивной карточки есть текст'
+        assert page.has_next()
+
+        response = client.get(f'/{user.username}/?{page.next_query}')
+        assert [post.pk for post in response.context['cursor']] == \
+            [posts[1].pk, posts[0].pk]
+        response = client.get(f'/{user.username}/', {'page': 2})
+        assert [post.pk for post in response.context['cursor']] == \
+            [posts[1].pk, posts[0].pk], 'Проверьте переход по номеру страницы в архив'
+        previous = response.context['cursor'].previous_query
+        response = client.get(f'/{user.username}/?{previous}')
+        assert len(response.context['cursor']) == 10
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_merges_backdated_posts(self, client, user, posts):
+        call_command('archive_posts')
+        # Импорт пишет старые посты в горячую таблицу.
+        backdated = Post.objects.create(text='Пост задним числом', author=user)
+        Post.objects.filter(pk=backdated.pk).update(
+            pub_date=timezone.now() - timedelta(days=900)
+        )
+        page = client.get(f'/{user.username}/').context['cursor']
+        assert backdated.pk not in [post.pk for post in page]
+        expected = [posts[1].pk, posts[0].pk, backdated.pk]
+        response = client.get(f'/{user.username}/?{page.next_query}')
+        assert [post.pk for post in response.context['cursor']] == expected, \
+            'Проверьте, что горячие и архивные посты профиля идут по дате'
+        response = client.get(f'/{user.username}/', {'page': 2})
+        assert [post.pk for post in response.context['cursor']] == expected
+
+    @pytest.mark.django_db(transaction=True)
+    def test_dumpdata_roundtrip(self, tmp_path, posts):
+        call_command('archive_posts')
+        texts = dict(ArchivedPost.objects.values_list('pk', 'text'))
+        dump = tmp_path / 'archive.json'
+        call_command('dumpdata', 'posts.ArchivedPost', 'posts.ArchivedComment',
+                     output=str(dump))
+        ArchivedComment.objects.all().delete()
+        ArchivedPost.objects.all().delete()
+
+        call_command('loaddata', str(dump))
+        assert dict(ArchivedPost.objects.values_list('pk', 'text')) == texts, \
+            'Проверьте, что архив переносится через dumpdata и loaddata'
+        assert ArchivedComment.objects.get().text == 'Старый комментарий'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_removal_reaps_archive(self, user, reader, posts):
+        call_command('archive_posts')
+        removal.schedule(user)
+        removal.reap(rate=0)
+        assert not ArchivedPost.objects.exists()
+        assert not ArchivedComment.objects.exists()
+        assert AuthorStats.objects.get(user=reader).comments_count == 0, \
+            'Проверьте, что очистка архива поддерживает счётчики комментаторов'
+        self.assert_counters(reader)
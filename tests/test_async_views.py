@@ -0,0 +1,75 @@
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.http import Http404
+from django.test import RequestFactory
+
+from posts import async_views, thumbnails, views
+from posts.models import Follow
+
+
+def make_request(path, user=None):
+    request = RequestFactory().get(path)
+    request.user = user or AnonymousUser()
+    request.session = SessionStore()
+    return request
+
+
+class TestAsyncViews:
+
+    def both(self, name, path, user=None, **kwargs):
+        # Картинки нарезаются в фоне: нарезка, запущенная одной страницей,
+        # должна закончиться до того, как кеш очистят для другой.
+        thumbnails.wait()
+        pages = []
+        for module in (views, async_views):
+            cache.clear()
+            view = getattr(module, name)
+            if module is async_views:
+                view = async_to_sync(view)
+            response = view(make_request(path, user), **kwargs)
+            thumbnails.wait()
+            assert response.status_code == 200
+            pages.append(response.content.decode())
+        return pages
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feeds_match_sync_views(self, user, post_with_group, django_user_model):
+        reader = django_user_model.objects.create_user(username='Reader')
+        Follow.objects.create(user=reader, author=user)
+        cases = [
+            ('index', '/', None, {}),
+            ('group_posts', '/group/test-link/', None, {'slug': 'test-link'}),
+            ('profile', f'/{user.username}/', None, {'username': user.username}),
+            ('profile', f'/{user.username}/', reader, {'username': user.username}),
+            ('follow_index', '/follow/', reader, {}),
+        ]
+        for name, path, viewer, kwargs in cases:
+            sync_page, async_page = self.both(name, path, viewer, **kwargs)
+            assert 'Тестовый пост 2' in async_page
+            assert async_page == sync_page, \
+                f'Проверьте, что асинхронная `{name}` отдаёт ту же страницу, что и синхронная'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_follow_flag(self, user, post, django_user_model):
+        reader = django_user_model.objects.create_user(username='Reader')
+        profile = async_to_sync(async_views.profile)
+        page = profile(make_request(f'/{user.username}/', reader), username=user.username)
+        assert 'Подписаться' in page.content.decode()
+
+        Follow.objects.create(user=reader, author=user)
+        cache.clear()
+        page = profile(make_request(f'/{user.username}/', reader), username=user.username)
+        assert 'Отписаться' in page.content.decode(), \
+            'Проверьте, что асинхронный профиль проверяет подписку читателя'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_missing_and_anonymous(self):
+        with pytest.raises(Http404):
+            async_to_sync(async_views.profile)(make_request('/nobody/'), username='nobody')
+        response = async_to_sync(async_views.follow_index)(make_request('/follow/'))
+        assert response.status_code == 302
+        assert response.url.startswith('/auth/login/'), \
+            'Проверьте, что асинхронная лента подписок требует авторизации'
@@ -0,0 +1,73 @@
+import multiprocessing
+
+import pytest
+
+from BGG import cache as backend
+from BGG.cache import SQLiteCache
+
+
+def make_cache(path, **options):
+    return SQLiteCache(str(path), {'OPTIONS': {'ACCESS_RESOLUTION': 0, **options}})
+
+
+def bump(path, times):
+    cache = make_cache(path)
+    for _ in range(times):
+        cache.incr('hits')
+
+
+class TestSQLiteCache:
+
+    def test_basic_operations(self, tmp_path):
+        cache = make_cache(tmp_path / 'cache.sqlite3')
+        cache.set('key', {'value': 1})
+        assert cache.get('key') == {'value': 1}
+        assert cache.add('key', 'other') is False, 'Проверьте, что add не затирает живую запись'
+        assert cache.get_many(['key', 'missing']) == {'key': {'value': 1}}
+        cache.set('none', None)
+        assert cache.get('none', 'default') is None
+        assert cache.delete('key') and cache.get('key') is None
+        with pytest.raises(ValueError):
+            cache.incr('missing')
+
+    def test_ttl(self, tmp_path, monkeypatch):
+        cache = make_cache(tmp_path / 'cache.sqlite3')
+        now = [1000.0]
+        monkeypatch.setattr(backend.time, 'time', lambda: now[0])
+        cache.set('short', 'value', timeout=10)
+        cache.set('forever', 'value', timeout=None)
+        now[0] += 11
+        assert cache.get('short') is None, 'Проверьте, что просроченная запись не читается'
+        assert cache.add('short', 'new') is True, 'Проверьте, что add заменяет просроченную запись'
+        assert cache.get('forever') == 'value'
+
+    def test_lru_and_size_bound(self, tmp_path, monkeypatch):
+        cache = make_cache(tmp_path / 'cache.sqlite3', MAX_ENTRIES=10, MAX_SIZE=10_000)
+        now = [1000.0]
+        monkeypatch.setattr(backend.time, 'time', lambda: now[0])
+        for i in range(10):
+            now[0] += 1
+            cache.set(f'key{i}', i)
+        now[0] += 1
+        cache.get('key0')
+        now[0] += 1
+        cache.set('key10', 10)
+        assert cache.get('key0') == 0, 'Проверьте, что недавно прочитанная запись не вытесняется'
+        assert cache.get('key1') is None, 'Проверьте, что вытесняется давно не читанная запись'
+
+        for i in range(20):
+            cache.set(f'big{i}', 'x' * 1000)
+        size, = cache._connection().execute('SELECT size FROM cache_totals').fetchone()
+        assert size <= 10_000, 'Проверьте, что кеш соблюдает границу по размеру'
+
+    def test_incr_is_atomic_across_processes(self, tmp_path):
+        path = tmp_path / 'cache.sqlite3'
+        make_cache(path).set('hits', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=bump, args=(path, 100)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        assert make_cache(path).get('hits') == 400, \
+            'Проверьте, что incr атомарен между процессами'
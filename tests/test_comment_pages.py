@@ -0,0 +1,65 @@
+import re
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment
+
+
+class TestCommentPages:
+
+    @pytest.fixture(autouse=True)
+    def per_page(self, settings):
+        settings.COMMENTS_PER_PAGE = 5
+
+    def add_comments(self, post, count):
+        start = post.comments.count()
+        for i in range(start, start + count):
+            author = get_user_model().objects.create_user(username=f'Commenter{i}')
+            Comment.objects.create(post=post, author=author, text=f'Комментарий {i}')
+
+    def texts(self, response):
+        return [item.text for item in response.context['items']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_page_is_capped(self, client, post):
+        self.add_comments(post, 2)
+        url = f'/{post.author.username}/{post.id}/'
+        with CaptureQueriesContext(connection) as few:
+            client.get(url)
+
+        self.add_comments(post, 10)
+        with CaptureQueriesContext(connection) as many:
+            response = client.get(url)
+        assert len(many) == len(few), \
+            'Проверьте, что авторы комментариев загружаются вместе с комментариями'
+        assert self.texts(response) == [f'Комментарий {i}' for i in range(5)], \
+            'Проверьте, что страница поста выводит только первую страницу комментариев'
+        assert 'Показать ещё' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_load_more(self, client, post):
+        self.add_comments(post, 12)
+        response = client.get(f'/{post.author.username}/{post.id}/')
+        seen = self.texts(response)
+        while True:
+            more = re.search(r'href="([^"]+/comments/\?[^"]+)"', response.content.decode())
+            if not more:
+                break
+            response = client.get(more.group(1).replace('&amp;', '&'))
+            assert response.status_code == 200
+            seen += self.texts(response)
+        assert seen == [f'Комментарий {i}' for i in range(12)], \
+            'Проверьте, что «Показать ещё» подгружает комментарии без пропусков и повторов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_newest_first(self, client, post):
+        self.add_comments(post, 7)
+        response = client.get(f'/{post.author.username}/{post.id}/?order=new')
+        assert self.texts(response) == [f'Комментарий {i}' for i in range(6, 1, -1)]
+        more = re.search(r'href="([^"]+/comments/\?[^"]+)"', response.content.decode())
+        response = client.get(more.group(1).replace('&amp;', '&'))
+        assert self.texts(response) == ['Комментарий 1', 'Комментарий 0'], \
+            'Проверьте порядок «сначала новые» на следующих страницах'
@@ -0,0 +1,86 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.counters import POSTS, get_counter
+from posts.models import AuthorStats, Comment, Follow, Group, Post
+
+
+class TestCounters:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_counters_follow_writes(self, user, group):
+        other = get_user_model().objects.create_user(username='CounterUser')
+        post = Post.objects.create(text='Пост со счётчиком', author=user, group=group)
+        Post.objects.create(text='Ещё пост', author=user)
+        Comment.objects.create(post=post, author=other, text='Комментарий')
+        Follow.objects.create(user=other, author=user)
+
+        stats = AuthorStats.objects.get(user=user)
+        assert stats.posts_count == 2, 'Проверьте, что счётчик постов автора обновляется'
+        assert stats.followers_count == 1, 'Проверьте, что счётчик подписчиков обновляется'
+        other_stats = AuthorStats.objects.get(user=other)
+        assert other_stats.comments_count == 1
+        assert other_stats.following_count == 1
+        assert Group.objects.get(pk=group.pk).posts_count == 1, \
+            'Проверьте, что счётчик постов группы обновляется'
+        assert get_counter(POSTS) == 2, 'Проверьте, что общий счётчик постов обновляется'
+
+        post.group = None
+        post.save()
+        assert Group.objects.get(pk=group.pk).posts_count == 0, \
+            'Проверьте, что при смене группы счётчик переносится'
+
+        Post.objects.filter(author=user).delete()
+        Follow.objects.all().delete()
+        stats.refresh_from_db()
+        assert (stats.posts_count, stats.followers_count) == (0, 0), \
+            'Проверьте, что счётчики уменьшаются при удалении'
+        assert get_counter(POSTS) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_profile_reads_counters(self, client, user, post):
+        response = client.get(f'/{user.username}/')
+        assert response.context['count_posts'] == 1
+        assert response.context['count_subscribers'] == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_rebuild_stats_detects_drift(self, user, post):
+        call_command('rebuild_stats', '--check')
+        AuthorStats.objects.filter(user=user).update(posts_count=42)
+        with pytest.raises(CommandError):
+            call_command('rebuild_stats', '--check')
+        call_command('rebuild_stats')
+        assert AuthorStats.objects.get(user=user).posts_count == 1, \
+            'Проверьте, что `rebuild_stats` исправляет расхождения'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_post_edit_keeps_comment_count(self, user_client, user, post):
+        Comment.objects.create(post=post, author=user, text='Комментарий')
+        with CaptureQueriesContext(connection) as queries:
+            user_client.post(f'/{user.username}/{post.pk}/edit/', {'text': 'Правка'})
+        assert not any(
+            query['sql'].startswith('UPDATE "posts_post"')
+            and '"comment_count" =' in query['sql'] for query in queries
+        ), 'Проверьте, что правка поста не перезаписывает счётчик комментариев'
+        post.refresh_from_db()
+        assert (post.text, post.comment_count) == ('Правка', 1)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_versions_without_rereading(self, user, post):
+        with CaptureQueriesContext(connection) as queries:
+            post.text = 'Новый текст'
+            post.save()
+        assert not any(
+            query['sql'].startswith('SELECT "posts_post"."id", "posts_post"."version"')
+            for query in queries
+        ), 'Проверьте, что сохранение поста не перечитывает версию'
+        assert post.version == Post.objects.get(pk=post.pk).version == 1
+
+        Post.objects.filter(pk=post.pk).update(comment_count=5)
+        call_command('rebuild_stats')
+        assert Post.objects.get(pk=post.pk).version == 2, \
+            'Проверьте, что rebuild_stats меняет версию карточки вместе со счётчиком'
@@ -0,0 +1,98 @@
+import re
+
+import pytest
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Post
+from posts.pagination import WINDOW, CursorPage, page_window
+
+
+def page_texts(response):
+    return [post.text for post in response.context['page']]
+
+
+def cursor_link(response, name):
+    match = re.search(rf'href="\?([^"]*{name}=[^"]*)"', response.content.decode())
+    assert match is not None, f'Проверьте, что в паджинаторе есть ссылка с параметром `{name}`'
+    return '?' + match.group(1).replace('&amp;', '&')
+
+
+class TestCursorPaginator:
+
+    @pytest.fixture
+    def posts(self, user, group):
+        return [
+            Post.objects.create(text=f'Пост {i:02}', author=user, group=group)
+            for i in range(25)
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_walk_forward_and_back(self, client, group, posts):
+        url = f'/group/{group.slug}/'
+        expected = [post.text for post in reversed(posts)]
+
+        response = client.get(url)
+        assert page_texts(response) == expected[:10]
+        response = client.get(url + cursor_link(response, 'after'))
+        assert page_texts(response) == expected[10:20]
+        response = client.get(url + cursor_link(response, 'after'))
+        assert page_texts(response) == expected[20:], \
+            'Проверьте, что курсор `after` ведёт на следующую страницу'
+        assert not response.context['cursor'].has_next()
+
+        response = client.get(url + cursor_link(response, 'before'))
+        assert page_texts(response) == expected[10:20], \
+            'Проверьте, что курсор `before` ведёт на предыдущую страницу'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_legacy_page_number(self, client, group, posts):
+        response = client.get(f'/group/{group.slug}/?page=2')
+        assert page_texts(response) == [post.text for post in reversed(posts)][10:20], \
+            'Проверьте, что старые ссылки `?page=N` открывают ту же страницу'
+
+        response = client.get(f'/group/{group.slug}/?page=100')
+        assert response.status_code == 200
+        assert len(response.context['page']) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_no_offset_or_count(self, client, group, posts):
+        url = f'/group/{group.slug}/'
+        response = client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url + cursor_link(response, 'after'))
+        sql = ' '.join(query['sql'] for query in queries).upper()
+        assert 'COUNT(' not in sql, 'Курсорная страница не должна считать COUNT(*)'
+        assert 'OFFSET' not in sql, 'Курсорная страница не должна использовать OFFSET'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_page_window(self, client, group, posts):
+        url = f'/group/{group.slug}/'
+        response = client.get(url)
+        assert [link.number for link in response.context['cursor'].page_links] == [1, 2]
+        response = client.get(url + cursor_link(response, 'after'))
+        links = response.context['cursor'].page_links
+        assert [(link.number, link.current) for link in links] == \
+            [(1, False), (2, True), (3, False)], \
+            'Проверьте, что курсорная страница знает свой номер и показывает окно страниц'
+        queries = [link.query for link in links]
+        assert 'before=' in queries[0] and 'after=' in queries[2], \
+            'Проверьте, что соседние страницы открываются по курсору, а не по OFFSET'
+
+    def test_offset_links_nofollow(self):
+        page = CursorPage(
+            ['пост'], next_cursor='n', previous_cursor='p', has_previous=True, number=5
+        )
+        links = {link.number: link for link in page.page_links}
+        assert [number for number, link in links.items() if link.nofollow] == [2, 3], \
+            'Проверьте, что ссылки со смещением помечены rel="nofollow"'
+        assert 'before=p' in links[4].query and 'after=n' in links[6].query
+        assert links[1].query == 'page=1'
+
+    def test_page_window_size(self):
+        windows = [list(page_window(number, 50_000)) for number in (1, 20_000, 50_000)]
+        assert all(len(window) <= 2 * WINDOW + 5 for window in windows), \
+            'Проверьте, что число ссылок на страницы не зависит от длины ленты'
+        assert windows[1][:2] == [1, Paginator.ELLIPSIS]
+        assert windows[1][-1] == 50_000
@@ -0,0 +1,31 @@
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from BGG.transactions import atomic_write
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Прагмы есть только у SQLite')
+class TestDatabaseProfile:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            assert cursor.fetchone()[0] == 5000, 'Проверьте, что соединение ждёт блокировку'
+            cursor.execute('PRAGMA cache_size')
+            assert cursor.fetchone()[0] == -64000
+
+    @pytest.mark.django_db(transaction=True)
+    def test_write_transactions_take_write_lock_upfront(self):
+        with CaptureQueriesContext(connection) as queries:
+            with atomic_write():
+                with transaction.atomic():
+                    pass
+            with transaction.atomic():
+                pass
+        sql = [query['sql'] for query in queries]
+        assert sql[0] == 'BEGIN IMMEDIATE', \
+            'Проверьте, что транзакции на запись сразу берут блокировку на запись'
+        assert sql.count('BEGIN IMMEDIATE') == 1 and 'BEGIN' in sql, \
+            'Проверьте, что остальные транзакции открываются обычным BEGIN'
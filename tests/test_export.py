@@ -0,0 +1,80 @@
+import io
+import json
+import zipfile
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+
+from posts import thumbnails
+from posts.models import Comment, Follow, Post
+
+PNG = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x01\x00\x00\x00\x01\x08\x06'
+    b'\x00\x00\x00\x1f\x15\xc4\x89\x00\x00\x00\rIDATx\x9cc\xf8\x0f\x00\x00\x01'
+    b'\x01\x00\x05\x18\xd8N\x00\x00\x00\x00IEND\xaeB`\x82'
+)
+
+
+class TestExport:
+
+    @pytest.fixture
+    def account(self, user, group, django_user_model, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        Post.objects.create(
+            text='Пост с картинкой', author=user, group=group,
+            image=SimpleUploadedFile('pixel.png', PNG, content_type='image/png'),
+        )
+        # Миниатюры режутся в фоне и пишут в ту же базу: дожидаемся их.
+        thumbnails.wait()
+        for i in range(30):
+            post = Post.objects.create(text=f'Пост {i}', author=user)
+        other = django_user_model.objects.create_user(
+            username='Friend', first_name='Имя', last_name='Фамилия'
+        )
+        Comment.objects.create(post=post, author=user, text='Свой комментарий')
+        Follow.objects.create(user=user, author=other)
+        return user
+
+    def records(self, bundle, name):
+        return [json.loads(line) for line in bundle.read(name).decode().splitlines()]
+
+    def check_archive(self, data, user):
+        bundle = zipfile.ZipFile(io.BytesIO(data))
+        assert bundle.testzip() is None
+        posts = self.records(bundle, 'posts.ndjson')
+        assert len(posts) == 31
+        assert {post['type'] for post in posts} == {'post'}
+        assert self.records(bundle, 'comments.ndjson')[0]['text'] == 'Свой комментарий'
+        owner, *others = self.records(bundle, 'users.ndjson')
+        assert owner['username'] == user.username and 'email' in owner
+        assert others == [
+            {'type': 'user', 'id': Follow.objects.get().author_id, 'username': 'Friend'}
+        ], 'Проверьте, что о других пользователях в архив попадает только имя'
+        assert self.records(bundle, 'follows.ndjson') == [
+            {'type': 'follow', 'user': user.pk, 'author': Follow.objects.get().author_id}
+        ]
+        image = next(post['image'] for post in posts if post['image'])
+        assert bundle.read(f'media/{image}') == PNG, \
+            'Проверьте, что в архив попадают исходные картинки'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_view_streams_zip(self, account, user_client):
+        response = user_client.get('/export/')
+        assert response.streaming, 'Проверьте, что архив отдаётся потоком'
+        assert response['Content-Type'] == 'application/zip'
+        chunks = list(response.streaming_content)
+        assert len(chunks) > 1
+        self.check_archive(b''.join(chunks), account)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_requires_login(self, client):
+        response = client.get('/export/')
+        assert response.status_code == 302
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_command(self, account, tmp_path):
+        output = tmp_path / 'archive.zip'
+        call_command('export_account', account.username, '-o', str(output),
+                     '--chunk-size', '7', stdout=io.StringIO())
+        self.check_archive(output.read_bytes(), account)
@@ -0,0 +1,79 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from posts import feed_cache
+from posts.models import Comment, Post
+
+
+class TestFeedCache:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cached_until_changed(self, client, user, group, post_with_group):
+        for url in ('/', f'/group/{group.slug}/', f'/{user.username}/'):
+            client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            assert len(queries) == 0, f'Проверьте, что страница `{url}` берётся из кеша'
+            assert 'Тестовый пост 2' in response.content.decode()
+
+        Post.objects.create(text='Свежий пост 8371', author=user, group=group)
+        for url in ('/', f'/group/{group.slug}/', f'/{user.username}/'):
+            assert 'Свежий пост 8371' in client.get(url).content.decode(), \
+                f'Проверьте, что новый пост сразу сбрасывает кеш страницы `{url}`'
+
+        Comment.objects.create(post=post_with_group, author=user, text='Комментарий')
+        assert '1 комментариев' in client.get('/').content.decode(), \
+            'Проверьте, что новый комментарий сбрасывает кеш ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_rename_resets_profiles(self, client, user, group, post_with_group):
+        client.get(f'/{user.username}/')
+        group.title = 'Переименованная группа'
+        group.save()
+        assert 'Переименованная группа' in client.get(f'/{user.username}/').content.decode(), \
+            'Проверьте, что смена названия группы сбрасывает кеш профилей её авторов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_anonymous_and_author_variants(self, user_client, post):
+        user_client.get('/')
+        response = Client().get('/')
+        assert 'Редактировать' not in response.content.decode(), \
+            'Проверьте, что аноним не получает страницу, закешированную для автора'
+        assert 'Редактировать' in user_client.get('/').content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_read_your_writes(self, user_client):
+        user_client.get('/')
+        user_client.post('/new/', data={'text': 'Мой новый пост 5512'})
+        response = user_client.get('/')
+        assert response.context is not None, \
+            'Проверьте, что автор сразу после записи читает ленту мимо кеша'
+        assert 'Мой новый пост 5512' in response.content.decode()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_not_stored_when_changed_during_render(self, user, post):
+        def view(request):
+            # Пост появился, пока страница читала базу.
+            Post.objects.create(text='Пост во время отрисовки', author=user)
+            return HttpResponse('Старая страница')
+
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        request.session = SessionStore()
+        cached = feed_cache.cache_feed(feed_cache.POSTS)(view)
+        cached(request)
+        assert feed_cache._lookup(request, [feed_cache.POSTS], {})[1] is None, \
+            'Проверьте, что страница не кешируется, если поколение сменилось во время отрисовки'
+        cached = feed_cache.cache_feed(feed_cache.POSTS)(lambda request: HttpResponse('Новая'))
+        cached(request)
+        assert feed_cache._lookup(request, [feed_cache.POSTS], {})[1] is not None
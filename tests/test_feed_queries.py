@@ -0,0 +1,59 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post
+
+
+class TestFeedQueries:
+
+    @pytest.fixture
+    def author(self):
+        return get_user_model().objects.create_user(username='FeedAuthor')
+
+    def feed_urls(self, author, group):
+        return ['/', f'/group/{group.slug}/', f'/{author.username}/', '/follow/']
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        assert response.status_code == 200
+        return len(queries)
+
+    def add_posts(self, author, group, count):
+        for i in range(count):
+            post = Post.objects.create(text=f'Пост ленты {i}', author=author, group=group)
+            Comment.objects.create(post=post, author=author, text='Комментарий')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_constant_queries_per_feed_page(self, user_client, user, author, group):
+        Follow.objects.create(user=user, author=author)
+        self.add_posts(author, group, 1)
+        few = {url: self.count_queries(user_client, url) for url in self.feed_urls(author, group)}
+
+        self.add_posts(author, group, 14)
+        for url in self.feed_urls(author, group):
+            assert self.count_queries(user_client, url) == few[url], \
+                f'Проверьте, что число запросов на странице `{url}` не зависит от числа постов'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_comment_count_on_card(self, client, author, group):
+        self.add_posts(author, group, 1)
+        response = client.get(f'/group/{group.slug}/')
+        assert '1 комментариев' in response.content.decode(), \
+            'Проверьте, что на карточке поста выводится число комментариев'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_feed_rows_are_light(self, client, author, group, settings):
+        settings.FEED_EXCERPT_LENGTH = 20
+        Post.objects.create(text='Длинный пост ' * 10, author=author, group=group)
+        response = client.get(f'/group/{group.slug}/')
+        post, = response.context['page']
+        assert 'text' in post.get_deferred_fields(), \
+            'Проверьте, что лента не загружает полный текст поста'
+        assert post.excerpt == 'Длинный пост Длинный' and post.truncated
+        assert 'Читать дальше' in response.content.decode(), \
+            'Проверьте, что у обрезанного поста есть ссылка на полный текст'
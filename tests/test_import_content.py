@@ -0,0 +1,112 @@
+import io
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from posts import search
+from posts.models import AuthorStats, Comment, Follow, Group, Post, TimelineEntry
+
+
+def write_ndjson(path, records):
+    path.write_text(
+        "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records),
+        encoding="utf-8",
+    )
+
+
+RECORDS = [
+    {"type": "user", "id": "u1", "username": "imported_author"},
+    {"type": "user", "id": "u2", "username": "imported_reader"},
+    {"type": "group", "id": "g1", "slug": "imported", "title": "Импорт"},
+    {"type": "follow", "user": "u2", "author": "u1"},
+] + [
+    {"type": "post", "id": f"p{i}", "author": "u1", "group": "g1",
+     "text": f"Импортированный пост {i}", "pub_date": f"2019-01-{i + 1:02d}T10:00:00"}
+    for i in range(7)
+] + [
+    {"type": "comment", "post": "p0", "author": "u2", "text": "Импортированный ответ",
+     "created": "2019-02-01T10:00:00"},
+    {"type": "comment", "post": "missing", "author": "u2", "text": "Без поста"},
+]
+
+
+class TestImportContent:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_ndjson(self, tmp_path):
+        source = tmp_path / "dump.ndjson"
+        write_ndjson(source, RECORDS)
+        call_command("import_content", str(source), "--batch-size", "3", stdout=io.StringIO())
+
+        assert Post.objects.filter(author__username="imported_author").count() == 7
+        first = Post.objects.get(text="Импортированный пост 0")
+        assert first.pub_date.year == 2019, 'Проверьте, что дата поста берётся из источника'
+        assert first.group.slug == "imported"
+        assert Comment.objects.count() == 1, 'Проверьте, что запись без родителя пропускается'
+        first.refresh_from_db()
+        assert first.comment_count == 1, 'Проверьте, что после импорта пересчитаны счётчики'
+        assert AuthorStats.objects.get(user__username="imported_author").posts_count == 7
+        assert Group.objects.get(slug="imported").posts_count == 7
+        reader = Follow.objects.get().user
+        assert TimelineEntry.objects.filter(user=reader).count() == 7, \
+            'Проверьте, что ленты подписок собраны для импортированных постов'
+        assert search.search("Импортированный").object_list, \
+            'Проверьте, что импортированные посты попадают в поиск'
+        with connection.cursor() as cursor:
+            names = connection.introspection.get_constraints(cursor, "posts_post")
+        assert {index.name for index in Post._meta.indexes} <= set(names), \
+            'Проверьте, что индексы лент восстановлены после импорта'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_source_dates_keep_model_fields(self, tmp_path, monkeypatch):
+        flags = []
+        bulk_create = Post.objects.bulk_create
+
+        def spy(objs, **kwargs):
+            flags.append(Post._meta.get_field("pub_date").auto_now_add)
+            return bulk_create(objs, **kwargs)
+
+        monkeypatch.setattr(Post.objects, "bulk_create", spy)
+        source = tmp_path / "dump.ndjson"
+        write_ndjson(source, RECORDS)
+        call_command("import_content", str(source), stdout=io.StringIO())
+
+        assert flags and all(flags), \
+            'Проверьте, что импорт не выключает auto_now_add у полей модели'
+        assert Post.objects.get(text="Импортированный пост 6").pub_date.day == 7
+        assert Comment.objects.get().created.month == 2, \
+            'Проверьте, что дата комментария берётся из источника'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_resume_does_not_duplicate(self, tmp_path):
+        source = tmp_path / "dump.ndjson"
+        write_ndjson(source, RECORDS[:8] + [{"type": "post", "id": "bad", "author": "u1",
+                                             "text": "Битая дата", "pub_date": "вчера"}])
+        with pytest.raises(CommandError):
+            call_command("import_content", str(source), "--batch-size", "4",
+                         stdout=io.StringIO())
+        assert Post.objects.count() == 4, 'Проверьте, что записанные пачки сохраняются'
+        assert AuthorStats.objects.get(user__username="imported_author").posts_count == 4, \
+            'Проверьте, что счётчики пересчитываются и после ошибки импорта'
+
+        write_ndjson(source, RECORDS)
+        call_command("import_content", str(source), "--batch-size", "4",
+                     stdout=io.StringIO())
+        assert Post.objects.count() == 7, \
+            'Проверьте, что повторный запуск продолжает с контрольной точки без дублей'
+        assert Comment.objects.count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_import_csv(self, tmp_path):
+        (tmp_path / "users.csv").write_text(
+            "id,username\n1,csv_author\n", encoding="utf-8")
+        (tmp_path / "posts.csv").write_text(
+            "id,author,group,text,pub_date\n10,1,,Пост из CSV,2020-05-01T12:00:00\n",
+            encoding="utf-8")
+        call_command("import_content", str(tmp_path / "users.csv"),
+                     str(tmp_path / "posts.csv"), stdout=io.StringIO())
+        post = Post.objects.get()
+        assert post.author.username == "csv_author"
+        assert post.group is None
@@ -0,0 +1,79 @@
+import re
+import sqlite3
+
+import pytest
+
+from BGG import metrics
+
+
+def sample(text, line):
+    found = re.search(rf'^{re.escape(line)} (\S+)$', text, re.MULTILINE)
+    return float(found.group(1)) if found else None
+
+
+class TestMetrics:
+
+    @pytest.fixture(autouse=True)
+    def clean_registry(self):
+        metrics.registry.reset()
+        yield
+        metrics.registry.reset()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_request_histogram(self, client, post):
+        client.get('/')
+        client.get('/')
+        text = client.get('/metrics').content.decode()
+        assert '# TYPE http_request_duration_seconds histogram' in text
+        assert sample(text, 'http_request_duration_seconds_bucket{view="index",le="+Inf"}') == 2, \
+            'Проверьте, что время ответа попадает в гистограмму по имени view'
+        assert sample(text, 'http_request_duration_seconds_count{view="index"}') == 2
+        assert sample(text, 'db_queries_total{view="index"}') > 0
+        assert sample(text, 'cache_requests_total{cache="feed",result="miss"}') == 1
+        assert sample(text, 'cache_requests_total{cache="feed",result="hit"}') == 1, \
+            'Проверьте, что считаются попадания в кеш лент'
+        assert sample(text, 'cache_requests_total{cache="card",result="miss"}') == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_histogram_without_profiling(self, client, settings, post):
+        settings.REQUEST_PROFILING = False
+        client.get('/')
+        text = client.get('/metrics').content.decode()
+        assert sample(text, 'http_request_duration_seconds_count{view="index"}') == 1, \
+            'Проверьте, что время ответа пишется и без профайлера запросов'
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Registry().histogram('test_seconds', 'Тест', buckets=(0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        lines = list(histogram.samples(histogram.snapshot()))
+        assert [value for _, _, value in lines] == [2, 3, 4, 3.65, 4], \
+            'Проверьте, что корзины гистограммы накопительные'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_shared_file(self, client, settings, tmp_path):
+        settings.METRICS_LOCATION = str(tmp_path / 'metrics.sqlite3')
+        metrics.CACHE_REQUESTS.inc('feed', 'hit', amount=3)
+        metrics.registry.flush()
+        # Другой воркер сбросил свои приращения в тот же файл.
+        with sqlite3.connect(settings.METRICS_LOCATION) as db:
+            db.execute(metrics.UPSERT, ('cache_requests_total', '["feed", "hit"]', 0, 4))
+        metrics.CACHE_REQUESTS.inc('feed', 'hit')
+
+        text = client.get('/metrics').content.decode()
+        assert sample(text, 'cache_requests_total{cache="feed",result="hit"}') == 8, \
+            'Проверьте, что /metrics суммирует значения всех воркеров из общего файла'
+
+    def test_forbidden(self, client):
+        response = client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        assert response.status_code == 403, \
+            'Проверьте, что /metrics доступен только с METRICS_ALLOWED_IPS'
+
+    def test_token(self, client, settings):
+        settings.METRICS_TOKEN = 'secret'
+        assert client.get('/metrics').status_code == 403, \
+            'Проверьте, что с METRICS_TOKEN адрес из METRICS_ALLOWED_IPS не пускает без токена'
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong')
+        assert response.status_code == 403
+        response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        assert response.status_code == 200, 'Проверьте доступ к /metrics по токену'
@@ -36,3 +36,15 @@ class TestGroupPaginatorView:
             'Проверьте, что передали переменную `page` в контекст страницы `/`'
         assert type(response.context['page']) == Page, \
             'Проверьте, что переменная `page` на странице `/` типа `Page`'
+
+
+class TestPageLinksFilter:
+
+    def test_elided_range(self):
+        from posts.templatetags.page_links import page_links
+
+        page = Paginator(range(500_000), 10).page(25_000)
+        numbers = [link.number for link in page_links(page)]
+        assert numbers == [1, Paginator.ELLIPSIS, 24_998, 24_999, 25_000, 25_001,
+                           25_002, Paginator.ELLIPSIS, 50_000], \
+            'Проверьте, что паджинатор выводит окно страниц, а не page_range целиком'
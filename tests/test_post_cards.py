@@ -0,0 +1,44 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client
+
+from posts import thumbnails
+from posts.models import Comment
+
+
+def card_stats(response):
+    header = response.get('X-Post-Card-Cache')
+    assert header is not None, 'Проверьте, что страница сообщает статистику кеша карточек'
+    return dict(part.split('=') for part in header.split('; '))
+
+
+class TestPostCards:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.clear()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_cards_reused_and_invalidated(self, user_client, user, post_with_group):
+        # Картинки фикстуры нет на диске: дожидаемся, пока нарезка это поймёт.
+        thumbnails.wait(timeout=30)
+        url = f'/group/{post_with_group.group.slug}/'
+        assert card_stats(Client().get(url))['misses'] == '1'
+
+        response = user_client.get(url)
+        assert card_stats(response)['hits'] == '1', \
+            'Проверьте, что карточка поста берётся из кеша фрагментов'
+        assert 'Редактировать' in response.content.decode(), \
+            'Проверьте, что автор видит кнопку редактирования и в кешированной карточке'
+
+        Comment.objects.create(post=post_with_group, author=user, text='Комментарий')
+        response = Client().get(url)
+        assert card_stats(response)['misses'] == '1', \
+            'Проверьте, что новый комментарий меняет версию карточки'
+        assert '1 комментариев' in response.content.decode()
+        assert 'Редактировать' not in response.content.decode()
+
+        post_with_group.text = 'Исправленный текст 7731'
+        post_with_group.save()
+        assert 'Исправленный текст 7731' in Client().get(url).content.decode(), \
+            'Проверьте, что правка поста меняет версию карточки'
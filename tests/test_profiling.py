@@ -0,0 +1,59 @@
+import logging
+
+import pytest
+from django.test import Client
+
+from BGG.profiling import QueryBudgetExceeded
+
+
+def timings(response):
+    return dict(
+        (part.split(';')[0].strip(), part) for part in response['Server-Timing'].split(',')
+    )
+
+
+class TestRequestProfile:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_server_timing_header(self, client, post):
+        response = client.get('/')
+        assert response.status_code == 200
+        parts = timings(response)
+        assert set(parts) == {'sql', 'tpl', 'total'}, \
+            'Проверьте, что ответ содержит заголовок Server-Timing с sql, tpl и total'
+        assert 'desc="0 queries"' not in parts['sql'], \
+            'Проверьте, что запросы к базе учитываются в профиле'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_log_line(self, client, post, caplog):
+        with caplog.at_level(logging.INFO, logger='BGG.profiling'):
+            client.get('/')
+        [record] = [r for r in caplog.records if r.name == 'BGG.profiling']
+        assert record.profile['view'] == 'index'
+        assert record.profile['queries'] > 0
+        assert record.profile['template_ms'] > 0, \
+            'Проверьте, что время отрисовки шаблонов попадает в профиль'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_budget_strict(self, client, post, settings):
+        settings.QUERY_BUDGETS = {'index': 0}
+        with pytest.raises(QueryBudgetExceeded):
+            client.get('/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_budget_warning(self, client, post, settings, caplog):
+        settings.QUERY_BUDGETS = {'index': 0}
+        settings.QUERY_BUDGET_STRICT = False
+        with caplog.at_level(logging.WARNING, logger='BGG.profiling'):
+            response = client.get('/')
+        assert response.status_code == 200
+        assert any(r.levelno == logging.WARNING for r in caplog.records), \
+            'Проверьте, что превышение бюджета пишется в лог'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_disabled(self, post, settings):
+        settings.REQUEST_PROFILING = False
+        response = Client().get('/')
+        assert response.status_code == 200
+        assert 'Server-Timing' not in response, \
+            'Проверьте, что при REQUEST_PROFILING = False middleware отключается'
@@ -0,0 +1,111 @@
+import re
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from posts.models import Comment, Follow, Post
+
+# Любой SCAN, кроме покрывающего индекса, MATCH по FTS5 и одной строки
+# констант: ``SCAN ... USING INDEX`` — тоже полный проход, только по индексу.
+DEGRADED = re.compile(
+    r'^(SCAN (?!.*USING COVERING INDEX)(?!.*VIRTUAL TABLE INDEX)(?!CONSTANT ROW)'
+    r'|USE TEMP B-TREE FOR ORDER BY)'
+)
+
+# Исключение — обход индекса в порядке ORDER BY, который обрывает LIMIT:
+# так читается первая страница ленты без условия на ключ, а ``?page=N``
+# переводится в курсор (OFFSET ограничен номером страницы).
+INDEX_WALK = re.compile(r'^SCAN \S+ USING INDEX ')
+LIMITED = re.compile(r' LIMIT \d+( OFFSET \d+)?$')
+
+# Намеренное чтение всей таблицы: список групп в форме поста (без групп,
+# ожидающих удаления).
+ALLOWED = re.compile(
+    r'FROM "posts_group"'
+    r'( WHERE NOT \("posts_group"\."id" IN \(SELECT [^()]* FROM "posts_removal" [^()]*\)\))?$'
+)
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(queries):
+    found = []
+    for query in queries:
+        sql = query['sql']
+        if not sql.lstrip().upper().startswith('SELECT') or ALLOWED.search(sql):
+            continue
+        for detail in query_plan(sql):
+            detail = detail.strip()
+            if INDEX_WALK.match(detail) and LIMITED.search(sql):
+                continue
+            if DEGRADED.match(detail):
+                found.append(f'{detail}: {sql}')
+    return found
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='EXPLAIN QUERY PLAN есть только в SQLite')
+class TestQueryPlans:
+
+    @pytest.fixture
+    def author(self):
+        return get_user_model().objects.create_user(username='PlanAuthor')
+
+    @pytest.fixture
+    def feed(self, user, author, group):
+        Follow.objects.create(user=user, author=author)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author, group=group)
+            for i in range(15)
+        ]
+        Comment.objects.create(post=posts[0], author=user, text='Комментарий')
+        return posts
+
+    def urls(self, author, group, post):
+        return [
+            '/',
+            '/?page=2',
+            f'/group/{group.slug}/',
+            f'/{author.username}/',
+            f'/{author.username}/{post.id}/',
+            '/follow/',
+            '/new/',
+        ]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_views_use_indexes(self, user_client, author, group, feed):
+        for url in self.urls(author, group, feed[0]):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = user_client.get(url)
+            assert response.status_code == 200, url
+            scans = full_scans(queries)
+            assert not scans, \
+                f'Запросы страницы `{url}` читают таблицу целиком:\n' + '\n'.join(scans)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_writes_use_indexes(self, user_client, author, feed):
+        post = feed[0]
+        actions = [
+            (f'/{author.username}/{post.id}/comment/', {'text': 'Ещё комментарий'}),
+            ('/new/', {'text': 'Новый пост'}),
+        ]
+        for url, data in actions:
+            with CaptureQueriesContext(connection) as queries:
+                user_client.post(url, data=data)
+            scans = full_scans(queries)
+            assert not scans, \
+                f'Запросы `{url}` читают таблицу целиком:\n' + '\n'.join(scans)
+
+        for url in (f'/{author.username}/unfollow/', f'/{author.username}/follow/'):
+            with CaptureQueriesContext(connection) as queries:
+                user_client.get(url)
+            scans = full_scans(queries)
+            assert not scans, \
+                f'Запросы `{url}` читают таблицу целиком:\n' + '\n'.join(scans)
@@ -0,0 +1,122 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from posts import counters, removal
+from posts.models import (
+    AuthorStats, Comment, Follow, Group, Post, Removal, TimelineEntry,
+)
+
+
+class TestRemoval:
+
+    @pytest.fixture
+    def other(self):
+        return get_user_model().objects.create_user(username='OtherReader')
+
+    @pytest.fixture
+    def content(self, user, other, group):
+        Follow.objects.create(user=other, author=user)
+        Follow.objects.create(user=user, author=other)
+        image = default_storage.save('posts/removed.png', ContentFile(b'png'))
+        posts = [
+            Post.objects.create(text=f'Удаляемый пост {i}', author=user, group=group)
+            for i in range(5)
+        ]
+        Post.objects.filter(pk=posts[0].pk).update(image=image)
+        kept = Post.objects.create(text='Чужой пост', author=other, group=group)
+        Comment.objects.create(post=posts[1], author=other, text='Ответ автору')
+        Comment.objects.create(post=kept, author=user, text='Комментарий автора')
+        Comment.objects.create(post=kept, author=other, text='Свой комментарий')
+        return posts, kept, image
+
+    def assert_counters(self):
+        fields = list(counters.AUTHOR_COUNTS)
+        for user_id, *actual in counters.actual_author_counts():
+            stats = AuthorStats.objects.values_list(*fields).get(user_id=user_id)
+            assert stats == tuple(actual), \
+                'Проверьте, что очистка поддерживает счётчики оставшихся авторов'
+        for group_id, actual in counters.actual_group_counts():
+            assert Group.objects.get(pk=group_id).posts_count == actual
+        assert not counters.drifted_comment_counts().exists()
+        assert counters.get_counter(counters.POSTS) == Post.objects.count()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_user_hidden_then_reaped(self, client, user, other, group, content):
+        posts, kept, image = content
+        removal.schedule(user)
+
+        assert client.get(f'/{user.username}/').status_code == 404, \
+            'Проверьте, что удалённый пользователь сразу скрыт'
+        assert client.get(f'/{user.username}/{posts[1].pk}/').status_code == 404
+        feed = client.get('/').context['page']
+        assert [post.pk for post in feed] == [kept.pk], \
+            'Проверьте, что посты удалённого пользователя пропадают из ленты'
+        assert not get_user_model().objects.get(pk=user.pk).is_active
+
+        removal.reap(size=2, rate=0)
+        assert not get_user_model().objects.filter(pk=user.pk).exists()
+        assert list(Post.objects.all()) == [kept]
+        assert list(Comment.objects.values_list('text', flat=True)) == ['Свой комментарий']
+        assert not Follow.objects.exists()
+        assert not TimelineEntry.objects.filter(user=user).exists()
+        assert not Removal.objects.exists(), 'Проверьте, что очередь очищается'
+        assert not default_storage.exists(image), \
+            'Проверьте, что картинки постов удаляются с диска'
+        self.assert_counters()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_group_hidden_then_reaped(self, client, user, group, content):
+        posts, kept, image = content
+        Post.objects.create(text='Пост без группы', author=user)
+        removal.schedule(group)
+
+        assert client.get(f'/group/{group.slug}/').status_code == 404
+        assert len(client.get('/').context['page']) == 1
+
+        removal.reap(size=3, rate=0)
+        assert not Group.objects.filter(pk=group.pk).exists()
+        assert Post.objects.get().text == 'Пост без группы'
+        assert not Comment.objects.exists()
+        assert get_user_model().objects.filter(pk=user.pk).exists()
+        self.assert_counters()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_hidden_group_not_offered(self, user_client, admin_client, user, group):
+        post = Post.objects.create(text='Пост без группы', author=user)
+        removal.schedule(group)
+
+        user_client.post('/new/', {'text': 'Пост в скрытую группу', 'group': group.pk})
+        assert not Post.objects.filter(text='Пост в скрытую группу').exists(), \
+            'Проверьте, что в группу, ожидающую удаления, нельзя написать пост'
+        admin_client.post('/admin/posts/post/', {
+            'action': 'move_to_group', 'group': group.pk, '_selected_action': [post.pk],
+        })
+        assert Post.objects.get(pk=post.pk).group is None, \
+            'Проверьте, что админка не переносит посты в группу, ожидающую удаления'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_schedules(self, admin_client, user, content):
+        response = admin_client.post(
+            f'/admin/auth/user/{user.pk}/delete/', {'post': 'yes'}
+        )
+        assert response.status_code == 302
+        assert Removal.objects.filter(kind=Removal.USER, object_id=user.pk).exists(), \
+            'Проверьте, что удаление в админке ставит пользователя в очередь'
+        assert Post.objects.filter(author=user).count() == 5, \
+            'Проверьте, что админка не удаляет данные каскадом в запросе'
+        assert admin_client.get('/admin/posts/removal/').status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_throttle(self, user, group, content):
+        removal.schedule(user)
+        reports, pauses = [], []
+        removal.reap(size=4, rate=10, report=lambda *args: reports.append(args),
+                     sleep=pauses.append)
+        rows = sum(rows for _, _, rows in reports)
+        assert reports[-1][1] == 'done'
+        assert all(rows <= 4 for _, _, rows in reports), \
+            'Проверьте, что очистка идёт пачками по batch size'
+        assert sum(pauses) == pytest.approx(rows / 10, abs=0.5), \
+            'Проверьте, что скорость очистки ограничена rows/sec'
@@ -0,0 +1,45 @@
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+def replica_queries(client, url):
+    with CaptureQueriesContext(connections['replica']) as queries:
+        response = client.get(url)
+    return response, len(queries)
+
+
+class TestReplicaRouter:
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.REPLICA_DATABASES = ['replica']
+
+    @pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+    def test_feed_reads_go_to_replica(self, client, post_with_group):
+        for url in ('/', f'/group/{post_with_group.group.slug}/',
+                    f'/{post_with_group.author.username}/',
+                    f'/{post_with_group.author.username}/{post_with_group.id}/'):
+            response, count = replica_queries(client, url)
+            assert response.status_code == 200
+            assert count > 0, f'Проверьте, что страница `{url}` читает ленту с реплики'
+
+    @pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+    def test_replica_pages_cached(self, client, post):
+        replica_queries(client, '/')
+        response, count = replica_queries(client, '/')
+        assert response.status_code == 200
+        assert count == 0, 'Проверьте, что страницы лент с реплик кешируются'
+
+    @pytest.mark.django_db(transaction=True, databases=['default', 'replica'])
+    def test_writes_stick_to_primary(self, user_client, post):
+        url = f'/{post.author.username}/{post.id}/comment/'
+        with CaptureQueriesContext(connections['replica']) as queries:
+            user_client.post(url, data={'text': 'Комментарий'})
+        assert len(queries) == 0, 'Проверьте, что запись и чтения после неё идут в основную базу'
+
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = user_client.get('/')
+        assert len(queries) == 0, \
+            'Проверьте, что автор сразу после записи читает ленты из основной базы'
+        assert response.status_code == 200
@@ -0,0 +1,88 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client
+
+from posts import search
+from posts.models import Comment, Post
+
+
+@pytest.mark.skipif(connection.vendor != 'sqlite', reason='Поиск построен на SQLite FTS5')
+class TestSearch:
+
+    def results(self, url):
+        response = Client().get(url)
+        assert response.status_code == 200, 'Проверьте, что страница `/search/` доступна'
+        return response
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_posts_and_comments(self, user, post):
+        found = Post.objects.create(text='Обзор игры Каркассон и её дополнений', author=user)
+        Post.objects.create(text='Совсем другая запись', author=user)
+        Comment.objects.create(post=post, author=user, text='А я люблю <b>Каркассон</b>')
+
+        response = self.results('/search/?q=каркассон')
+        results = list(response.context['cursor'])
+        assert {result.post for result in results} == {found, post}, \
+            'Проверьте, что поиск находит посты по тексту поста и комментариев'
+        content = response.content.decode()
+        assert '<mark>Каркассон</mark>' in content, 'Проверьте подсветку найденных слов'
+        assert '&lt;b&gt;' in content, 'Проверьте, что текст сниппета экранируется'
+
+        found.text = 'Текст исправлен'
+        found.save()
+        results = list(self.results('/search/?q=каркассон').context['cursor'])
+        assert [result.post for result in results] == [post], \
+            'Проверьте, что индекс обновляется при правке поста'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_search_keyset_pages(self, user):
+        for i in range(15):
+            Post.objects.create(text=f'Партия номер {i} в Манчкин', author=user)
+
+        first = self.results('/search/?q=манчкин').context['cursor']
+        assert len(first) == 10 and first.has_next()
+        second = self.results(f'/search/?{first.next_query}').context['cursor']
+        assert len(second) == 5 and not second.has_next(), \
+            'Проверьте, что выдача листается курсором'
+        seen = {result.post.pk for result in first} | {result.post.pk for result in second}
+        assert len(seen) == 15, 'Проверьте, что страницы выдачи не пересекаются'
+
+        back = self.results(f'/search/?{second.previous_query}').context['cursor']
+        assert [r.post.pk for r in back] == [r.post.pk for r in first]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pages_follow_full_ranking(self, user):
+        posts = [
+            Post.objects.create(text='дополнение ' * (i % 4 + 1) + f'к игре {i}', author=user)
+            for i in range(12)
+        ]
+        for i, post in enumerate(posts[::2]):
+            Comment.objects.create(
+                post=post, author=user, text='дополнение ' * (i % 5 + 1) + 'в комментарии'
+            )
+        Comment.objects.create(post=posts[1], author=user, text='и ещё дополнение')
+
+        match = search.match_query('дополнение')
+        ranking = search._hits(match, before=(1e308, 0), limit=100)[::-1]
+        seen, after = [], None
+        while True:
+            page = search.search('дополнение', after=after, per_page=3)
+            seen += [result.post.pk for result in page]
+            if not page.has_next():
+                break
+            after = search.decode_cursor(page.next_cursor)
+        assert seen == [post_id for post_id, _, _ in ranking], \
+            'Проверьте, что постраничная выдача совпадает с полным ранжированием'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_admin_search_uses_index(self, user):
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        Post.objects.create(text='Про Глумхейвен и кооперативы', author=user)
+        Post.objects.create(text='Про шахматы', author=user)
+        client = Client()
+        client.force_login(admin)
+        response = client.get('/admin/posts/post/?q=кооперативы')
+        assert response.status_code == 200
+        assert list(response.context['cl'].queryset.values_list('text', flat=True)) == \
+            ['Про Глумхейвен и кооперативы'], 'Проверьте поиск в админке'
@@ -0,0 +1,44 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+
+from posts import synthetic
+from posts.models import Comment, Follow, Post
+
+
+class TestSynthetic:
+
+    def test_records_are_reproducible(self):
+        def records(seed):
+            return list(synthetic.Community(users=50, posts=100, groups=5, seed=seed).records())
+
+        assert records(7) == records(7), 'Проверьте, что при одном seed данные совпадают'
+        assert records(7) != records(8)
+
+    def test_followers_are_skewed(self):
+        community = synthetic.Community(users=2000, posts=0, groups=0, seed=1)
+        counts = {}
+        for record in community.follow_records():
+            counts[record['author']] = counts.get(record['author'], 0) + 1
+        top = sorted(counts.values(), reverse=True)
+        assert top[0] > 20 * (sum(top) / len(top)), \
+            'Проверьте, что подписчики распределены по степенному закону'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_seed_and_bench_routes(self, tmp_path):
+        call_command('seed_synthetic', '--users', '30', '--posts', '60', '--groups', '3',
+                     stdout=io.StringIO())
+        assert Post.objects.count() == 60
+        assert Follow.objects.exists() and Comment.objects.exists()
+
+        report = tmp_path / 'report.json'
+        call_command('bench_routes', '--requests', '3', '--concurrency', '1',
+                     '--in-place', '--output', str(report), stdout=io.StringIO())
+        routes = json.loads(report.read_text())['routes']
+        assert set(routes) == {'index', 'group_posts', 'post', 'profile',
+                               'follow_index', 'add_comment', 'new_post'}
+        for name, result in routes.items():
+            assert result['errors'] == 0, f'Проверьте маршрут {name}'
+            assert result['queries_mean'] > 0
@@ -0,0 +1,89 @@
+import re
+from io import BytesIO, StringIO
+
+import pytest
+from PIL import Image
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import Client
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def image_bytes(color=(255, 0, 0), size=(50, 50)):
+    file_obj = BytesIO()
+    Image.new('RGB', size=size, color=color).save(file_obj, 'png')
+    return file_obj.getvalue()
+
+
+class TestThumbnails:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_generated_after_upload(self, user_client, user):
+        image = File(BytesIO(image_bytes()), name='upload.png')
+        user_client.post('/new/', data={'text': 'Пост с картинкой', 'image': image})
+        thumbnails.wait(timeout=30)
+
+        post = Post.objects.get(author=user)
+        for _, width, mime, geometry, options in thumbnails.variants():
+            assert thumbnails.ready(post.image, geometry, options) is not None, \
+                f'Проверьте, что миниатюра `{geometry}` типа `{mime}` нарезается после загрузки'
+        content = Client().get('/').content.decode()
+        assert '/media/cache/' in content, 'Проверьте, что лента показывает готовую миниатюру'
+        assert 'thumbnail-placeholder' not in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_responsive_picture(self, user_client, user):
+        image = File(BytesIO(image_bytes()), name='upload.png')
+        user_client.post('/new/', data={'text': 'Пост с картинкой', 'image': image})
+        thumbnails.wait(timeout=30)
+
+        content = Client().get('/').content.decode()
+        assert '<source type="image/webp"' in content, \
+            'Проверьте, что карточка предлагает браузеру WebP'
+        assert re.search(r'srcset="[^"]+\.jpg 320w, [^"]+\.jpg 640w, [^"]+\.jpg 960w"', content), \
+            'Проверьте, что у JPEG есть srcset со всеми ширинами'
+        assert 'width="960" height="339"' in content, \
+            'Проверьте, что у картинки указаны размеры, чтобы не прыгала вёрстка'
+        assert 'loading="lazy"' in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_placeholder_until_ready(self, post):
+        thumbnails.wait(timeout=30)
+        for _ in range(2):
+            content = Client().get(f'/{post.author.username}/{post.id}/').content.decode()
+            assert 'thumbnail-placeholder' in content, \
+                'Проверьте, что вместо ненарезанной миниатюры показывается заглушка'
+        content = Client().get('/').content.decode()
+        assert 'thumbnail-placeholder' in content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_placeholder_keeps_ratio(self, user, monkeypatch):
+        monkeypatch.setattr(thumbnails, 'enqueue', lambda post: None)
+        name = default_storage.save('posts/tall.png', ContentFile(image_bytes(size=(50, 100))))
+        post = Post.objects.create(text='Высокая картинка', author=user, image=name)
+        content = Client().get(f'/{user.username}/{post.id}/').content.decode()
+        assert 'thumbnail-placeholder' in content
+        assert 'width="960" height="1920"' in content, \
+            'Проверьте, что заглушка полной картинки повторяет пропорции исходника'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_backfill_command(self, user):
+        name = default_storage.save('posts/old.png', ContentFile(image_bytes()))
+        post, empty = Post.objects.bulk_create([
+            Post(text='Старый пост', author=user, image=name),
+            Post(text='Пост без картинки', author=user),
+        ])
+        # Посты, созданные до появления картинок, хранят NULL, а не ''.
+        Post.objects.filter(pk=empty.pk).update(image=None)
+        assert thumbnails.picture(post.image, 'card') is None
+
+        out = StringIO()
+        call_command('pregenerate_thumbnails', workers=2, stdout=out, stderr=out)
+        assert 'Картинок: 1, нарезано: 1' in out.getvalue(), \
+            'Проверьте, что посты без картинки (NULL) не попадают в нарезку'
+        for _, _, _, geometry, options in thumbnails.variants():
+            assert thumbnails.ready(post.image, geometry, options) is not None, \
+                'Проверьте, что команда нарезает миниатюры существующих картинок'
@@ -0,0 +1,62 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from posts.models import Follow, Post, TimelineEntry
+
+
+class TestTimeline:
+
+    @pytest.fixture
+    def author(self):
+        return get_user_model().objects.create_user(username='TimelineAuthor')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_fan_out_on_write(self, user_client, user, author):
+        user_client.get(f'/{author.username}/follow/')
+        post = Post.objects.create(text='Пост для ленты 9184', author=author)
+        assert TimelineEntry.objects.filter(user=user, post=post).exists(), \
+            'Проверьте, что новый пост попадает в ленту подписчика'
+
+        response = user_client.get('/follow/')
+        assert 'Пост для ленты 9184' in response.content.decode(), \
+            'Проверьте, что на странице `/follow/` выводятся посты из ленты'
+
+        user_client.get(f'/{author.username}/unfollow/')
+        assert not TimelineEntry.objects.filter(user=user).exists(), \
+            'Проверьте, что после отписки посты автора убираются из ленты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_follow_backfills_existing_posts(self, user_client, user, author):
+        Post.objects.create(text='Старый пост 1', author=author)
+        Post.objects.create(text='Старый пост 2', author=author)
+        user_client.get(f'/{author.username}/follow/')
+        assert TimelineEntry.objects.filter(user=user).count() == 2, \
+            'Проверьте, что при подписке в ленту попадают уже опубликованные посты'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_pull_above_fanout_limit(self, settings, user_client, user, author):
+        settings.TIMELINE_FANOUT_LIMIT = 1
+        other = get_user_model().objects.create_user(username='TimelineOther')
+        Follow.objects.create(user=other, author=author)
+        user_client.get(f'/{author.username}/follow/')
+        Post.objects.create(text='Пост популярного автора', author=author)
+
+        assert not TimelineEntry.objects.exists(), \
+            'Проверьте, что выше порога посты не раскладываются по лентам'
+        response = user_client.get('/follow/')
+        assert len(response.context['page']) == 1, \
+            'Проверьте, что посты популярного автора подмешиваются при чтении'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_unfollow_below_limit_backfills(self, settings, client, user_client, user, author):
+        settings.TIMELINE_FANOUT_LIMIT = 1
+        other = get_user_model().objects.create_user(username='TimelineOther')
+        Follow.objects.create(user=other, author=author)
+        user_client.get(f'/{author.username}/follow/')
+        Post.objects.create(text='Пост популярного автора', author=author)
+        assert not TimelineEntry.objects.exists()
+
+        client.force_login(other)
+        client.get(f'/{author.username}/unfollow/')
+        assert TimelineEntry.objects.filter(user=user).count() == 1, \
+            'Проверьте, что после отписки ниже порога оставшимся подписчикам догружаются посты'